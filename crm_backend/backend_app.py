@@ -1,8 +1,24 @@
+import os
 from flask import Flask
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from crm_backend.config import Config
 from crm_backend.db import db
+from crm_backend.engine import configure_engine, init_engine
+from crm_backend.replicas import configure_replicas, init_replicas
+from crm_backend.cache import init_cache
+from crm_backend.instrumentation import init_instrumentation
+from crm_backend.metrics import init_metrics
+from crm_backend.suggest import init_suggest
+from crm_backend.group_commit import init_group_commit
+from crm_backend.purge import init_purge
+from crm_backend.snapshot import init_snapshots
+from crm_backend.status_stream import init_status_streams
+from crm_backend.serializers import init_json
+from crm_backend.compression import init_compression
+
+# Migration scripts live next to this module so they are found from any working directory
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
 # Initialize other extensions
 migrate = Migrate()
@@ -18,10 +34,23 @@ def create_app():
     It performs the following steps:
     1. Initializes the Flask application instance.
     2. Loads the configuration from the specified configuration object.
-    3. Initializes the database extension with the app.
-    4. Initializes the migration extension with the app and database.
-    5. Initializes the JWT extension with the app.
-    6. Registers blueprints to organize application routes.
+    3. Derives the engine options from the DB_ENGINE_PROFILE tuning profile.
+    4. Adds a bind for each read replica in READ_REPLICA_URLS.
+    5. Initializes the database extension with the app and applies the profile's SQLite PRAGMAs.
+    6. Routes the reads of GET requests to the read replicas, if any.
+    7. Initializes the migration extension with the app and database.
+    8. Initializes the JWT extension with the app.
+    9. Encodes JSON responses with the fast encoder of the serializers module.
+    10. Compresses responses for clients that accept gzip or deflate.
+    11. Configures the response cache.
+    12. Enables SQL instrumentation if SQL_INSTRUMENTATION is set.
+    13. Sets up the '/metrics' endpoint if METRICS_ENABLED is set.
+    14. Creates the customer suggestion index.
+    15. Creates the group-commit writer if GROUP_COMMIT is set.
+    16. Creates the purger of asynchronous customer deletes.
+    17. Creates the reader of the columnar snapshots used by the reports.
+    18. Creates the broadcaster of the live ticket status counts.
+    19. Registers blueprints to organize application routes.
 
     Returns:
         Flask: The configured Flask application instance ready for use.
@@ -29,9 +58,23 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    configure_engine(app)
+    configure_replicas(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_engine(app)
+    init_replicas(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     jwt.init_app(app)
+    init_json(app)
+    init_compression(app)
+    init_cache(app)
+    init_instrumentation(app)
+    init_metrics(app)
+    init_suggest(app)
+    init_group_commit(app)
+    init_purge(app)
+    init_snapshots(app)
+    init_status_streams(app)
 
     from crm_backend.routes import register_blueprints
     register_blueprints(app)
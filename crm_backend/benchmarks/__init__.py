@@ -0,0 +1,6 @@
+"""
+Benchmarks for the CRM backend.
+
+Each module can be run on its own, e.g. ``python -m crm_backend.benchmarks.index_benchmark``,
+and prints its results or writes them as JSON with ``--json``.
+"""
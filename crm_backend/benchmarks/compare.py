@@ -0,0 +1,60 @@
+"""
+Compare two API benchmark result files and flag routes that got slower.
+
+Usage:
+    python -m crm_backend.benchmarks.compare baseline.json current.json --threshold 0.2
+
+Exits with status 1 if the p95 latency of any route grew by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare the p95 latency of every route present in both result sets.
+
+    Args:
+        baseline (dict): The results of the reference run.
+        current (dict): The results of the run to check.
+        threshold (float): The relative p95 increase above which a route counts as a regression.
+
+    Returns:
+        list: ``(volume, route, baseline p95, current p95, relative change, regressed)`` tuples.
+    """
+    rows = []
+    for volume, routes in sorted(current['results'].items()):
+        for route, stats in sorted(routes.items()):
+            before = baseline['results'].get(volume, {}).get(route)
+            if before is None:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+            rows.append((volume, route, before['p95_ms'], stats['p95_ms'], change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two API benchmark result files.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative p95 increase reported as a regression (default 0.2)')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print(f"baseline {baseline.get('commit')} -> current {current.get('commit')}")
+    rows = compare(baseline, current, args.threshold)
+    for volume, route, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{volume:>18} {route:<36} p95 {before:>9.3f}ms -> {after:>9.3f}ms ({change:+.0%}){flag}')
+
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
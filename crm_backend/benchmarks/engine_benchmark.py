@@ -0,0 +1,134 @@
+"""
+Compare the throughput of concurrent readers and writers under each engine tuning profile.
+
+For every profile the benchmark creates a fresh database, seeds it, then runs writer
+threads that insert interactions one transaction at a time next to reader threads that
+run the interactions list query, for a fixed duration. It reports committed writes and
+reads per second and the number of operations that failed, e.g. with "database is locked".
+
+Usage:
+    python -m crm_backend.benchmarks.engine_benchmark --writers 4 --readers 4 --seconds 10
+    python -m crm_backend.benchmarks.engine_benchmark --profiles default,production --json engine.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from crm_backend.db import db
+from crm_backend.engine import ENGINE_PROFILES, engine_options, sqlite_pragma_listener
+from crm_backend.benchmarks.seed import seed
+
+WRITE_SQL = 'INSERT INTO interactions (customer_id, notes, created_at) VALUES (:customer_id, :notes, :created_at)'
+READ_SQL = ('SELECT id, customer_id, notes, created_at FROM interactions WHERE customer_id = :customer_id '
+            'ORDER BY created_at DESC, id DESC LIMIT 10')
+
+
+def make_engine(database_url, profile):
+    """Create an engine configured the way ``create_app`` configures it for ``profile``."""
+    settings = ENGINE_PROFILES[profile]
+    engine = create_engine(database_url, **engine_options(database_url, settings))
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', sqlite_pragma_listener(settings))
+    return engine
+
+
+def worker(engine, sql, params, write, deadline, counts, lock):
+    """Run ``sql`` in a loop until ``deadline``, counting successes and failures."""
+    done = failed = 0
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        try:
+            if write:
+                with engine.begin() as connection:
+                    connection.execute(text(sql), params(n))
+            else:
+                with engine.connect() as connection:
+                    connection.execute(text(sql), params(n)).all()
+            done += 1
+        except OperationalError:
+            failed += 1
+    with lock:
+        key = 'writes' if write else 'reads'
+        counts[key] += done
+        counts[key + '_failed'] += failed
+
+
+def run_profile(database_url, profile, customers, writers, readers, seconds):
+    """
+    Benchmark one profile on a freshly created and seeded database.
+
+    Returns:
+        dict: Operations per second and failure counts.
+    """
+    engine = make_engine(database_url, profile)
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        seed(connection, customers, {'interactions': 5})
+
+    counts = {'writes': 0, 'writes_failed': 0, 'reads': 0, 'reads_failed': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=worker, args=(
+            engine, WRITE_SQL,
+            lambda n: {'customer_id': n % customers + 1, 'notes': f'Benchmark note {n}',
+                       'created_at': datetime.utcnow()},
+            True, deadline, counts, lock))
+        for _ in range(writers)
+    ] + [
+        threading.Thread(target=worker, args=(
+            engine, READ_SQL, lambda n: {'customer_id': n * 7919 % customers + 1},
+            False, deadline, counts, lock))
+        for _ in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    engine.dispose()
+    return {
+        'writes_per_second': round(counts['writes'] / seconds, 1),
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'writes_failed': counts['writes_failed'],
+        'reads_failed': counts['reads_failed']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='database to benchmark; its tables are dropped '
+                                               '(default: a temporary SQLite file per profile)')
+    parser.add_argument('--profiles', default=','.join(ENGINE_PROFILES))
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--json', help='write the results to this file as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for profile in args.profiles.split(','):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = args.database_url or 'sqlite:///' + os.path.join(tmp, f'engine_{profile}.db')
+            results[profile] = run_profile(database_url, profile, args.customers,
+                                           args.writers, args.readers, args.seconds)
+        result = results[profile]
+        print(f"{profile}: {result['writes_per_second']} writes/s ({result['writes_failed']} failed), "
+              f"{result['reads_per_second']} reads/s ({result['reads_failed']} failed)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'writers': args.writers, 'readers': args.readers, 'seconds': args.seconds,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
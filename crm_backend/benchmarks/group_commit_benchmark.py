@@ -0,0 +1,108 @@
+"""
+Compare the insert throughput of interaction creates with and without group commit.
+
+The benchmark creates the app on a fresh SQLite file for each mode and posts
+interactions to '/interactions/' from concurrent client threads, the way a
+telephony integration logs calls. It reports creates per second and the latency
+percentiles of the acknowledgements.
+
+Usage:
+    python -m crm_backend.benchmarks.group_commit_benchmark --clients 16 --requests 200
+    python -m crm_backend.benchmarks.group_commit_benchmark --profile production --json group_commit.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from flask_jwt_extended import create_access_token
+from crm_backend.backend_app import create_app, db
+from crm_backend.config import Config
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at ``fraction`` of a sorted list using the nearest-rank method."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_mode(database_url, group_commit, profile, clients, requests):
+    """
+    Post ``requests`` interactions from each of ``clients`` threads.
+
+    Returns:
+        dict: Creates per second, latency percentiles in milliseconds and failures.
+    """
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', database_url)
+    monkeypatch.setattr(Config, 'DB_ENGINE_PROFILE', profile)
+    monkeypatch.setattr(Config, 'GROUP_COMMIT', group_commit)
+    monkeypatch.setattr(Config, 'METRICS_ENABLED', False)
+    app = create_app()
+    monkeypatch.undo()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    customer_id = app.test_client().post('/customers/', json={
+        'first_name': 'Bench', 'last_name': 'Caller', 'email': 'caller@example.com'
+    }, headers=headers).json['id']
+
+    def post_interactions(client_number):
+        client = app.test_client()
+        timings, failed = [], 0
+        for n in range(requests):
+            started = time.perf_counter()
+            response = client.post('/interactions/', json={
+                'customer_id': customer_id, 'notes': f'Call {client_number}-{n} logged by telephony'
+            }, headers=headers)
+            timings.append((time.perf_counter() - started) * 1000)
+            failed += response.status_code != 201
+        return timings, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        outcomes = list(pool.map(post_interactions, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(t for client_timings, _ in outcomes for t in client_timings)
+    with app.app_context():
+        db.engine.dispose()
+    return {
+        'creates_per_second': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'failed': sum(failed for _, failed in outcomes)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200, help='creates per client')
+    parser.add_argument('--profile', default='default', help='engine tuning profile (see crm_backend.engine)')
+    parser.add_argument('--json', help='write the results to this file as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for mode, group_commit in (('commit_per_request', False), ('group_commit', True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = 'sqlite:///' + os.path.join(tmp, f'{mode}.db')
+            results[mode] = run_mode(database_url, group_commit, args.profile, args.clients, args.requests)
+        result = results[mode]
+        print(f"{mode}: {result['creates_per_second']} creates/s, p50 {result['p50_ms']}ms, "
+              f"p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms, {result['failed']} failed")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'clients': args.clients, 'requests_per_client': args.requests,
+                       'profile': args.profile, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Compare the query plans and latencies of the list queries with and without the secondary indexes.
+
+The benchmark creates the tables from the models, drops their secondary indexes, seeds a
+large dataset, times the queries issued by the list, facet and cursor pagination routes,
+then creates the indexes and times the same queries again.
+
+Usage:
+    python -m crm_backend.benchmarks.index_benchmark --customers 20000 --children 10
+    python -m crm_backend.benchmarks.index_benchmark --database-url postgresql://localhost/crm_bench
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+from sqlalchemy import create_engine, text
+from crm_backend.db import db
+from crm_backend.benchmarks.seed import START, seed
+
+# (name, SQL, parameters) of the queries issued by the routes
+QUERIES = [
+    ('interactions_by_customer',
+     'SELECT id, customer_id, notes, created_at FROM interactions WHERE customer_id = :customer_id '
+     'ORDER BY created_at DESC, id DESC LIMIT 10',
+     {'customer_id': 42}),
+    ('tickets_by_status',
+     'SELECT id, customer_id, status, created_at FROM support_tickets WHERE status = :status '
+     'ORDER BY created_at, id LIMIT 10',
+     {'status': 'in process'}),
+    ('leads_by_status_in_range',
+     'SELECT COUNT(*) FROM sales_leads WHERE status = :status AND created_at >= :start AND created_at < :end',
+     {'status': 'won', 'start': START + timedelta(days=300), 'end': START + timedelta(days=330)}),
+    ('interactions_cursor_deep_page',
+     'SELECT id, customer_id, notes, created_at FROM interactions '
+     'WHERE created_at >= :created_at AND (created_at > :created_at OR id > :id) '
+     'ORDER BY created_at, id LIMIT 10',
+     {'created_at': START + timedelta(days=900), 'id': 0}),
+    ('ticket_status_facets_for_customer',
+     'SELECT status, COUNT(id) FROM support_tickets WHERE customer_id = :customer_id GROUP BY status',
+     {'customer_id': 42}),
+]
+
+TABLES = ('customers', 'sales_leads', 'interactions', 'support_tickets')
+
+
+def secondary_indexes():
+    """Return the secondary indexes declared on the benchmarked tables."""
+    return [index for name in TABLES for index in db.metadata.tables[name].indexes]
+
+
+def explain(connection, sql, params):
+    """Return the query plan of a statement as a list of lines."""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params).all()
+        return [row[-1] for row in rows]
+    return [row[0] for row in connection.execute(text('EXPLAIN ' + sql), params).all()]
+
+
+def time_query(connection, sql, params, repeat):
+    """Run a statement ``repeat`` times and return its median and p95 latency in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(text(sql), params).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3)
+    }
+
+
+def measure(connection, repeat):
+    """Return the plan and latency of every benchmarked query."""
+    return {
+        name: dict(plan=explain(connection, sql, params), **time_query(connection, sql, params, repeat))
+        for name, sql, params in QUERIES
+    }
+
+
+def run(database_url, customers, children, repeat):
+    """
+    Seed a database and measure the queries before and after creating the indexes.
+
+    Args:
+        database_url (str): The database to benchmark; its benchmarked tables are dropped first.
+        customers (int): The number of customers to seed.
+        children (int): The average number of rows per customer in each child table.
+        repeat (int): The number of timed runs per query.
+
+    Returns:
+        dict: The benchmark parameters and the 'before' and 'after' measurements.
+    """
+    engine = create_engine(database_url)
+    tables = [db.metadata.tables[name] for name in TABLES]
+    db.metadata.drop_all(engine, tables=tables)
+    db.metadata.create_all(engine, tables=tables)
+
+    with engine.begin() as connection:
+        for index in secondary_indexes():
+            index.drop(connection)
+        started = time.perf_counter()
+        seed(connection, customers, {name: children for name in TABLES[1:]})
+        seed_seconds = time.perf_counter() - started
+
+    with engine.connect() as connection:
+        connection.execute(text('ANALYZE'))
+        before = measure(connection, repeat)
+
+    with engine.begin() as connection:
+        for index in secondary_indexes():
+            index.create(connection)
+        connection.execute(text('ANALYZE'))
+
+    with engine.connect() as connection:
+        after = measure(connection, repeat)
+
+    engine.dispose()
+    return {
+        'dialect': engine.dialect.name,
+        'customers': customers,
+        'children_per_customer': children,
+        'seed_seconds': round(seed_seconds, 2),
+        'before': before,
+        'after': after
+    }
+
+
+def print_report(results):
+    """Print the plans and latencies side by side."""
+    print(f"{results['dialect']}: {results['customers']} customers, "
+          f"{results['children_per_customer']} rows per customer per child table "
+          f"(seeded in {results['seed_seconds']}s)\n")
+    for name, _, _ in QUERIES:
+        before, after = results['before'][name], results['after'][name]
+        speedup = before['median_ms'] / after['median_ms'] if after['median_ms'] else float('inf')
+        print(f"{name}: {before['median_ms']}ms -> {after['median_ms']}ms median "
+              f"({speedup:.1f}x), p95 {before['p95_ms']}ms -> {after['p95_ms']}ms")
+        print('  before: ' + '; '.join(before['plan']))
+        print('  after:  ' + '; '.join(after['plan']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', help='database to benchmark (default: a temporary SQLite file)')
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--children', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', help='write the results to this file as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or 'sqlite:///' + os.path.join(tmp, 'index_benchmark.db')
+        results = run(database_url, args.customers, args.children, args.repeat)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
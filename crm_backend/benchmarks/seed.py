@@ -0,0 +1,71 @@
+"""
+Deterministic bulk seeding of the CRM tables for the benchmarks.
+"""
+import random
+from datetime import datetime, timedelta
+from crm_backend.db import db
+from crm_backend import models  # noqa: F401  (registers the tables on db.metadata)
+
+TICKET_STATUSES = ('active', 'deactivated', 'in process')
+LEAD_STATUSES = ('new', 'contacted', 'qualified', 'won', 'lost')
+START = datetime(2020, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+def insert_batches(connection, table, rows, batch_size):
+    """Insert an iterable of rows with one executemany call per ``batch_size`` rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            connection.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+
+
+def seed(connection, customers, per_customer, batch_size=10000, seed_value=1):
+    """
+    Insert customers and, on average, ``per_customer[table]`` rows per customer in each child table.
+
+    Customer IDs are 1 to ``customers``; child rows are spread uniformly over the
+    customers and timestamps uniformly over three years from ``START``.
+
+    Args:
+        connection (Connection): An open connection in a transaction.
+        customers (int): The number of customers to create.
+        per_customer (dict): Maps 'sales_leads', 'interactions' and 'support_tickets' to a
+            number of rows per customer.
+        batch_size (int): The number of rows per executemany call.
+        seed_value (int): The seed of the random generator, so runs are reproducible.
+    """
+    tables = db.metadata.tables
+    rng = random.Random(seed_value)
+
+    def timestamp():
+        return START + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+    insert_batches(connection, tables['customers'], (
+        {'id': i, 'first_name': f'First{i}', 'last_name': f'Last{i}',
+         'email': f'customer{i}@example.com', 'company': f'Company {i % 500}',
+         'created_at': timestamp()}
+        for i in range(1, customers + 1)
+    ), batch_size)
+
+    insert_batches(connection, tables['sales_leads'], (
+        {'customer_id': rng.randint(1, customers), 'status': rng.choice(LEAD_STATUSES),
+         'created_at': timestamp()}
+        for _ in range(int(customers * per_customer.get('sales_leads', 0)))
+    ), batch_size)
+
+    insert_batches(connection, tables['interactions'], (
+        {'customer_id': rng.randint(1, customers), 'notes': 'Called the customer about their account.',
+         'created_at': timestamp()}
+        for _ in range(int(customers * per_customer.get('interactions', 0)))
+    ), batch_size)
+
+    insert_batches(connection, tables['support_tickets'], (
+        {'customer_id': rng.randint(1, customers), 'description': 'The customer reported a problem.',
+         'status': rng.choice(TICKET_STATUSES), 'created_at': timestamp()}
+        for _ in range(int(customers * per_customer.get('support_tickets', 0)))
+    ), batch_size)
@@ -0,0 +1,124 @@
+"""
+Measure the cost of loading and serializing interaction list pages per 1,000 rows.
+
+The benchmark fills a fresh SQLite file with interactions whose notes are
+``--notes-bytes`` long, then times three ways of producing the JSON of a list:
+
+    handwritten  every column loaded, dicts built with strftime and encoded by
+                 Flask's default provider (the routes before the serializers module)
+    schema       every column loaded, dumped by the shared schema and encoded by
+                 the fast provider
+    sparse       '?fields=id,customer_id,created_at': the notes are not loaded
+
+Usage:
+    python -m crm_backend.benchmarks.serialization_benchmark --rows 20000 --notes-bytes 2000
+    python -m crm_backend.benchmarks.serialization_benchmark --json serialization.json
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+import pytest
+from flask.json.provider import DefaultJSONProvider
+from crm_backend.backend_app import create_app, db
+from crm_backend.config import Config
+from crm_backend.models import Customer, Interaction
+from crm_backend.serializers import SCHEMAS, FastJSONProvider
+
+SPARSE_FIELDS = ('id', 'customer_id', 'created_at')
+
+
+def handwritten(rows, provider):
+    return provider.dumps({'interactions': [{
+        'id': i.id,
+        'customer_id': i.customer_id,
+        'notes': i.notes,
+        'created_at': i.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    } for i in rows]}, separators=(',', ':'))
+
+
+def schema_dump(fields):
+    def serialize(rows, provider):
+        return provider.dumps({'interactions': SCHEMAS['interactions'].dump_many(rows, fields)},
+                              separators=(',', ':'))
+    return serialize
+
+
+def time_mode(app, provider, fields, serialize, rows, repeat):
+    """
+    Load and serialize ``rows`` interactions ``repeat`` times.
+
+    Returns:
+        dict: The median load and serialize times per 1,000 rows in milliseconds, and the payload size.
+    """
+    load_times, dump_times = [], []
+    with app.app_context():
+        for _ in range(repeat):
+            db.session.expunge_all()
+            started = time.perf_counter()
+            query = SCHEMAS['interactions'].query(Interaction.query, fields) if fields else Interaction.query
+            loaded = query.order_by(Interaction.id).limit(rows).all()
+            loaded_at = time.perf_counter()
+            payload = serialize(loaded, provider)
+            finished = time.perf_counter()
+            load_times.append((loaded_at - started) * 1000 * 1000 / rows)
+            dump_times.append((finished - loaded_at) * 1000 * 1000 / rows)
+        db.session.remove()
+    return {
+        'load_ms_per_1000': round(statistics.median(load_times), 3),
+        'serialize_ms_per_1000': round(statistics.median(dump_times), 3),
+        'payload_bytes': len(payload.encode())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--notes-bytes', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write the results to this file as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + os.path.join(tmp, 'serialize.db'))
+        monkeypatch.setattr(Config, 'METRICS_ENABLED', False)
+        app = create_app()
+        monkeypatch.undo()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(Customer(id=1, first_name='Bench', last_name='Reader', email='reader@example.com'))
+            db.session.flush()
+            start = datetime(2024, 1, 1)
+            notes = ('Discussed the renewal and the open invoices. ' * (args.notes_bytes // 46 + 1))[:args.notes_bytes]
+            db.session.execute(Interaction.__table__.insert(), [
+                {'customer_id': 1, 'notes': notes, 'created_at': start + timedelta(minutes=n)}
+                for n in range(args.rows)
+            ])
+            db.session.commit()
+
+        modes = {
+            'handwritten': (DefaultJSONProvider(app), None, handwritten),
+            'schema': (FastJSONProvider(app), None, schema_dump(None)),
+            'sparse': (FastJSONProvider(app), SPARSE_FIELDS, schema_dump(SPARSE_FIELDS))
+        }
+        results = {}
+        for mode, (provider, fields, serialize) in modes.items():
+            results[mode] = result = time_mode(app, provider, fields, serialize, args.rows, args.repeat)
+            print(f"{mode}: load {result['load_ms_per_1000']}ms, serialize {result['serialize_ms_per_1000']}ms "
+                  f"per 1000 rows, {result['payload_bytes']} bytes")
+
+        with app.app_context():
+            db.engine.dispose()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': args.rows, 'notes_bytes': args.notes_bytes, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
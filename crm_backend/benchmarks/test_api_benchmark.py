@@ -0,0 +1,162 @@
+"""
+Latency and throughput benchmarks of the REST API routes.
+
+The benchmarks are skipped unless CRM_BENCHMARK is set, as seeding takes a while:
+
+    CRM_BENCHMARK=1 python -m pytest -q crm_backend/benchmarks/test_api_benchmark.py
+
+Environment variables:
+    CRM_BENCHMARK_VOLUMES: Comma-separated customer counts to seed (default '10000';
+        e.g. '10000,1000000'). Child tables get a fixed number of rows per customer.
+    CRM_BENCHMARK_REQUESTS: Timed requests per route (default 200).
+    CRM_BENCHMARK_DATABASE_URL: Database to seed; its tables are dropped and recreated
+        (default: a temporary SQLite file).
+    CRM_BENCHMARK_OUTPUT: JSON file the results are written to (default 'bench_results.json').
+
+Each route gets the p50, p95 and p99 latency in milliseconds and the throughput in
+requests per second. Compare two result files with ``crm_backend.benchmarks.compare``.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+import pytest
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from crm_backend.backend_app import create_app, db
+from crm_backend.config import Config
+from crm_backend.benchmarks.seed import seed
+
+pytestmark = pytest.mark.skipif(not os.getenv('CRM_BENCHMARK'), reason='set CRM_BENCHMARK=1 to run benchmarks')
+
+VOLUMES = [int(v) for v in os.getenv('CRM_BENCHMARK_VOLUMES', '10000').split(',')]
+REQUESTS = int(os.getenv('CRM_BENCHMARK_REQUESTS', '200'))
+OUTPUT = os.getenv('CRM_BENCHMARK_OUTPUT', 'bench_results.json')
+
+# Rows per customer in each child table
+PER_CUSTOMER = {'sales_leads': 3, 'interactions': 5, 'support_tickets': 2}
+
+results = {}
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at ``fraction`` of a sorted list using the nearest-rank method."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def commit_hash():
+    """Return the current git commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@pytest.fixture(scope='module', params=VOLUMES, ids=lambda v: f'{v}_customers')
+def seeded(request, tmp_path_factory):
+    """Create the app on a database seeded with the requested number of customers."""
+    customers = request.param
+    database_url = os.getenv('CRM_BENCHMARK_DATABASE_URL') or \
+        'sqlite:///' + str(tmp_path_factory.mktemp('bench') / 'bench.db')
+
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', database_url)
+    app = create_app()
+    monkeypatch.undo()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as connection:
+            seed(connection, customers, PER_CUSTOMER)
+        token = create_access_token(identity='1')
+
+    yield app, {"Authorization": f"Bearer {token}"}, customers
+
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture(scope='module', autouse=True)
+def write_results():
+    """Write the collected results as JSON once the benchmarks have run."""
+    yield
+    if not results:
+        return
+    with open(OUTPUT, 'w') as f:
+        json.dump({
+            'commit': commit_hash(),
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'requests_per_route': REQUESTS,
+            'per_customer': PER_CUSTOMER,
+            'results': results
+        }, f, indent=2, sort_keys=True)
+
+
+def customer_payload(n):
+    """Return the body of a customer creation request with a unique email."""
+    return {'first_name': 'Bench', 'last_name': f'Customer{n}', 'email': f'bench{n}-{time.time_ns()}@example.com'}
+
+
+# (name, method, URL template, JSON body factory) of every benchmarked route. URL templates
+# are formatted with row IDs spread over the seeded range ({id}, {id2}, {id3}) and a page
+# halfway through the customer list ({deep_page}).
+ROUTES = [
+    ('customers.list', 'GET', '/customers/?page=1&per_page=10', None),
+    ('customers.list_deep_page', 'GET', '/customers/?page={deep_page}&per_page=10', None),
+    ('customers.list_cursor', 'GET', '/customers/?sort=created_at&per_page=10', None),
+    ('customers.search', 'GET', '/customers/?search=Last{id}', None),
+    ('customers.detail', 'GET', '/customers/{id}', None),
+    ('customers.overview', 'GET', '/customers/{id}/overview', None),
+    ('customers.overview_batch', 'GET', '/customers/overview?ids={id},{id2},{id3}', None),
+    ('customers.create', 'POST', '/customers/', customer_payload),
+    ('sales_leads.list', 'GET', '/sales_leads/?status=won', None),
+    ('sales_leads.list_by_customer', 'GET', '/sales_leads/?customer_id={id}', None),
+    ('sales_leads.detail', 'GET', '/sales_leads/{id}', None),
+    ('sales_leads.facets', 'GET', '/sales_leads/facets', None),
+    ('sales_leads.create', 'POST', '/sales_leads/', lambda n: {'customer_id': 1, 'status': 'new'}),
+    ('interactions.list', 'GET', '/interactions/', None),
+    ('interactions.list_by_customer', 'GET', '/interactions/?customer_id={id}', None),
+    ('interactions.detail', 'GET', '/interactions/{id}', None),
+    ('interactions.create', 'POST', '/interactions/', lambda n: {'customer_id': 1, 'notes': f'Call {n}'}),
+    ('support_tickets.list', 'GET', '/support_tickets/?status=active', None),
+    ('support_tickets.detail', 'GET', '/support_tickets/{id}', None),
+    ('support_tickets.status', 'GET', '/support_tickets/status', None),
+    ('support_tickets.facets', 'GET', '/support_tickets/facets?customer_id={id}', None),
+    ('support_tickets.create', 'POST', '/support_tickets/',
+     lambda n: {'customer_id': 1, 'description': 'Benchmark ticket', 'status': 'active'}),
+    ('workers.list', 'GET', '/workers/', None),
+    ('export.sales_leads_by_customer', 'GET', '/export/sales_leads?customer_id={id}', None),
+]
+
+
+@pytest.mark.parametrize('name, method, url, body', ROUTES, ids=[r[0] for r in ROUTES])
+def test_route_latency(seeded, name, method, url, body):
+    """Time ``REQUESTS`` requests to one route and record their latency percentiles and throughput."""
+    app, headers, customers = seeded
+    client = app.test_client()
+    timings = []
+
+    started = time.perf_counter()
+    for n in range(REQUESTS):
+        target = url.format(id=(n * 7919) % customers + 1, id2=(n * 104729) % customers + 1,
+                            id3=(n * 1299709) % customers + 1, deep_page=max(1, customers // 20))
+        request_started = time.perf_counter()
+        response = client.open(target, method=method, headers=headers,
+                               json=body(n) if body else None)
+        response.get_data()
+        timings.append((time.perf_counter() - request_started) * 1000)
+        assert response.status_code < 400, f'{name} returned {response.status_code}'
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    results.setdefault(f'{customers}_customers', {})[name] = {
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'throughput_rps': round(REQUESTS / elapsed, 1)
+    }
@@ -0,0 +1,211 @@
+from collections import Counter
+from flask import request, jsonify
+from sqlalchemy import delete, func, select, update
+from crm_backend.db import db
+from crm_backend.models import SalesLead, SupportTicket
+from crm_backend.cache import invalidate
+from crm_backend.filters import parse_date
+from crm_backend.facets import FACET_MODELS, adjust_status_count
+from crm_backend.search import SEARCH_MODELS, reindex_documents
+from crm_backend.rollups import forget_activity
+from crm_backend.changes import record_changes_from
+
+# Entities with bulk endpoints, keyed by table name: (model, columns a bulk update may set)
+BULK_MODELS = {
+    'sales_leads': (SalesLead, ('status',)),
+    'support_tickets': (SupportTicket, ('status', 'description'))
+}
+
+# Rows changed per statement and transaction
+BULK_CHUNK_SIZE = 500
+
+# Keys accepted in the 'filter' of a bulk request
+FILTER_KEYS = ('customer_id', 'status', 'start_date', 'end_date')
+
+
+def bulk_conditions(model, data):
+    """
+    Build the WHERE conditions of a bulk request body.
+
+    The body selects rows either with 'ids', a list of IDs, or with 'filter', an
+    object with any of 'customer_id', 'status', 'start_date' and 'end_date'. An
+    empty filter is rejected so a malformed request cannot change the whole table.
+
+    Args:
+        model (db.Model): The model being changed.
+        data (dict): The JSON request body.
+
+    Returns:
+        tuple: The sorted list of requested IDs (or None for a filter) and the list of conditions.
+
+    Raises:
+        ValueError: If neither or both selections are given, or a value is invalid.
+    """
+    ids, filters = data.get('ids'), data.get('filter')
+    if (ids is None) == (filters is None):
+        raise ValueError("Provide exactly one of 'ids' or 'filter'")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(id, int) and not isinstance(id, bool) for id in ids):
+            raise ValueError("'ids' must be a list of integers")
+        return sorted(set(ids)), []
+
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError("'filter' must be an object with at least one of: " + ', '.join(FILTER_KEYS))
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+
+    conditions = []
+    if 'customer_id' in filters:
+        if not isinstance(filters['customer_id'], int):
+            raise ValueError("'customer_id' must be an integer")
+        conditions.append(model.customer_id == filters['customer_id'])
+    if 'status' in filters:
+        if not isinstance(filters['status'], str):
+            raise ValueError("'status' must be a string")
+        conditions.append(model.status == filters['status'])
+    for key in ('start_date', 'end_date'):
+        if filters.get(key) is not None and not isinstance(filters[key], str):
+            raise ValueError(f"'{key}' must be a date string, YYYY-MM-DD or an ISO 8601 datetime")
+    start = parse_date(filters.get('start_date'))
+    end = parse_date(filters.get('end_date'), end=True)
+    if start:
+        conditions.append(model.created_at >= start)
+    if end:
+        conditions.append(model.created_at < end)
+    return None, conditions
+
+
+def id_chunks(model, ids, conditions):
+    """
+    Yield the IDs to change in chunks of at most ``BULK_CHUNK_SIZE``.
+
+    Filters are resolved one chunk at a time by seeking on the primary key, so no
+    chunk scans rows that an earlier chunk already covered.
+    """
+    if ids is not None:
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            yield ids[start:start + BULK_CHUNK_SIZE]
+        return
+
+    last_id = 0
+    while True:
+        chunk = db.session.scalars(
+            select(model.id).where(model.id > last_id, *conditions).order_by(model.id).limit(BULK_CHUNK_SIZE)
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def status_deltas(entity, model, chunk, conditions):
+    """Return the number of rows per status among the rows of ``chunk`` that still match."""
+    if entity not in FACET_MODELS:
+        return Counter()
+    rows = db.session.execute(
+        select(model.status, func.count()).where(model.id.in_(chunk), *conditions).group_by(model.status)
+    ).all()
+    return Counter(dict(rows))
+
+
+def apply_bulk(entity, data, values=None):
+    """
+    Update or delete the rows selected by a bulk request body, one chunk at a time.
+
+    Each chunk is one set-based UPDATE or DELETE committed together with its status
+    count adjustments, activity rollup deltas, change log entries and search index
+    entries, so transactions and locks stay short however many rows are selected.
+    The matching conditions are repeated in every statement, so rows changed by
+    another request in the meantime are skipped rather than overwritten. Cached
+    responses are invalidated once at the end, and also when a chunk fails after
+    earlier chunks were committed. Status counts are only adjusted by deletes and
+    by updates that set the status.
+
+    Args:
+        entity (str): A key of ``BULK_MODELS``.
+        data (dict): The JSON request body with 'ids' or 'filter'.
+        values (dict): The column values to set, or None to delete the rows.
+
+    Returns:
+        int: The number of updated or deleted rows.
+    """
+    model = BULK_MODELS[entity][0]
+    ids, conditions = bulk_conditions(model, data)
+    changes_status = values is None or 'status' in values
+    affected = 0
+
+    try:
+        for chunk in id_chunks(model, ids, conditions):
+            counts = status_deltas(entity, model, chunk, conditions) if changes_status else Counter()
+            where = (model.id.in_(chunk), *conditions)
+            record_changes_from(entity, 'update' if values is not None else 'delete', select(model.id).where(*where))
+            if values is None:
+                forget_activity(entity, *where)
+                stmt = delete(model).where(*where)
+            else:
+                stmt = update(model).where(*where).values(values)
+            result = db.session.execute(stmt.execution_options(synchronize_session=False))
+            affected += result.rowcount
+
+            new_status = values.get('status') if values is not None else None
+            for status, count in counts.items():
+                if status != new_status:
+                    adjust_status_count(entity, status, -count)
+                    adjust_status_count(entity, new_status, count)
+            if entity in SEARCH_MODELS and (values is None or SEARCH_MODELS[entity][1] in values):
+                reindex_documents(entity, chunk)
+
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        if affected:
+            invalidate(entity)
+        raise
+
+    invalidate(entity)
+    return affected
+
+
+def bulk_response(entity, label):
+    """
+    Build the JSON response of a bulk PATCH or DELETE route from the current request.
+
+    PATCH bodies carry the new column values in 'values'. Both methods select
+    their rows with 'ids' or 'filter', see ``bulk_conditions``.
+
+    Args:
+        entity (str): A key of ``BULK_MODELS``.
+        label (str): The plural name used in messages, e.g. 'Sales leads'.
+
+    Returns:
+        Response: The number of 'updated' or 'deleted' rows.
+    """
+    data = request.get_json(silent=True) or {}
+    deleting = request.method == 'DELETE'
+    values = None
+
+    if not deleting:
+        allowed = BULK_MODELS[entity][1]
+        values = data.get('values')
+        if not isinstance(values, dict) or not values:
+            return jsonify({'message': f"Missing 'values', expected any of: {', '.join(allowed)}"}), 400
+        unknown = set(values) - set(allowed)
+        if unknown:
+            return jsonify({'message': f"Cannot bulk update: {', '.join(sorted(unknown))}"}), 400
+        wrong_type = sorted(key for key, value in values.items() if not isinstance(value, str))
+        if wrong_type:
+            return jsonify({'message': f"Expected strings for: {', '.join(wrong_type)}"}), 400
+        if 'status' in values and not values['status']:
+            return jsonify({'message': 'Status cannot be empty'}), 400
+
+    action = 'deleted' if deleting else 'updated'
+    try:
+        affected = apply_bulk(entity, data, values)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': f'Error in bulk {action[:-1]} of {label.lower()}', 'error': str(e)}), 500
+
+    return jsonify({action: affected, 'message': f'{label} {action} successfully'})
@@ -0,0 +1,259 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request, make_response
+
+
+class MemoryCacheStore:
+    """
+    Process-local LRU store of serialized responses with a TTL per entry.
+
+    Each entity has a version that ``bump`` increments; the versions of the
+    entities a response depends on are part of its cache key, so bumping a
+    version makes every response built from the old data unreachable.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return the unexpired entry stored under ``key``, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl):
+        """Store ``entry`` under ``key`` for ``ttl`` seconds, evicting the least recently used entries."""
+        with self.lock:
+            self.entries[key] = dict(entry, expires_at=time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_versions(self, entities):
+        """Return the ``(version, modified_at)`` pair of each entity."""
+        with self.lock:
+            return [self.versions.get(entity, (0, 0.0)) for entity in entities]
+
+    def bump(self, entity):
+        """Invalidate every cached response that depends on ``entity``."""
+        with self.lock:
+            version, _ = self.versions.get(entity, (0, 0.0))
+            self.versions[entity] = (version + 1, time.time())
+
+
+class SQLiteCacheStore:
+    """
+    LRU store of serialized responses kept in a SQLite file.
+
+    Several worker processes can point at the same file to share cached
+    responses and entity versions, so a write handled by one process
+    invalidates the responses cached by the others.
+    """
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        with self.connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache ('
+                'key TEXT PRIMARY KEY, body BLOB, mimetype TEXT, etag TEXT, '
+                'last_modified REAL, expires_at REAL, accessed_at REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at '
+                               'ON response_cache (accessed_at)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_versions ('
+                'entity TEXT PRIMARY KEY, version INTEGER NOT NULL, modified_at REAL NOT NULL)'
+            )
+
+    def connect(self):
+        """Return this thread's connection to the cache file."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Return the unexpired entry stored under ``key``, or None."""
+        connection = self.connect()
+        row = connection.execute(
+            'SELECT body, mimetype, etag, last_modified, expires_at FROM response_cache WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None or row[4] < time.time():
+            return None
+        connection.execute('UPDATE response_cache SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        return {'body': row[0], 'mimetype': row[1], 'etag': row[2], 'last_modified': row[3]}
+
+    def set(self, key, entry, ttl):
+        """Store ``entry`` under ``key`` for ``ttl`` seconds, evicting the least recently used entries."""
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO response_cache '
+                '(key, body, mimetype, etag, last_modified, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, entry['body'], entry['mimetype'], entry['etag'], entry['last_modified'], now + ttl, now)
+            )
+            connection.execute('DELETE FROM response_cache WHERE expires_at < ?', (now,))
+            connection.execute(
+                'DELETE FROM response_cache WHERE key IN ('
+                'SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def get_versions(self, entities):
+        """Return the ``(version, modified_at)`` pair of each entity."""
+        rows = dict(
+            (entity, (version, modified_at)) for entity, version, modified_at in self.connect().execute(
+                'SELECT entity, version, modified_at FROM cache_versions WHERE entity IN (%s)'
+                % ','.join('?' * len(entities)), entities
+            )
+        )
+        return [rows.get(entity, (0, 0.0)) for entity in entities]
+
+    def bump(self, entity):
+        """Invalidate every cached response that depends on ``entity``."""
+        self.connect().execute(
+            'INSERT INTO cache_versions (entity, version, modified_at) VALUES (?, 1, ?) '
+            'ON CONFLICT (entity) DO UPDATE SET version = version + 1, modified_at = excluded.modified_at',
+            (entity, time.time())
+        )
+
+
+# Cache backends selectable with the RESPONSE_CACHE setting
+CACHE_STORES = {
+    'memory': lambda config: MemoryCacheStore(config['RESPONSE_CACHE_MAX_ENTRIES']),
+    'sqlite': lambda config: SQLiteCacheStore(config['RESPONSE_CACHE_PATH'], config['RESPONSE_CACHE_MAX_ENTRIES'])
+}
+
+# Time the cache was created, used as Last-Modified until an entity is first written
+STARTED_AT = time.time()
+
+# Guards the lazy creation of the store
+store_lock = threading.Lock()
+
+
+def init_cache(app):
+    """
+    Resolve the path of the SQLite response cache against the instance folder.
+
+    The store itself is created on first use, so tests can change the
+    RESPONSE_CACHE settings after ``create_app``.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    if not app.config['RESPONSE_CACHE_PATH']:
+        app.config['RESPONSE_CACHE_PATH'] = os.path.join(app.instance_path, 'response_cache.db')
+    app.extensions['response_cache'] = None
+
+
+def get_cache_store():
+    """Return the response cache store of the current app, or None if caching is disabled."""
+    extensions = current_app.extensions
+    backend = current_app.config['RESPONSE_CACHE']
+    store = extensions.get('response_cache')
+    if store is None and backend in CACHE_STORES:
+        with store_lock:
+            store = extensions.get('response_cache')
+            if store is None:
+                if backend == 'sqlite':
+                    os.makedirs(os.path.dirname(os.path.abspath(current_app.config['RESPONSE_CACHE_PATH'])),
+                                exist_ok=True)
+                store = extensions['response_cache'] = CACHE_STORES[backend](current_app.config)
+    return store
+
+
+def invalidate(*entities):
+    """
+    Invalidate the cached responses that depend on any of ``entities``.
+
+    Call this from write handlers after their commit succeeded.
+
+    Args:
+        *entities (str): Table names, e.g. 'customers' or 'support_tickets'.
+    """
+    store = get_cache_store()
+    if store is not None:
+        for entity in entities:
+            store.bump(entity)
+
+
+def cached(*entities):
+    """
+    Cache the successful responses of a GET handler and answer conditional requests.
+
+    Responses are keyed on the request path, the query string and the versions of
+    ``entities``. They carry an ``ETag`` (a hash of the body) and a ``Last-Modified``
+    (the time any of ``entities`` was last written, rounded up to the second), and
+    requests whose ``If-None-Match`` or ``If-Modified-Since`` still match are answered
+    with 304. When both are sent only ``If-None-Match`` is used.
+    Streamed responses are buffered on a miss, since the stored body must be complete;
+    they are only streamed to the client while the cache is disabled.
+    Apply it below ``jwt_required`` so authentication is still checked on cache hits.
+
+    Args:
+        *entities (str): The tables the response is built from.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            store = get_cache_store()
+            if store is None:
+                return view(*args, **kwargs)
+
+            versions = store.get_versions(entities)
+            query = '&'.join(sorted(request.query_string.decode().split('&')))
+            key = f"{request.path}?{query}|" + ','.join(str(version) for version, _ in versions)
+
+            entry = store.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+                    'last_modified': max([modified for _, modified in versions] + [STARTED_AT])
+                }
+                # A replica may not have caught up with a recent write yet, so its
+                # response must not be cached under the new versions
+                if not (g.get('read_from_replica') and
+                        time.time() - entry['last_modified'] < current_app.config['READ_REPLICA_STICKY_SECONDS']):
+                    store.set(key, entry, current_app.config['RESPONSE_CACHE_TTL'])
+            else:
+                response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+
+            response.set_etag(entry['etag'])
+            # HTTP dates have whole seconds. A truncated Last-Modified would let a client
+            # that saw it before another write in the same second get a 304, so it is
+            # rounded up, and only sent once that second is over.
+            last_modified = math.ceil(entry['last_modified'])
+            if last_modified <= time.time():
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
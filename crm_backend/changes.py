@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from flask import request, jsonify
+from sqlalchemy import delete, func, insert, literal, select, update
+from crm_backend.db import db
+from crm_backend.models import Change, ChangeLogState
+
+# Entities whose changes are logged, keyed by table name
+CHANGE_ENTITIES = ('customers', 'sales_leads', 'interactions', 'support_tickets', 'analytics', 'workers')
+
+ACTIONS = ('create', 'update', 'delete')
+
+CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 1000
+
+CHANGE_COLUMNS = ('entity', 'entity_id', 'action', 'changed_at')
+
+
+def record_change(entity, action, *ids):
+    """
+    Append changes of rows of an entity to the change log in the current transaction.
+
+    Call this from a write handler before it commits, after a flush for created
+    rows, so the log entries and the row changes are committed together.
+
+    Args:
+        entity (str): One of ``CHANGE_ENTITIES``.
+        action (str): One of ``ACTIONS``.
+        *ids: The primary keys of the changed rows.
+    """
+    if ids:
+        changed_at = datetime.utcnow()
+        db.session.execute(insert(Change.__table__), [
+            {'entity': entity, 'entity_id': id, 'action': action, 'changed_at': changed_at} for id in ids
+        ])
+
+
+def record_changes_from(entity, action, ids):
+    """
+    Append changes of the rows selected by a query with one INSERT ... SELECT in the current transaction.
+
+    Used by set-based writes, such as bulk updates and cascading deletes, that never
+    load the changed rows. Call it before the write, while the rows still match.
+
+    Args:
+        entity (str): One of ``CHANGE_ENTITIES``.
+        action (str): One of ``ACTIONS``.
+        ids (Select): A query selecting the primary keys of the changed rows.
+    """
+    ids = ids.subquery()
+    db.session.execute(insert(Change.__table__).from_select(CHANGE_COLUMNS, select(
+        literal(entity), ids.c[0], literal(action), literal(datetime.utcnow())
+    )))
+
+
+def get_horizon():
+    """Return the sequence number up to which changes were compacted away, 0 if none were."""
+    return db.session.scalar(select(ChangeLogState.horizon).where(ChangeLogState.id == 1)) or 0
+
+
+def compact_changes(max_age=timedelta(hours=24), max_entries=100000):
+    """
+    Keep the change log bounded.
+
+    Changes older than ``max_age`` and all but the newest ``max_entries`` are
+    dropped, and the horizon is raised past them so clients that fell behind it
+    are told to reload. The remaining changes of a row are then merged into its
+    latest one: a client applying changes after any sequence number still sees
+    the latest change of every row changed since.
+
+    Args:
+        max_age (timedelta): How long changes are kept.
+        max_entries (int): The maximum number of changes kept.
+
+    Returns:
+        tuple: The horizon and the numbers of expired and merged changes.
+    """
+    table = Change.__table__
+    latest = db.session.scalar(select(func.max(table.c.seq))) or 0
+    cutoff = max(
+        db.session.scalar(select(func.max(table.c.seq)).where(table.c.changed_at < datetime.utcnow() - max_age)) or 0,
+        latest - max_entries
+    )
+
+    expired = 0
+    horizon = get_horizon()
+    if cutoff > horizon:
+        expired = db.session.execute(delete(table).where(table.c.seq <= cutoff)).rowcount
+        horizon = cutoff
+        values = {'horizon': horizon, 'compacted_at': datetime.utcnow()}
+        if not db.session.execute(update(ChangeLogState).where(ChangeLogState.id == 1).values(values)).rowcount:
+            db.session.execute(insert(ChangeLogState).values(id=1, **values))
+
+    later = Change.__table__.alias('later')
+    merged = db.session.execute(delete(table).where(
+        select(later.c.seq).where(later.c.entity == table.c.entity, later.c.entity_id == table.c.entity_id,
+                                  later.c.seq > table.c.seq).exists()
+    )).rowcount
+
+    db.session.commit()
+    return horizon, expired, merged
+
+
+def changes_response():
+    """
+    Build the JSON response of the change feed from the request arguments.
+
+    Clients read 'next_since' once before loading a list, then poll with it and
+    refetch or drop the rows named in 'changes'. When a client fell behind the
+    compacted part of the log the response is 410 and the client must reload.
+    Applying a change must be idempotent: on PostgreSQL concurrent transactions can
+    commit out of sequence order, so clients should re-read a little before
+    'next_since' from time to time.
+
+    Query parameters:
+        since (int): The 'next_since' of the previous response; without it only the
+            current position is returned.
+        entities (str): Comma-separated entities (default is all of ``CHANGE_ENTITIES``).
+        limit (int): The maximum number of changes (default is 500, at most 1000).
+
+    Returns:
+        Response: The 'changes' after 'since' in sequence order, 'next_since' and 'has_more'.
+    """
+    entities = [entity for entity in request.args.get('entities', ','.join(CHANGE_ENTITIES)).split(',') if entity]
+    unknown = [entity for entity in entities if entity not in CHANGE_ENTITIES]
+    if unknown or not entities:
+        return jsonify({'message': f"Invalid entities, expected any of: {', '.join(CHANGE_ENTITIES)}"}), 400
+
+    if 'since' not in request.args:
+        latest = db.session.scalar(select(func.max(Change.seq))) or get_horizon()
+        return jsonify({'changes': [], 'next_since': latest, 'has_more': False})
+
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({'message': "'since' must be a non-negative integer"}), 400
+    horizon = get_horizon()
+    if since < horizon:
+        return jsonify({'message': 'Changes since this position were compacted, reload the data',
+                        'horizon': horizon}), 410
+
+    limit = min(max(request.args.get('limit', CHANGES_LIMIT, type=int), 1), MAX_CHANGES_LIMIT)
+    stmt = select(Change.seq, Change.entity, Change.entity_id, Change.action, Change.changed_at).where(
+        Change.seq > since
+    )
+    if len(entities) < len(CHANGE_ENTITIES):
+        stmt = stmt.where(Change.entity.in_(entities))
+    rows = db.session.execute(stmt.order_by(Change.seq).limit(limit + 1)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({
+        'changes': [{'seq': seq, 'entity': entity, 'id': entity_id, 'action': action,
+                     'changed_at': changed_at.isoformat(' ', 'seconds')}
+                    for seq, entity, entity_id, action, changed_at in rows],
+        'next_since': rows[-1].seq if rows else since,
+        'has_more': has_more
+    })
@@ -0,0 +1,108 @@
+import zlib
+from flask import request
+
+# Content-Encoding values in order of preference, with the zlib window bits of their format
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'image/svg+xml'
+)
+
+
+def is_compressible(mimetype):
+    """
+    Return True if responses of ``mimetype`` are worth compressing.
+
+    Event streams are left alone: their events are small, and a compressor per
+    long-lived connection would hold its buffers for as long as the stream is open.
+    """
+    return bool(mimetype) and mimetype != 'text/event-stream' and \
+        (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def compress_chunks(chunks, encoding, level):
+    """
+    Compress an iterable of response chunks as they are produced.
+
+    Each chunk is flushed, so a client receives every chunk of a streamed
+    response as soon as it is generated instead of when the stream ends.
+
+    Yields:
+        bytes: The compressed data.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response, min_size, level):
+    """
+    Compress a response with the encoding the client prefers, if any.
+
+    Buffered responses smaller than ``min_size`` bytes are sent as they are, since
+    compressing them costs more time than it saves. Streamed responses have no
+    known size and are always compressed, chunk by chunk. The ETag of a compressed
+    response becomes weak, so conditional requests still match the cached entity.
+
+    Args:
+        response (Response): The response to compress.
+        min_size (int): The smallest buffered body worth compressing, in bytes.
+        level (int): The zlib compression level, 1 (fastest) to 9 (smallest).
+
+    Returns:
+        Response: The same response, compressed or not.
+    """
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODINGS))
+    if encoding is None or request.method == 'HEAD':
+        return response
+
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(b''.join(compress_chunks([data], encoding, level)))
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """
+    Compress JSON, NDJSON, CSV and text responses for clients that accept gzip or deflate.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    if not app.config['COMPRESSION_ENABLED']:
+        return
+
+    @app.after_request
+    def compress(response):
+        return compress_response(response, app.config['COMPRESSION_MIN_SIZE'], app.config['COMPRESSION_LEVEL'])
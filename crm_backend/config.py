@@ -1,5 +1,18 @@
 import os
 
+
+def optional_int(name):
+    """Return the integer value of an environment variable, or None if it is unset."""
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def optional_bool(name):
+    """Return the boolean value of an environment variable, or None if it is unset."""
+    value = os.getenv(name)
+    return value == 'True' if value else None
+
+
 class Config:
     """Base configuration class for the application.
 
@@ -17,6 +30,57 @@ class Config:
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'app.log')
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
+    RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'none')  # 'none', 'memory' or 'sqlite'
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '60'))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH')  # Defaults to instance/response_cache.db
+    SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', 'False') == 'True'
+    SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+    INSTRUMENTATION_LOG_FILE = os.getenv('INSTRUMENTATION_LOG_FILE', 'instrumentation.log')
+    # /metrics exposes route and database timings; when METRICS_TOKEN is set scrapers
+    # must send it as 'Authorization: Bearer <token>'
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    # Engine tuning profile, see crm_backend.engine.ENGINE_PROFILES; the settings
+    # below override single values of the profile when set
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'development')
+    DB_POOL_SIZE = optional_int('DB_POOL_SIZE')
+    DB_MAX_OVERFLOW = optional_int('DB_MAX_OVERFLOW')
+    DB_POOL_TIMEOUT = optional_int('DB_POOL_TIMEOUT')
+    DB_POOL_RECYCLE = optional_int('DB_POOL_RECYCLE')
+    DB_POOL_PRE_PING = optional_bool('DB_POOL_PRE_PING')
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS')
+    SQLITE_BUSY_TIMEOUT = optional_int('SQLITE_BUSY_TIMEOUT')
+    SQLITE_CACHE_SIZE = optional_int('SQLITE_CACHE_SIZE')
+    SQLITE_MMAP_SIZE = optional_int('SQLITE_MMAP_SIZE')
+    # Comma-separated read replica URLs that GET requests read from
+    READ_REPLICA_URLS = [url for url in os.getenv('READ_REPLICA_URLS', '').split(',') if url]
+    READ_REPLICA_STICKY_SECONDS = float(os.getenv('READ_REPLICA_STICKY_SECONDS', '5'))
+    # Commit interaction, lead and ticket creates in batches from a single writer thread
+    GROUP_COMMIT = os.getenv('GROUP_COMMIT', 'False') == 'True'
+    GROUP_COMMIT_MAX_BATCH = int(os.getenv('GROUP_COMMIT_MAX_BATCH', '256'))
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv('GROUP_COMMIT_MAX_DELAY_MS', '5'))
+    GROUP_COMMIT_TIMEOUT = float(os.getenv('GROUP_COMMIT_TIMEOUT', '10'))
+    # Rows deleted per transaction by 'DELETE /customers/<id>?async=true'
+    CUSTOMER_PURGE_CHUNK_SIZE = int(os.getenv('CUSTOMER_PURGE_CHUNK_SIZE', '1000'))
+    # gzip/deflate compression of responses of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))
+    # Columnar snapshots written by 'snapshot' and read by the /reports endpoints
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR')  # Defaults to instance/snapshots
+    SNAPSHOT_KEEP = int(os.getenv('SNAPSHOT_KEEP', '2'))
+    # Retention of the change log behind /changes, applied by 'compact_changes'
+    CHANGE_LOG_RETENTION_HOURS = float(os.getenv('CHANGE_LOG_RETENTION_HOURS', '24'))
+    CHANGE_LOG_MAX_ENTRIES = int(os.getenv('CHANGE_LOG_MAX_ENTRIES', '100000'))
+    # Live ticket status counts at /support_tickets/status/stream; the poll picks up
+    # writes made by other worker processes
+    STATUS_STREAM_POLL_SECONDS = float(os.getenv('STATUS_STREAM_POLL_SECONDS', '5'))
+    STATUS_STREAM_HEARTBEAT_SECONDS = float(os.getenv('STATUS_STREAM_HEARTBEAT_SECONDS', '15'))
+    # Lifetime of the stream tokens EventSource clients pass in the URL
+    STATUS_STREAM_TOKEN_SECONDS = int(os.getenv('STATUS_STREAM_TOKEN_SECONDS', '60'))
 
 
 class DevelopmentConfig(Config):
@@ -27,6 +91,7 @@ class DevelopmentConfig(Config):
     """
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DEV_DATABASE_URL', 'sqlite:///dev_crm.db')
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'development')
 
 
 class TestingConfig(Config):
@@ -37,6 +102,7 @@ class TestingConfig(Config):
     """
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///test_crm.db')
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'testing')
 
 
 class ProductionConfig(Config):
@@ -47,6 +113,7 @@ class ProductionConfig(Config):
     """
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///prod_crm.db')
     DEBUG = False
+    DB_ENGINE_PROFILE = os.getenv('DB_ENGINE_PROFILE', 'production')
 
 
 config_map = {
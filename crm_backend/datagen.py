@@ -0,0 +1,261 @@
+"""
+Synthetic data generation for local load testing.
+
+Customers are written in ID order and each customer's leads, interactions and
+tickets are generated right after it, so memory use is bounded by the chunk size
+however many rows are generated. Child counts follow a Pareto distribution (a few
+customers have very long histories, most have short ones), statuses follow
+weighted mixes that depend on the age of the row, and timestamps fall between the
+customer's creation and now with a bias towards recent activity.
+"""
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from crm_backend.db import db
+from crm_backend.models import Customer, SalesLead, Interaction, SupportTicket
+
+FIRST_NAMES = ('James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Aroosha', 'Wei', 'Fatima', 'Carlos', 'Yuki', 'Olga', 'Ahmed', 'Priya', 'Lars', 'Amara')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson',
+              'Khan', 'Chen', 'Nakamura', 'Ivanova', 'Okafor', 'Schmidt', 'Rossi', 'Novak', 'Patel', 'Berg')
+COMPANY_WORDS = ('Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay', 'Soylent',
+                 'Cyberdyne', 'Tyrell', 'Wonka', 'Gringotts', 'Oscorp', 'Monarch', 'Aperture')
+COMPANY_SUFFIXES = ('Inc.', 'LLC', 'GmbH', 'Ltd.', 'Group', 'Holdings', 'Systems', 'Labs')
+NOTES = (
+    'Called the customer to follow up on their last order.',
+    'Customer asked for a quote for the premium plan.',
+    'Left a voicemail about the renewal.',
+    'Demo of the reporting module went well; they want a trial.',
+    'Customer complained about delivery times.',
+    'Sent the updated contract for review.',
+    'Discussed onboarding of their new team members.',
+    'Customer requested an invoice correction.'
+)
+DESCRIPTIONS = (
+    'Cannot log in after the password reset.',
+    'Invoice shows the wrong billing address.',
+    'Export to CSV times out for large reports.',
+    'Mobile app crashes when opening the dashboard.',
+    'Requesting a refund for a duplicate charge.',
+    'Email notifications are not being delivered.'
+)
+
+# Status mixes as (status, weight); tickets older than TICKET_CLOSE_DAYS are mostly closed
+LEAD_STATUSES = (('new', 30), ('contacted', 25), ('qualified', 20), ('won', 10), ('lost', 15))
+RECENT_TICKET_STATUSES = (('active', 50), ('in process', 35), ('deactivated', 15))
+OLD_TICKET_STATUSES = (('active', 3), ('in process', 2), ('deactivated', 95))
+TICKET_CLOSE_DAYS = 30
+
+CHILD_MODELS = (SalesLead, Interaction, SupportTicket)
+
+
+def weighted(rng, choices):
+    """Pick a value from ``(value, weight)`` pairs."""
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def skewed_count(rng, mean, alpha):
+    """
+    Draw a non-negative count with the given mean from a Pareto distribution.
+
+    Args:
+        rng (Random): The random generator.
+        mean (float): The mean of the counts.
+        alpha (float): The Pareto shape; lower values give a heavier tail. Must be above 1.
+
+    Returns:
+        int: The count.
+    """
+    pareto_mean = alpha / (alpha - 1)
+    return int(rng.paretovariate(alpha) / pareto_mean * mean)
+
+
+def recent_timestamp(rng, since, now):
+    """Return a time between ``since`` and ``now``, biased towards ``now``."""
+    seconds = (now - since).total_seconds()
+    return since + timedelta(seconds=seconds * rng.random() ** 0.5)
+
+
+def generate_rows(rng, first_id, customers, means, alpha, years, now):
+    """
+    Generate customers and their child rows.
+
+    Args:
+        rng (Random): The random generator.
+        first_id (int): The ID of the first generated customer.
+        customers (int): The number of customers to generate.
+        means (dict): Maps each child model to its mean number of rows per customer.
+        alpha (float): The Pareto shape of the per-customer child counts.
+        years (float): How far back customer creation dates go.
+        now (datetime): The latest timestamp to generate.
+
+    Yields:
+        tuple: The model and a tuple of column values, in ``columns_of(model)`` order.
+    """
+    span = timedelta(days=365 * years)
+    for customer_id in range(first_id, first_id + customers):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        created_at = now - span * rng.random()
+        yield Customer, (
+            customer_id, first_name, last_name,
+            f'{first_name.lower()}.{last_name.lower()}.{customer_id}@example.com',
+            f'+1-555-{rng.randrange(10000):04d}',
+            f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}',
+            f'{rng.randrange(1, 9999)} {rng.choice(LAST_NAMES)} Street',
+            created_at
+        )
+
+        for _ in range(skewed_count(rng, means[SalesLead], alpha)):
+            yield SalesLead, (customer_id, weighted(rng, LEAD_STATUSES), recent_timestamp(rng, created_at, now))
+
+        for _ in range(skewed_count(rng, means[Interaction], alpha)):
+            yield Interaction, (customer_id, rng.choice(NOTES), recent_timestamp(rng, created_at, now))
+
+        for _ in range(skewed_count(rng, means[SupportTicket], alpha)):
+            opened_at = recent_timestamp(rng, created_at, now)
+            statuses = OLD_TICKET_STATUSES if now - opened_at > timedelta(days=TICKET_CLOSE_DAYS) \
+                else RECENT_TICKET_STATUSES
+            yield SupportTicket, (customer_id, rng.choice(DESCRIPTIONS), weighted(rng, statuses), opened_at)
+
+
+def columns_of(model):
+    """Return the names of the generated columns of a model."""
+    if model is Customer:
+        return ('id', 'first_name', 'last_name', 'email', 'phone', 'company', 'address', 'created_at')
+    if model is SalesLead:
+        return ('customer_id', 'status', 'created_at')
+    if model is Interaction:
+        return ('customer_id', 'notes', 'created_at')
+    return ('customer_id', 'description', 'status', 'created_at')
+
+
+def copy_rows(connection, model, rows):
+    """Load rows into a PostgreSQL table with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(columns_of(model))}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def driver_value(value):
+    """Return ``value`` in the text format SQLAlchemy stores datetimes in on SQLite."""
+    # sqlite3's default datetime adapter is deprecated since Python 3.12
+    return value.isoformat(' ') if isinstance(value, datetime) else value
+
+
+def insert_rows(connection, model, rows):
+    """Load rows with one multi-row executemany INSERT."""
+    columns = columns_of(model)
+    if connection.dialect.paramstyle == 'qmark':
+        placeholders = ', '.join('?' * len(columns))
+        connection.exec_driver_sql(
+            f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) VALUES ({placeholders})",
+            [tuple(driver_value(value) for value in row) for row in rows]
+        )
+    else:
+        connection.execute(model.__table__.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def generate_data(customers, means, alpha=1.5, years=3, chunk_size=50000, seed=None,
+                  keep_indexes=False, progress=print):
+    """
+    Generate customers with leads, interactions and tickets and bulk load them.
+
+    Rows are buffered per table and written ``chunk_size`` rows at a time, each
+    chunk in its own transaction. On PostgreSQL chunks are loaded with COPY; on
+    SQLite synchronous writes are turned off for the duration of the load. Unless
+    ``keep_indexes`` is set, the secondary indexes are dropped before the load and
+    rebuilt after it, which is much faster than maintaining them row by row. The
+    indexes and settings are restored even if the load fails partway.
+
+    Must be called inside an application context.
+
+    Args:
+        customers (int): The number of customers to generate.
+        means (dict): Maps each child model to its mean number of rows per customer.
+        alpha (float): The Pareto shape of the per-customer child counts.
+        years (float): How far back customer creation dates go.
+        chunk_size (int): The number of rows written per statement and transaction.
+        seed (int): Seed of the random generator, for reproducible data.
+        keep_indexes (bool): Maintain the secondary indexes during the load.
+        progress (callable): Called with progress messages.
+
+    Returns:
+        dict: The number of rows generated per table.
+    """
+    rng = random.Random(seed)
+    engine = db.engine
+    dialect = engine.dialect.name
+    load = copy_rows if dialect == 'postgresql' else insert_rows
+    tables = [model.__table__ for model in (Customer,) + CHILD_MODELS]
+    indexes = [] if keep_indexes else [index for table in tables for index in table.indexes]
+    counts = {model.__tablename__: 0 for model in (Customer,) + CHILD_MODELS}
+    started = time.perf_counter()
+
+    with engine.connect() as connection:
+        first_id = (connection.scalar(select(func.max(Customer.id))) or 0) + 1
+
+        if dialect == 'sqlite':
+            synchronous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+            connection.exec_driver_sql('PRAGMA synchronous=OFF')
+            connection.exec_driver_sql('PRAGMA temp_store=MEMORY')
+            connection.exec_driver_sql('PRAGMA cache_size=-262144')  # 256 MB
+        connection.commit()
+
+        buffers = {model: [] for model in (Customer,) + CHILD_MODELS}
+        pending = 0
+
+        def flush():
+            with connection.begin():
+                # Customers first so the children's foreign keys resolve
+                for model in (Customer,) + CHILD_MODELS:
+                    if buffers[model]:
+                        load(connection, model, buffers[model])
+                        counts[model.__tablename__] += len(buffers[model])
+                        buffers[model] = []
+
+        try:
+            with connection.begin():
+                for index in indexes:
+                    index.drop(connection, checkfirst=True)
+
+            for model, row in generate_rows(rng, first_id, customers, means, alpha, years, datetime.utcnow()):
+                buffers[model].append(row)
+                pending += 1
+                if pending >= chunk_size:
+                    flush()
+                    pending = 0
+                    progress(f"{sum(counts.values())} rows written "
+                             f"({sum(counts.values()) / (time.perf_counter() - started):.0f} rows/s)")
+            flush()
+        finally:
+            if connection.in_transaction():
+                connection.rollback()
+            if indexes:
+                progress('Rebuilding indexes...')
+                with connection.begin():
+                    for index in indexes:
+                        index.create(connection, checkfirst=True)
+            if dialect == 'sqlite':
+                connection.exec_driver_sql(f'PRAGMA synchronous={synchronous}')
+                connection.commit()
+
+        with connection.begin():
+            connection.execute(text('ANALYZE'))
+
+    progress(f"Generated {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
+    return counts
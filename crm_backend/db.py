@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from crm_backend.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 """ 
 db: SQLAlchemy
 
@@ -8,5 +9,6 @@ An instance of the SQLAlchemy class, used to interact with the database.
 
 This instance will be used throughout the application to define database models, perform queries, 
 and manage database connections. It provides a high-level abstraction over SQL and allows 
-for easy integration with Flask applications.
+for easy integration with Flask applications. Its sessions send the reads of GET requests
+to the read replicas when any are configured.
 """
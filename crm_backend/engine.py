@@ -0,0 +1,155 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from crm_backend.db import db
+
+# Engine tuning profiles selectable with DB_ENGINE_PROFILE. Pool settings apply to
+# every dialect with a queue pool; the sqlite_* settings are PRAGMAs run on each new
+# SQLite connection. 'default' leaves SQLAlchemy's and SQLite's defaults untouched.
+ENGINE_PROFILES = {
+    'default': {},
+    'development': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'sqlite_journal_mode': 'WAL',
+        'sqlite_synchronous': 'NORMAL',
+        'sqlite_busy_timeout': 5000,
+        'sqlite_cache_size': -16000,  # 16 MB
+        'sqlite_mmap_size': 64 * 1024 * 1024
+    },
+    'testing': {
+        'pool_size': 2,
+        'max_overflow': 5,
+        'pool_timeout': 10,
+        'pool_pre_ping': False,
+        'sqlite_journal_mode': 'WAL',
+        'sqlite_synchronous': 'OFF',
+        'sqlite_busy_timeout': 5000
+    },
+    'production': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'sqlite_journal_mode': 'WAL',
+        'sqlite_synchronous': 'NORMAL',
+        'sqlite_busy_timeout': 10000,
+        'sqlite_cache_size': -64000,  # 64 MB
+        'sqlite_mmap_size': 256 * 1024 * 1024
+    }
+}
+
+# Config keys that override a single setting of the selected profile
+SETTING_OVERRIDES = {
+    'pool_size': 'DB_POOL_SIZE',
+    'max_overflow': 'DB_MAX_OVERFLOW',
+    'pool_timeout': 'DB_POOL_TIMEOUT',
+    'pool_recycle': 'DB_POOL_RECYCLE',
+    'pool_pre_ping': 'DB_POOL_PRE_PING',
+    'sqlite_journal_mode': 'SQLITE_JOURNAL_MODE',
+    'sqlite_synchronous': 'SQLITE_SYNCHRONOUS',
+    'sqlite_busy_timeout': 'SQLITE_BUSY_TIMEOUT',
+    'sqlite_cache_size': 'SQLITE_CACHE_SIZE',
+    'sqlite_mmap_size': 'SQLITE_MMAP_SIZE'
+}
+
+POOL_SETTINGS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')
+SQLITE_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size')
+
+
+def resolve_settings(config):
+    """
+    Return the engine settings of the configured profile with the individual overrides applied.
+
+    Args:
+        config (dict): The app configuration.
+
+    Returns:
+        dict: The engine settings.
+
+    Raises:
+        ValueError: If DB_ENGINE_PROFILE is not a known profile.
+    """
+    profile = config.get('DB_ENGINE_PROFILE') or 'default'
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE '{profile}', expected one of {sorted(ENGINE_PROFILES)}")
+
+    settings = dict(ENGINE_PROFILES[profile])
+    for name, key in SETTING_OVERRIDES.items():
+        if config.get(key) is not None:
+            settings[name] = config[key]
+    return settings
+
+
+def engine_options(url, settings):
+    """
+    Return the ``create_engine`` keyword arguments for the pool settings.
+
+    In-memory SQLite databases use a single-connection pool that does not accept
+    them, so they get none.
+
+    Args:
+        url (str): The database URL.
+        settings (dict): The engine settings.
+
+    Returns:
+        dict: The engine options.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {name: settings[name] for name in POOL_SETTINGS if name in settings}
+
+
+def sqlite_pragma_listener(settings):
+    """
+    Return a ``connect`` event listener that applies the sqlite_* settings.
+
+    Foreign keys are enforced on every profile, since SQLite leaves them off by
+    default and customer deletes rely on their ON DELETE CASCADE.
+    """
+    pragmas = [('foreign_keys', 'ON')]
+    pragmas += [(pragma, settings['sqlite_' + pragma]) for pragma in SQLITE_PRAGMAS
+                if settings.get('sqlite_' + pragma) is not None]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas:
+                cursor.execute(f'PRAGMA {pragma}={value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def configure_engine(app):
+    """
+    Derive SQLALCHEMY_ENGINE_OPTIONS from the DB_ENGINE_PROFILE setting.
+
+    Must be called before ``db.init_app``, which creates the engines. Options
+    already present in SQLALCHEMY_ENGINE_OPTIONS take precedence over the profile.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    settings = app.extensions['engine_settings'] = resolve_settings(app.config)
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], settings)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def init_engine(app):
+    """
+    Apply the SQLite PRAGMAs of the engine profile to every new connection.
+
+    Args:
+        app (Flask): The Flask application instance; ``db`` must already be initialized.
+    """
+    listener = sqlite_pragma_listener(app.extensions['engine_settings'])
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', listener)
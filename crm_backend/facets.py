@@ -0,0 +1,160 @@
+from flask import request, jsonify
+from sqlalchemy import func, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from crm_backend.db import db
+from crm_backend.filters import filter_created_at, parse_date_range
+from crm_backend.models import SalesLead, SupportTicket, StatusCount
+
+# Entities whose status values are counted, keyed by table name
+FACET_MODELS = {
+    'sales_leads': SalesLead,
+    'support_tickets': SupportTicket
+}
+
+
+def count_statuses(entity, customer_id=None, start=None, end=None):
+    """
+    Count the rows of an entity per status with a single GROUP BY.
+
+    Args:
+        entity (str): A key of ``FACET_MODELS``.
+        customer_id (int): Optional customer to restrict the counts to.
+        start (datetime): Optional inclusive lower bound on ``created_at``.
+        end (datetime): Optional exclusive upper bound on ``created_at``.
+
+    Returns:
+        dict: Maps each status to its number of rows.
+    """
+    model = FACET_MODELS[entity]
+    query = db.session.query(model.status, func.count(model.id)).filter(model.status.isnot(None))
+
+    if customer_id:
+        query = query.filter(model.customer_id == customer_id)
+    query = filter_created_at(query, model, start, end)
+
+    return dict(query.group_by(model.status).all())
+
+
+def adjust_status_count(entity, status, delta):
+    """
+    Add ``delta`` to the stored count of a status in the current transaction.
+
+    Call this from a write handler before it commits so the counter and the row
+    change are committed together.
+
+    Args:
+        entity (str): A key of ``FACET_MODELS``.
+        status (str): The status whose count changes; None is ignored.
+        delta (int): The amount to add, negative for removals.
+    """
+    if status is None or not delta:
+        return
+
+    table = StatusCount.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = dialect_insert(table).values(entity=entity, status=status, count=delta)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.entity, table.c.status],
+                                          set_={'count': table.c.count + delta})
+        db.session.execute(stmt)
+        return
+
+    result = db.session.execute(
+        update(table)
+        .where(table.c.entity == entity, table.c.status == status)
+        .values(count=table.c.count + delta)
+    )
+    if not result.rowcount:
+        db.session.execute(insert(table).values(entity=entity, status=status, count=delta))
+
+
+def rebuild_status_counts(entity):
+    """
+    Recompute the stored status counts of an entity from its table.
+
+    Args:
+        entity (str): A key of ``FACET_MODELS``.
+
+    Returns:
+        dict: The recomputed counts.
+    """
+    counts = count_statuses(entity)
+    StatusCount.query.filter_by(entity=entity).delete()
+    db.session.add_all(StatusCount(entity=entity, status=status, count=count)
+                       for status, count in counts.items())
+    db.session.commit()
+    return counts
+
+
+def status_facets(entity, customer_id=None, start=None, end=None):
+    """
+    Return the number of rows per status of an entity.
+
+    Unfiltered requests are answered from the ``status_counts`` table, which the
+    write handlers keep current, so the cost depends on the number of statuses
+    rather than the number of rows. The migration that adds the table fills it,
+    as does the 'rebuild_status_counts' command. Requests filtered by customer or
+    date fall back to ``count_statuses``.
+
+    Args:
+        entity (str): A key of ``FACET_MODELS``.
+        customer_id (int): Optional customer to restrict the counts to.
+        start (datetime): Optional inclusive lower bound on ``created_at``.
+        end (datetime): Optional exclusive upper bound on ``created_at``.
+
+    Returns:
+        dict: Maps each status to its number of rows.
+    """
+    if customer_id or start or end:
+        return count_statuses(entity, customer_id, start, end)
+
+    rows = StatusCount.query.filter_by(entity=entity).all()
+    return {row.status: row.count for row in rows if row.count > 0}
+
+
+def ticket_status_summary(counts):
+    """
+    Return the ticket counts in the shape the analytics page reads.
+
+    Args:
+        counts (dict): The number of tickets per status.
+
+    Returns:
+        dict: The 'active', 'deactivated' and 'inProcess' counts.
+    """
+    return {
+        'active': counts.get('active', 0),
+        'deactivated': counts.get('deactivated', 0),
+        'inProcess': counts.get('in process', 0)
+    }
+
+
+def facet_response(entity):
+    """
+    Build the JSON response of a status facet endpoint from the request arguments.
+
+    Query parameters:
+        customer_id (int): Optional customer to restrict the counts to.
+        start_date (str): Optional start of the creation date range (inclusive).
+        end_date (str): Optional end of the creation date range (inclusive).
+
+    Args:
+        entity (str): A key of ``FACET_MODELS``.
+
+    Returns:
+        A JSON response containing the count per status and their total.
+    """
+    customer_id = request.args.get('customer_id', type=int)
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    counts = status_facets(entity, customer_id, start, end)
+    return jsonify({
+        'field': 'status',
+        'counts': counts,
+        'total': sum(counts.values())
+    })
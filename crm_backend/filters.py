@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from crm_backend.models import Customer
+
+
+def parse_date(value, end=False):
+    """
+    Parse a date or datetime query parameter.
+
+    Args:
+        value (str): An ISO 8601 date ('2024-01-31') or datetime ('2024-01-31T12:00:00').
+        end (bool): If True and only a date is given, return the start of the next day
+            so the bound can be used exclusively and still cover the whole day.
+
+    Returns:
+        datetime: The parsed value, or None if no value was given.
+
+    Raises:
+        ValueError: If the value is not a valid ISO 8601 date or datetime.
+    """
+    if not value:
+        return None
+
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD or an ISO 8601 datetime")
+
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def parse_date_range(args):
+    """
+    Read the 'start_date' and 'end_date' query parameters.
+
+    Args:
+        args (MultiDict): The request arguments.
+
+    Returns:
+        tuple: The inclusive start and exclusive end of the range, either of which may be None.
+
+    Raises:
+        ValueError: If either date is invalid.
+    """
+    return parse_date(args.get('start_date')), parse_date(args.get('end_date'), end=True)
+
+
+def filter_created_at(query, model, start, end):
+    """
+    Restrict a query to rows created within a date range.
+
+    Args:
+        query (Query): The query to filter.
+        model (db.Model): The model being queried.
+        start (datetime): The inclusive lower bound, or None.
+        end (datetime): The exclusive upper bound, or None.
+
+    Returns:
+        Query: The filtered query.
+    """
+    if start:
+        query = query.filter(model.created_at >= start)
+    if end:
+        query = query.filter(model.created_at < end)
+    return query
+
+
+def filter_customers(query, args):
+    """
+    Apply the filters of the customer list to a query.
+
+    Args:
+        query (Query): A query over customers.
+        args (MultiDict): The request arguments; 'search' matches first name, last name or email.
+
+    Returns:
+        Query: The filtered query.
+    """
+    search = args.get('search')
+    if search:
+        query = query.filter(
+            (Customer.first_name.ilike(f'%{search}%')) |
+            (Customer.last_name.ilike(f'%{search}%')) |
+            (Customer.email.ilike(f'%{search}%'))
+        )
+    return query
+
+
+def filter_customer_children(query, model, args):
+    """
+    Apply the filters of the sales lead, interaction and support ticket lists to a query.
+
+    Args:
+        query (Query): A query over ``model``.
+        model (db.Model): A model with a ``customer_id`` and optionally a ``status`` column.
+        args (MultiDict): The request arguments; 'customer_id' and 'status' are applied when given.
+
+    Returns:
+        Query: The filtered query.
+    """
+    customer_id = args.get('customer_id', type=int)
+    if customer_id:
+        query = query.filter(model.customer_id == customer_id)
+
+    status = args.get('status')
+    if status and hasattr(model, 'status'):
+        query = query.filter(model.status == status)
+    return query
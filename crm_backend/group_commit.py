@@ -0,0 +1,235 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from flask import current_app
+from sqlalchemy import insert
+from crm_backend.db import db
+from crm_backend.models import Interaction, SalesLead, SupportTicket
+from crm_backend.cache import invalidate
+from crm_backend.facets import FACET_MODELS, adjust_status_count
+from crm_backend.search import SEARCH_MODELS, index_document
+from crm_backend.rollups import record_activity
+from crm_backend.changes import record_change
+
+logger = logging.getLogger('crm_backend.group_commit')
+
+# Entities whose creation can go through the group-commit writer, keyed by table name
+GROUP_COMMIT_MODELS = {
+    'interactions': Interaction,
+    'sales_leads': SalesLead,
+    'support_tickets': SupportTicket
+}
+
+
+class GroupCommitError(Exception):
+    """Raised when a queued insert could not be committed in time."""
+
+
+class PendingInsert:
+    """An insert waiting in the writer queue, and the outcome its request waits for."""
+
+    def __init__(self, entity, values):
+        self.entity = entity
+        self.values = values
+        self.done = threading.Event()
+        self.row = None
+        self.error = None
+        self.lock = threading.Lock()
+        self.state = 'queued'  # Then 'claimed' by the writer or 'cancelled' by its request
+
+    def claim(self):
+        """Take the insert into a batch; return False if its request already gave up on it."""
+        with self.lock:
+            if self.state == 'cancelled':
+                return False
+            self.state = 'claimed'
+            return True
+
+    def cancel(self):
+        """Withdraw the insert unless the writer already took it; return True if it was withdrawn."""
+        with self.lock:
+            if self.state == 'claimed':
+                return False
+            self.state = 'cancelled'
+            return True
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread that commits queued inserts in batches.
+
+    Requests enqueue their insert and block until the transaction holding it has
+    committed, so an acknowledged write is as durable as with a commit per
+    request, but many requests share one transaction and one sync to disk.
+    A batch is committed once it holds ``max_batch`` inserts or its first insert
+    has waited ``max_delay`` seconds, whichever comes first.
+    """
+
+    def __init__(self, app, max_batch=256, max_delay=0.005):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, entity, values, timeout):
+        """
+        Queue an insert and wait until it is committed.
+
+        Args:
+            entity (str): A key of ``GROUP_COMMIT_MODELS``.
+            values (dict): The column values of the new row.
+            timeout (float): Seconds to wait for the commit.
+
+        Returns:
+            dict: The 'id' and 'created_at' of the inserted row.
+
+        Raises:
+            GroupCommitError: If the insert failed, or was still queued after ``timeout``;
+                it is then withdrawn, so it is never written and can safely be retried.
+        """
+        self.start()
+        pending = PendingInsert(entity, values)
+        self.queue.put(pending)
+        if not pending.done.wait(timeout):
+            if pending.cancel():
+                raise GroupCommitError('Timed out waiting for the group commit, the insert was not written')
+            # The writer is already committing it, so its outcome is only a transaction away
+            pending.done.wait()
+        if pending.error is not None:
+            raise GroupCommitError(pending.error)
+        return pending.row
+
+    def start(self):
+        """Start the writer thread unless it is running, e.g. after a fork."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='group-commit-writer', daemon=True)
+                self.thread.start()
+
+    def next_batch(self):
+        """
+        Block for the next insert, then gather more until the batch is full or its delay has passed.
+
+        Inserts whose request timed out and withdrew them are skipped.
+        """
+        batch = []
+        while not batch:
+            pending = self.queue.get()
+            if pending.claim():
+                batch.append(pending)
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                pending = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending.claim():
+                batch.append(pending)
+        return batch
+
+    def run(self):
+        with self.app.app_context():
+            while True:
+                batch = self.next_batch()
+                try:
+                    self.commit(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    if len(batch) == 1:
+                        batch[0].error = str(e)
+                    else:
+                        # Retry one by one so a single bad row does not fail the others
+                        logger.warning('Group commit of %d inserts failed, retrying them one by one: %s',
+                                       len(batch), e)
+                        for pending in batch:
+                            try:
+                                self.commit([pending])
+                            except Exception as e:
+                                db.session.rollback()
+                                pending.error = str(e)
+                finally:
+                    db.session.remove()
+                for pending in batch:
+                    pending.done.set()
+
+    def commit(self, batch):
+        """Insert a batch, with its status counts, activity rollup, change log and search index entries, in one transaction."""
+        by_entity = {}
+        for pending in batch:
+            by_entity.setdefault(pending.entity, []).append(pending)
+
+        for entity, pendings in by_entity.items():
+            model = GROUP_COMMIT_MODELS[entity]
+            table = model.__table__
+            rows = db.session.execute(
+                insert(table).returning(table.c.id, table.c.created_at, sort_by_parameter_order=True),
+                [pending.values for pending in pendings]
+            ).all()
+
+            if entity in FACET_MODELS:
+                for status, delta in Counter(pending.values.get('status') for pending in pendings).items():
+                    adjust_status_count(entity, status, delta)
+            if entity in SEARCH_MODELS:
+                column_name = SEARCH_MODELS[entity][1]
+                for pending, row in zip(pendings, rows):
+                    index_document(entity, row.id, pending.values.get(column_name))
+
+            record_activity(entity, [(pending.values['customer_id'], row.created_at)
+                                     for pending, row in zip(pendings, rows)])
+            record_change(entity, 'create', *(row.id for row in rows))
+
+            for pending, row in zip(pendings, rows):
+                pending.row = {'id': row.id, 'created_at': row.created_at}
+
+        db.session.commit()
+        invalidate(*by_entity)
+
+
+def init_group_commit(app):
+    """
+    Create the group-commit writer when GROUP_COMMIT is enabled.
+
+    The writer thread is started by the first queued insert.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    if app.config['GROUP_COMMIT']:
+        app.extensions['group_commit'] = GroupCommitWriter(
+            app, app.config['GROUP_COMMIT_MAX_BATCH'], app.config['GROUP_COMMIT_MAX_DELAY_MS'] / 1000
+        )
+
+
+def group_commit_enabled():
+    """Return True if creates should go through the group-commit writer."""
+    return 'group_commit' in current_app.extensions
+
+
+def submit_insert(entity, values):
+    """
+    Insert a row through the group-commit writer and wait until it is committed.
+
+    The status counts, search index and response cache are updated by the writer,
+    so the caller only has to respond.
+
+    Args:
+        entity (str): A key of ``GROUP_COMMIT_MODELS``.
+        values (dict): The column values of the new row.
+
+    Returns:
+        dict: The 'id' and 'created_at' of the inserted row.
+
+    Raises:
+        GroupCommitError: If the insert failed or did not commit in time.
+    """
+    # End the request's read transaction first: outside WAL mode its shared lock
+    # would keep the writer from committing the batch this request waits for
+    db.session.close()
+    return current_app.extensions['group_commit'].submit(entity, values, current_app.config['GROUP_COMMIT_TIMEOUT'])
@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+from itertools import islice
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ERRORS = 1000
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json')
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+
+
+def detect_format(mimetype, requested=None):
+    """
+    Determine the format of an import body.
+
+    Args:
+        mimetype (str): The mimetype of the request body.
+        requested (str): An explicit 'format' query parameter, which takes precedence.
+
+    Returns:
+        str: Either 'csv' or 'ndjson'.
+
+    Raises:
+        ValueError: If the requested format or mimetype is not supported.
+    """
+    if requested:
+        if requested not in ('csv', 'ndjson'):
+            raise ValueError("Invalid format, expected 'csv' or 'ndjson'")
+        return requested
+    if not mimetype or mimetype in NDJSON_MIMETYPES:
+        return 'ndjson'
+    if mimetype in CSV_MIMETYPES:
+        return 'csv'
+    raise ValueError(f"Unsupported content type '{mimetype}', expected CSV or NDJSON")
+
+
+def read_records(stream, fmt):
+    """
+    Read records one at a time from a binary stream without buffering the whole body.
+
+    Args:
+        stream (IO): The binary request stream.
+        fmt (str): Either 'csv' (with a header row) or 'ndjson' (one JSON object per line).
+
+    Yields:
+        tuple: The 1-based row number, the record dict (or None) and an error message (or None).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    if fmt == 'csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, {k: v for k, v in row.items() if k is not None}, None
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, 'Expected a JSON object'
+            continue
+        yield row_number, record, None
+
+
+def batched(iterable, size):
+    """
+    Split an iterable into lists of at most ``size`` items.
+
+    Args:
+        iterable (iterable): The items to split.
+        size (int): The maximum number of items per batch.
+
+    Yields:
+        list: The next batch of items.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class ImportReport:
+    """Running totals and a bounded list of per-row errors for a bulk import."""
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+
+    def add_error(self, row_number, error, email=None):
+        """
+        Record a failed row, keeping at most ``MAX_IMPORT_ERRORS`` error details.
+
+        Args:
+            row_number (int): The 1-based number of the failed row.
+            error (str): Why the row was rejected.
+            email (str): The email of the row, if known.
+        """
+        self.failed += 1
+        if len(self.errors) >= MAX_IMPORT_ERRORS:
+            self.errors_truncated = True
+            return
+        self.errors.append({'row': row_number, 'email': email, 'error': error})
+
+    def to_dict(self):
+        """Return the report as a JSON-serializable dictionary."""
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.errors_truncated
+        }
@@ -0,0 +1,109 @@
+import json
+import logging
+import time
+from flask import current_app, g, request, has_request_context
+from sqlalchemy import event
+from crm_backend.db import db
+
+logger = logging.getLogger('crm_backend.instrumentation')
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Format log records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {'time': self.formatTime(record), 'event': record.getMessage()}
+        payload.update(getattr(record, 'fields', {}))
+        return json.dumps(payload, default=str)
+
+
+def log_event(event_name, **fields):
+    """Write a structured record to the instrumentation log."""
+    logger.info(event_name, extra={'fields': fields})
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Remember when a statement started on this connection."""
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Add the duration of a statement to the current request and log it if it was slow."""
+    elapsed_ms = (time.perf_counter() - conn.info['query_started'].pop()) * 1000
+    if not has_request_context() or 'sql_stats' not in g:
+        return
+
+    g.sql_stats['count'] += 1
+    g.sql_stats['time_ms'] += elapsed_ms
+
+    if elapsed_ms >= current_app.config['SLOW_QUERY_MS']:
+        log_event('slow_query', route=request.endpoint, method=request.method, path=request.path,
+                  duration_ms=round(elapsed_ms, 3), statement=statement, executemany=executemany)
+
+
+def handle_error(context):
+    """Discard the start time of a statement that failed."""
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def start_request_timer():
+    """Reset the SQL counters at the start of a request."""
+    g.request_started = time.perf_counter()
+    g.sql_stats = {'count': 0, 'time_ms': 0.0}
+
+
+def add_server_timing(response):
+    """Report the SQL statement count and time in a Server-Timing header and log slow requests."""
+    if 'sql_stats' not in g:
+        return response
+
+    total_ms = (time.perf_counter() - g.request_started) * 1000
+    db_ms = g.sql_stats['time_ms']
+    count = g.sql_stats['count']
+
+    response.headers['Server-Timing'] = (
+        f'db;dur={db_ms:.2f};desc="{count} queries", '
+        f'app;dur={max(total_ms - db_ms, 0):.2f}, '
+        f'total;dur={total_ms:.2f}'
+    )
+
+    if total_ms >= current_app.config['SLOW_REQUEST_MS']:
+        log_event('slow_request', route=request.endpoint, blueprint=request.blueprint,
+                  method=request.method, path=request.full_path, status=response.status_code,
+                  duration_ms=round(total_ms, 3), db_ms=round(db_ms, 3), queries=count)
+    return response
+
+
+def init_instrumentation(app):
+    """
+    Instrument the app's SQL statements and requests when SQL_INSTRUMENTATION is enabled.
+
+    Each response gets a ``Server-Timing`` header with the number of statements and
+    the time spent in the database and in the rest of the request. Requests slower
+    than SLOW_REQUEST_MS and statements slower than SLOW_QUERY_MS are written as JSON
+    lines to INSTRUMENTATION_LOG_FILE, separately from the application log.
+
+    Args:
+        app (Flask): The Flask application instance; ``db`` must already be initialized.
+    """
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    if not logger.handlers:
+        handler = logging.FileHandler(app.config['INSTRUMENTATION_LOG_FILE'])
+        handler.setFormatter(JsonLineFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', before_cursor_execute):
+                event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+                event.listen(engine, 'handle_error', handle_error)
+
+    app.before_request(start_request_timer)
+    app.after_request(add_server_timing)
@@ -1,13 +1,24 @@
+import click
 from flask_migrate import Migrate, upgrade
 from sqlalchemy import text
-from crm_backend.backend_app import create_app
+from crm_backend.backend_app import create_app, MIGRATIONS_DIR
 from crm_backend.db import db
-from crm_backend.models import Worker
+from crm_backend.models import Worker, SalesLead, Interaction, SupportTicket
+from crm_backend.facets import FACET_MODELS, rebuild_status_counts
+from crm_backend.datagen import generate_data
+from crm_backend.cache import invalidate
+from crm_backend.replicas import sync_sqlite_replicas
+from crm_backend.search import SEARCH_MODELS, rebuild_search_index
+from crm_backend.rollups import ROLLUP_MODELS, compact_rollups, rebuild_rollups
+from crm_backend.metric_totals import rebuild_metric_totals
+from crm_backend.snapshot import SNAPSHOT_CHUNK_SIZE, write_snapshot
+from crm_backend.changes import compact_changes
+from datetime import timedelta
 from sqlalchemy import inspect
 
 # Initialize the app and migration
 app = create_app()
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, directory=MIGRATIONS_DIR)
 
 @app.cli.command('check_db')
 def check_db():
@@ -30,11 +41,14 @@ def create_db():
 
     This command initializes the database and creates all tables defined
     in the models. Upon success, it prints a success message along with
-    the names of the created tables.
+    the names of the created tables. The status counters are recounted, as
+    the database may already hold rows.
     """
     try:
         with app.app_context():
             db.create_all()
+            for entity in FACET_MODELS:
+                rebuild_status_counts(entity)
             print("Database created successfully!")
             print("Created tables:", db.metadata.tables.keys())
     except Exception as e:
@@ -114,6 +128,173 @@ def list_users():
     except Exception as e:
         print(f"Error listing users: {str(e)}")
 
+@app.cli.command('rebuild_status_counts')
+def rebuild_status_counts_command():
+    """Recompute the stored per-status counts of sales leads and support tickets.
+
+    The counts are kept current by the write handlers, so this is only needed
+    after rows were changed outside the API, e.g. by a manual SQL import.
+    """
+    try:
+        with app.app_context():
+            for entity in FACET_MODELS:
+                counts = rebuild_status_counts(entity)
+                print(f"{entity}: {counts}")
+        print("Status counts rebuilt successfully!")
+    except Exception as e:
+        print(f"Error rebuilding status counts: {str(e)}")
+
+@app.cli.command('generate_data')
+@click.option('--customers', default=10000, show_default=True, help='Number of customers to generate.')
+@click.option('--leads', default=3.0, show_default=True, help='Mean number of sales leads per customer.')
+@click.option('--interactions', default=8.0, show_default=True, help='Mean number of interactions per customer.')
+@click.option('--tickets', default=2.0, show_default=True, help='Mean number of support tickets per customer.')
+@click.option('--skew', default=1.5, show_default=True,
+              help='Pareto shape of the per-customer counts; closer to 1 is more skewed.')
+@click.option('--years', default=3.0, show_default=True, help='How far back customer creation dates go.')
+@click.option('--chunk-size', default=50000, show_default=True, help='Rows written per transaction.')
+@click.option('--seed', type=int, default=None, help='Random seed for reproducible data.')
+@click.option('--keep-indexes', is_flag=True, help='Maintain the indexes during the load instead of rebuilding them.')
+def generate_data_command(customers, leads, interactions, tickets, skew, years, chunk_size, seed, keep_indexes):
+    """Generate customers with sales leads, interactions and support tickets for load testing.
+
+    Per-customer child counts are skewed (a few customers have long histories),
+    statuses follow realistic mixes and timestamps are biased towards recent
+    activity. Rows are appended to the existing data with bulk inserts in chunked
+    transactions, using COPY on PostgreSQL.
+    """
+    if skew <= 1:
+        print("Error generating data: --skew must be greater than 1.")
+        return
+    try:
+        with app.app_context():
+            counts = generate_data(
+                customers, {SalesLead: leads, Interaction: interactions, SupportTicket: tickets},
+                alpha=skew, years=years, chunk_size=chunk_size, seed=seed, keep_indexes=keep_indexes
+            )
+            for entity in FACET_MODELS:
+                rebuild_status_counts(entity)
+            for entity in SEARCH_MODELS:
+                rebuild_search_index(entity)
+            rebuild_rollups()
+            invalidate(*counts)
+            for table, count in counts.items():
+                print(f"{table}: {count}")
+        print("Data generated successfully!")
+    except Exception as e:
+        print(f"Error generating data: {str(e)}")
+
+@app.cli.command('rebuild_search_index')
+def rebuild_search_index_command():
+    """Create and backfill the full-text indexes of interaction notes and ticket descriptions.
+
+    Run this once on databases created before full-text search was added, and
+    after rows were changed outside the API. On SQLite the FTS5 tables are
+    refilled from the source tables; on PostgreSQL the GIN indexes are rebuilt.
+    """
+    try:
+        with app.app_context():
+            for entity in SEARCH_MODELS:
+                count = rebuild_search_index(entity)
+                print(f"{entity}: {count} rows indexed")
+        print("Search index rebuilt successfully!")
+    except Exception as e:
+        print(f"Error rebuilding search index: {str(e)}")
+
+@app.cli.command('compact_activity_rollups')
+@click.option('--rebuild', is_flag=True, help='Recompute the rollups from the source tables instead.')
+def compact_activity_rollups_command(rebuild):
+    """Merge the delta rows of the daily activity rollups behind /analytics/timeseries.
+
+    Writes append one delta row per change, so run this periodically, e.g. from
+    cron, to keep the rollup table at one row per entity, customer and day. Use
+    --rebuild after rows were changed outside the API.
+    """
+    try:
+        with app.app_context():
+            if rebuild:
+                for entity, count in rebuild_rollups().items():
+                    print(f"{entity}: {count} rollup rows")
+                invalidate(*ROLLUP_MODELS)
+            else:
+                before, after = compact_rollups()
+                print(f"Compacted {before} rollup rows into {after}")
+        print("Activity rollups compacted successfully!")
+    except Exception as e:
+        print(f"Error compacting activity rollups: {str(e)}")
+
+@app.cli.command('rebuild_metric_totals')
+def rebuild_metric_totals_command():
+    """Recompute the per-day running totals behind /analytics/filter_aggregate.
+
+    The totals are kept current by the analytics write handlers, so this is only
+    needed after 'db_upgrade' added the metric columns, or after entries were
+    changed outside the API.
+    """
+    try:
+        with app.app_context():
+            count = rebuild_metric_totals()
+            invalidate('analytics')
+            print(f"metric_daily_totals: {count} rows")
+        print("Metric totals rebuilt successfully!")
+    except Exception as e:
+        print(f"Error rebuilding metric totals: {str(e)}")
+
+@app.cli.command('snapshot')
+@click.option('--chunk-size', default=SNAPSHOT_CHUNK_SIZE, show_default=True, help='Rows read per round trip.')
+def snapshot_command(chunk_size):
+    """Export the tables into memory-mapped NumPy column files for the /reports endpoints.
+
+    Each column is written to a typed .npy file, with the status, company and metric
+    name strings dictionary-encoded, into a new directory under SNAPSHOT_DIR. The
+    reports switch to it once it is complete and never query the database. Run it
+    periodically, e.g. from cron; only the SNAPSHOT_KEEP newest snapshots are kept.
+    """
+    try:
+        with app.app_context():
+            manifest = write_snapshot(app.config['SNAPSHOT_DIR'], chunk_size, app.config['SNAPSHOT_KEEP'])
+            for table, entry in manifest['tables'].items():
+                print(f"{table}: {entry['rows']} rows")
+            print(f"Snapshot {manifest['id']} written to {app.config['SNAPSHOT_DIR']}")
+        print("Snapshot created successfully!")
+    except Exception as e:
+        print(f"Error creating snapshot: {str(e)}")
+
+@app.cli.command('compact_changes')
+def compact_changes_command():
+    """Apply the retention policy of the change log behind /changes.
+
+    Changes older than CHANGE_LOG_RETENTION_HOURS, or beyond the newest
+    CHANGE_LOG_MAX_ENTRIES, are dropped, and older changes of a row are merged
+    into its latest one. Run it periodically, e.g. from cron; clients that fell
+    behind the dropped changes are told to reload.
+    """
+    try:
+        with app.app_context():
+            horizon, expired, merged = compact_changes(
+                timedelta(hours=app.config['CHANGE_LOG_RETENTION_HOURS']), app.config['CHANGE_LOG_MAX_ENTRIES']
+            )
+            print(f"Dropped {expired} expired and {merged} superseded changes, horizon is now {horizon}")
+        print("Change log compacted successfully!")
+    except Exception as e:
+        print(f"Error compacting change log: {str(e)}")
+
+@app.cli.command('sync_replicas')
+def sync_replicas():
+    """Copy the SQLite primary database over the SQLite read replicas.
+
+    This stands in for replication in a local setup where READ_REPLICA_URLS points
+    at a second SQLite file, e.g. READ_REPLICA_URLS=sqlite:///crm_replica.db.
+    Run it again whenever the replica should catch up with the primary.
+    """
+    try:
+        with app.app_context():
+            for path in sync_sqlite_replicas(db.engines):
+                print(f"Synced {path}")
+        print("Replicas synced successfully!")
+    except Exception as e:
+        print(f"Error syncing replicas: {str(e)}")
+
 @app.cli.command('db_upgrade')
 def upgrade_db():
     """Apply migrations to upgrade the database.
@@ -0,0 +1,226 @@
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from flask import request, jsonify
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from crm_backend.db import db
+from crm_backend.filters import parse_date_range
+from crm_backend.models import Analytics, MetricDailyTotal
+from crm_backend.pagination import is_cursor_request, paginate
+
+TOTAL_COLUMNS = ('metric_name', 'day', 'count', 'value', 'running_count', 'running_value')
+
+
+def parse_metric_fields(data):
+    """
+    Read the metric columns of an analytics entry from a request body.
+
+    Args:
+        data (dict): The JSON request body; missing keys are left out of the result.
+
+    Returns:
+        dict: The column values, with 'metric_value' as a Decimal and the periods as dates.
+
+    Raises:
+        ValueError: If a value has the wrong type or format.
+    """
+    values = {}
+    if 'metric_name' in data:
+        name = data['metric_name']
+        if name is not None and (not isinstance(name, str) or not name or len(name) > 50):
+            raise ValueError("'metric_name' must be a non-empty string of at most 50 characters")
+        values['metric_name'] = name
+    if 'metric_value' in data:
+        value = data['metric_value']
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            values['metric_value'] = Decimal(str(value)).quantize(Decimal('0.01')) if value is not None else None
+        except (TypeError, InvalidOperation):
+            raise ValueError("'metric_value' must be a number")
+    for key in ('period_start_date', 'period_end_date'):
+        if key in data:
+            try:
+                values[key] = date.fromisoformat(data[key]) if data[key] is not None else None
+            except (TypeError, ValueError):
+                raise ValueError(f"'{key}' must be a date in the format YYYY-MM-DD")
+    return values
+
+
+def adjust_metric_total(metric_name, day, count, value):
+    """
+    Add an analytics entry change to the daily totals of its metric in the current transaction.
+
+    The running totals of every later day of the metric are shifted with one
+    set-based UPDATE, so writes cost O(days after ``day``) while any date-range
+    total stays two index lookups. The row of a new day is seeded with an upsert,
+    so concurrent first entries of a day do not collide on its primary key. Call
+    this from a write handler before it commits.
+
+    Args:
+        metric_name (str): The metric of the entry; None is ignored.
+        day (date): The period start date of the entry; None is ignored.
+        count (int): 1 for a new entry, -1 for a removed one, 0 for a changed value.
+        value (Decimal): The change of the metric value.
+    """
+    if metric_name is None or day is None or not (count or value):
+        return
+
+    table = MetricDailyTotal.__table__
+    value = value or 0
+    metric = table.c.metric_name == metric_name
+
+    if db.session.execute(select(table.c.day).where(metric, table.c.day == day)).first() is None:
+        previous = db.session.execute(
+            select(table.c.running_count, table.c.running_value)
+            .where(metric, table.c.day < day).order_by(table.c.day.desc()).limit(1)
+        ).first()
+        running_count, running_value = previous or (0, 0)
+        seed = {'metric_name': metric_name, 'day': day, 'count': 0, 'value': 0,
+                'running_count': running_count, 'running_value': running_value}
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            db.session.execute(dialect_insert(table).values(**seed).on_conflict_do_nothing(
+                index_elements=[table.c.metric_name, table.c.day]
+            ))
+        else:
+            db.session.execute(insert(table).values(**seed))
+
+    db.session.execute(
+        update(table).where(metric, table.c.day == day)
+        .values(count=table.c.count + count, value=table.c.value + value)
+    )
+    db.session.execute(
+        update(table).where(metric, table.c.day >= day)
+        .values(running_count=table.c.running_count + count, running_value=table.c.running_value + value)
+    )
+
+
+def adjust_entry(analytic, sign):
+    """Add (``sign`` 1) or remove (``sign`` -1) an analytics entry from the daily totals."""
+    adjust_metric_total(analytic.metric_name, analytic.period_start_date, sign,
+                        sign * (analytic.metric_value or 0))
+
+
+def rebuild_metric_totals():
+    """
+    Recompute the daily totals of every metric from the analytics table.
+
+    Returns:
+        int: The number of daily total rows written.
+    """
+    table = MetricDailyTotal.__table__
+    db.session.execute(delete(table))
+
+    daily = (
+        select(Analytics.metric_name, Analytics.period_start_date.label('day'), func.count().label('count'),
+               func.coalesce(func.sum(Analytics.metric_value), 0).label('value'))
+        .where(Analytics.metric_name.isnot(None), Analytics.period_start_date.isnot(None))
+        .group_by(Analytics.metric_name, Analytics.period_start_date)
+        .subquery()
+    )
+    window = {'partition_by': daily.c.metric_name, 'order_by': daily.c.day}
+    written = db.session.execute(insert(table).from_select(TOTAL_COLUMNS, select(
+        daily.c.metric_name, daily.c.day, daily.c.count, daily.c.value,
+        func.sum(daily.c.count).over(**window), func.sum(daily.c.value).over(**window)
+    ))).rowcount
+
+    db.session.commit()
+    return written
+
+
+def running_total(metric_name, day):
+    """Return the running ``(count, value)`` of a metric up to and including ``day``."""
+    table = MetricDailyTotal.__table__
+    row = db.session.execute(
+        select(table.c.running_count, table.c.running_value)
+        .where(table.c.metric_name == metric_name, table.c.day <= day)
+        .order_by(table.c.day.desc()).limit(1)
+    ).first()
+    return row or (0, 0)
+
+
+def metric_totals(metric_names=None, start=None, end=None):
+    """
+    Count and sum the analytics entries of each metric whose period starts within a date range.
+
+    Each total is the difference of the running totals at both ends of the range,
+    so its cost does not depend on the number of entries or days in the range.
+
+    Args:
+        metric_names (list): The metrics to total, or None for every metric.
+        start (datetime): Optional inclusive lower bound; only its date is used.
+        end (datetime): Optional exclusive upper bound; days it touches are included.
+
+    Returns:
+        dict: Maps each metric name to its 'count' and 'value'.
+    """
+    if metric_names is None:
+        metric_names = db.session.scalars(select(MetricDailyTotal.metric_name).distinct()).all()
+
+    last_day = (end - timedelta(microseconds=1)).date() if end else date.max
+    before_day = start.date() - timedelta(days=1) if start and start.date() > date.min else None
+
+    totals = {}
+    for name in sorted(metric_names):
+        count, value = running_total(name, last_day)
+        if before_day:
+            before_count, before_value = running_total(name, before_day)
+            count, value = count - before_count, value - before_value
+        totals[name] = {'count': count, 'value': round(float(value), 2)}
+    return totals
+
+
+def metric_totals_response(schema):
+    """
+    Build the JSON response of the analytics aggregate endpoint from the request arguments.
+
+    Query parameters:
+        metric_name (str): Optional comma-separated metrics to total (default is all of them).
+        start_date (str), end_date (str): Optional inclusive range of period start dates.
+        include_rows (bool): Also return the matching entries, one page at a time (default is false).
+        page (int), per_page (int): The page of entries to return, see ``paginate`` for cursors.
+
+    Args:
+        schema (Schema): The schema used to dump the entries.
+
+    Returns:
+        Response: The overall 'total_count' and 'total_value', the totals per metric and,
+        when requested, a page of 'analytics' entries.
+    """
+    names = request.args.get('metric_name')
+    names = [name for name in names.split(',') if name] if names else None
+
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    totals = metric_totals(names, start, end)
+    response = {
+        'total_count': sum(total['count'] for total in totals.values()),
+        'total_value': round(sum(total['value'] for total in totals.values()), 2),
+        'metrics': totals
+    }
+
+    if request.args.get('include_rows', 'false').lower() == 'true':
+        query = Analytics.query.filter(Analytics.metric_name.isnot(None))
+        if names:
+            query = query.filter(Analytics.metric_name.in_(names))
+        if start:
+            query = query.filter(Analytics.period_start_date >= start.date())
+        if end:
+            query = query.filter(Analytics.period_start_date <= (end - timedelta(microseconds=1)).date())
+        if not is_cursor_request():
+            query = query.order_by(Analytics.period_start_date, Analytics.id)
+        try:
+            rows, pagination = paginate(query, Analytics, request.args.get('page', 1, type=int),
+                                        request.args.get('per_page', 10, type=int))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        response['analytics'] = schema.dump_many(rows)
+        response.update(pagination)
+
+    return jsonify(response)
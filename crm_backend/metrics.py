@@ -0,0 +1,231 @@
+import hmac
+import threading
+import time
+from collections import defaultdict
+from flask import g, request, jsonify, has_request_context
+from sqlalchemy import event
+from crm_backend.db import db
+
+# Upper bounds of the request latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsShard:
+    """Counters written by a single thread, so updates need no lock."""
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.requests = defaultdict(int)  # (blueprint, endpoint, method, status) -> count
+        self.latency = {}  # (blueprint, endpoint) -> [bucket counts..., +Inf count, sum]
+        self.statements = defaultdict(int)  # (blueprint, endpoint) -> count
+        self.pool_checkouts = defaultdict(int)  # engine name -> count
+
+    def observe_latency(self, key, seconds):
+        """Add one request duration to the histogram of ``key``."""
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[len(LATENCY_BUCKETS)] += 1
+        histogram[-1] += seconds
+
+    def merge(self, other):
+        """Add the counters of ``other`` to this shard."""
+        # Copy the items first, as the owning thread may add keys meanwhile
+        for key, value in list(other.requests.items()):
+            self.requests[key] += value
+        for key, value in list(other.statements.items()):
+            self.statements[key] += value
+        for key, value in list(other.pool_checkouts.items()):
+            self.pool_checkouts[key] += value
+        for key, histogram in list(other.latency.items()):
+            mine = self.latency.setdefault(key, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+            for i, value in enumerate(histogram):
+                mine[i] += value
+
+
+class MetricsRegistry:
+    """
+    Per-thread metric shards that are merged when the metrics are collected.
+
+    Request handling only touches the calling thread's shard, so recording a
+    metric never waits for another thread. The lock is only taken when a thread
+    creates its shard and when the shards are collected; the shards of threads
+    that have exited are folded into a single retired shard at that point.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []
+        self.retired = MetricsShard()
+        self.lock = threading.Lock()
+
+    def shard(self):
+        """Return the calling thread's shard, creating it on first use."""
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = MetricsShard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    def collect(self):
+        """Return a shard holding the sum of every thread's counters."""
+        total = MetricsShard()
+        with self.lock:
+            alive = []
+            for shard in self.shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    self.retired.merge(shard)
+            self.shards = alive
+            total.merge(self.retired)
+            for shard in alive:
+                total.merge(shard)
+        return total
+
+
+def format_labels(**labels):
+    """Format Prometheus labels, escaping their values."""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def pool_gauges():
+    """Return the (engine name, gauge name, value) of each connection pool statistic available."""
+    gauges = []
+    for bind, engine in db.engines.items():
+        name = bind or 'default'
+        pool = engine.pool
+        for gauge, method in (('size', 'size'), ('checked_out', 'checkedout'),
+                              ('checked_in', 'checkedin'), ('overflow', 'overflow')):
+            if hasattr(pool, method):
+                gauges.append((name, gauge, getattr(pool, method)()))
+    return gauges
+
+
+def render_metrics(registry):
+    """
+    Render the collected metrics in the Prometheus text exposition format.
+
+    Args:
+        registry (MetricsRegistry): The registry to collect.
+
+    Returns:
+        str: The metrics document.
+    """
+    metrics = registry.collect()
+    lines = [
+        '# HELP crm_http_requests_total Number of HTTP requests handled.',
+        '# TYPE crm_http_requests_total counter'
+    ]
+    for (blueprint, endpoint, method, status), value in sorted(metrics.requests.items()):
+        labels = format_labels(blueprint=blueprint, endpoint=endpoint, method=method, status=status)
+        lines.append(f'crm_http_requests_total{labels} {value}')
+
+    lines += [
+        '# HELP crm_http_request_duration_seconds Time spent handling HTTP requests.',
+        '# TYPE crm_http_request_duration_seconds histogram'
+    ]
+    for (blueprint, endpoint), histogram in sorted(metrics.latency.items()):
+        cumulative = 0
+        for bound, value in zip(LATENCY_BUCKETS + ('+Inf',), histogram):
+            cumulative += value
+            labels = format_labels(blueprint=blueprint, endpoint=endpoint, le=bound)
+            lines.append(f'crm_http_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = format_labels(blueprint=blueprint, endpoint=endpoint)
+        lines.append(f'crm_http_request_duration_seconds_sum{labels} {histogram[-1]:.6f}')
+        lines.append(f'crm_http_request_duration_seconds_count{labels} {cumulative}')
+
+    lines += [
+        '# HELP crm_db_statements_total Number of SQL statements executed.',
+        '# TYPE crm_db_statements_total counter'
+    ]
+    for (blueprint, endpoint), value in sorted(metrics.statements.items()):
+        lines.append(f'crm_db_statements_total{format_labels(blueprint=blueprint, endpoint=endpoint)} {value}')
+
+    lines += [
+        '# HELP crm_db_pool_checkouts_total Number of connections checked out of the pool.',
+        '# TYPE crm_db_pool_checkouts_total counter'
+    ]
+    for engine, value in sorted(metrics.pool_checkouts.items()):
+        lines.append(f'crm_db_pool_checkouts_total{format_labels(engine=engine)} {value}')
+
+    gauges = pool_gauges()
+    for gauge in ('size', 'checked_out', 'checked_in', 'overflow'):
+        lines += [
+            f'# HELP crm_db_pool_{gauge} Connection pool {gauge.replace("_", " ")} connections.',
+            f'# TYPE crm_db_pool_{gauge} gauge'
+        ]
+        for engine, name, value in gauges:
+            if name == gauge:
+                lines.append(f'crm_db_pool_{gauge}{format_labels(engine=engine)} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def current_route():
+    """Return the (blueprint, endpoint) labels of the current request."""
+    if not has_request_context():
+        return '', 'background'
+    return request.blueprint or '', request.endpoint or 'unmatched'
+
+
+def init_metrics(app):
+    """
+    Collect request and database metrics and serve them at ``/metrics`` when METRICS_ENABLED is set.
+
+    The endpoint exposes, in the Prometheus text format, request counts by route,
+    method and status, a latency histogram per route, SQL statement counts per
+    route, pool checkout counts and the pool size, checked-out and overflow gauges.
+    As these reveal the routes and database load, the endpoint is off by default and
+    requires ``METRICS_TOKEN`` as a bearer token when one is configured.
+
+    Args:
+        app (Flask): The Flask application instance; ``db`` must already be initialized.
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    registry = app.extensions['metrics'] = MetricsRegistry()
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        registry.shard().statements[current_route()] += 1
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            def count_checkout(dbapi_connection, connection_record, connection_proxy, name=bind or 'default'):
+                registry.shard().pool_checkouts[name] += 1
+
+            event.listen(engine, 'after_cursor_execute', count_statement)
+            event.listen(engine.pool, 'checkout', count_checkout)
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = current_route()
+            shard = registry.shard()
+            shard.requests[route + (request.method, response.status_code)] += 1
+            shard.observe_latency(route, time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Serve the collected metrics in the Prometheus text format."""
+        token = app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'message': 'Invalid or missing metrics token'}), 401
+        return app.response_class(render_metrics(registry), mimetype='text/plain; version=0.0.4')
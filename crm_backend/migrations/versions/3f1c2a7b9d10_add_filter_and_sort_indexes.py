@@ -0,0 +1,38 @@
+"""add indexes for the list filter and sort columns
+
+Revision ID: 3f1c2a7b9d10
+Revises: 
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns); the tables themselves come from 'create_db'
+INDEXES = [
+    ('ix_customers_created_at_id', 'customers', ['created_at', 'id']),
+    ('ix_sales_leads_customer_id_created_at', 'sales_leads', ['customer_id', 'created_at']),
+    ('ix_sales_leads_status_created_at', 'sales_leads', ['status', 'created_at']),
+    ('ix_sales_leads_created_at_id', 'sales_leads', ['created_at', 'id']),
+    ('ix_interactions_customer_id_created_at', 'interactions', ['customer_id', 'created_at']),
+    ('ix_interactions_created_at_id', 'interactions', ['created_at', 'id']),
+    ('ix_support_tickets_customer_id_created_at', 'support_tickets', ['customer_id', 'created_at']),
+    ('ix_support_tickets_status_created_at', 'support_tickets', ['status', 'created_at']),
+    ('ix_support_tickets_created_at_id', 'support_tickets', ['created_at', 'id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,43 @@
+"""add full-text search indexes for interaction notes and ticket descriptions
+
+Revision ID: 8b2d4e6f1a37
+Revises: 3f1c2a7b9d10
+Create Date: 2026-10-17 15:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4e6f1a37'
+down_revision = '3f1c2a7b9d10'
+branch_labels = None
+depends_on = None
+
+# (table, text column); SQLite gets an FTS5 table per entity, PostgreSQL a GIN index
+SEARCH_COLUMNS = [
+    ('interactions', 'notes'),
+    ('support_tickets', 'description'),
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column in SEARCH_COLUMNS:
+        if dialect == 'sqlite':
+            op.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(body)')
+            op.execute(f'DELETE FROM {table}_fts')
+            op.execute(f'INSERT INTO {table}_fts (rowid, body) SELECT id, {column} FROM {table} '
+                       f'WHERE {column} IS NOT NULL')
+        elif dialect == 'postgresql':
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_fts ON {table} "
+                       f"USING GIN (to_tsvector('english', coalesce({column}, '')))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column in reversed(SEARCH_COLUMNS):
+        if dialect == 'sqlite':
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_{column}_fts')
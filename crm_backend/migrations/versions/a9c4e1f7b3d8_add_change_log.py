@@ -0,0 +1,47 @@
+"""add the changes and change_log_state tables behind the change feed
+
+Revision ID: a9c4e1f7b3d8
+Revises: f5b9d2e7a4c6
+Create Date: 2026-10-17 22:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e1f7b3d8'
+down_revision = 'f5b9d2e7a4c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The log starts empty: clients read 'next_since' before loading their data
+    op.create_table(
+        'changes',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=10), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,  # Never reuse the sequence numbers of compacted changes
+        if_not_exists=True
+    )
+    op.create_index('ix_changes_entity_entity_id_seq', 'changes', ['entity', 'entity_id', 'seq'],
+                    unique=False, if_not_exists=True)
+    op.create_table(
+        'change_log_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('horizon', sa.Integer(), nullable=False),
+        sa.Column('compacted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('change_log_state', if_exists=True)
+    op.drop_index('ix_changes_entity_entity_id_seq', table_name='changes', if_exists=True)
+    op.drop_table('changes', if_exists=True)
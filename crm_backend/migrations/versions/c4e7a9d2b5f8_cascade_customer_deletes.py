@@ -0,0 +1,43 @@
+"""delete the sales leads, interactions and tickets of a customer with ON DELETE CASCADE
+
+Revision ID: c4e7a9d2b5f8
+Revises: 8b2d4e6f1a37
+Create Date: 2026-10-17 16:40:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a9d2b5f8'
+down_revision = '8b2d4e6f1a37'
+branch_labels = None
+depends_on = None
+
+CHILD_TABLES = ['sales_leads', 'interactions', 'support_tickets']
+
+# SQLite foreign keys created by 'create_db' are unnamed; batch mode finds them by this name
+SQLITE_NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def replace_customer_foreign_key(table, ondelete):
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot alter a constraint, so batch mode copies the table
+        name = f'fk_{table}_customer_id_customers'
+        with op.batch_alter_table(table, recreate='always', naming_convention=SQLITE_NAMING_CONVENTION) as batch:
+            batch.drop_constraint(name, type_='foreignkey')
+            batch.create_foreign_key(name, 'customers', ['customer_id'], ['id'], ondelete=ondelete)
+    else:
+        name = f'{table}_customer_id_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, 'customers', ['customer_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    for table in CHILD_TABLES:
+        replace_customer_foreign_key(table, 'CASCADE')
+
+
+def downgrade():
+    for table in reversed(CHILD_TABLES):
+        replace_customer_foreign_key(table, None)
@@ -0,0 +1,73 @@
+"""add typed metric columns to analytics entries
+
+Revision ID: d7f3b1a9c2e4
+Revises: c4e7a9d2b5f8
+Create Date: 2026-10-17 19:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f3b1a9c2e4'
+down_revision = 'c4e7a9d2b5f8'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('metric_name', sa.String(length=50), nullable=True),
+    sa.Column('metric_value', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('period_start_date', sa.Date(), nullable=True),
+    sa.Column('period_end_date', sa.Date(), nullable=True),
+]
+
+
+def existing_columns():
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('analytics')}
+
+
+def upgrade():
+    # Databases set up with 'create_db' after the model change already have the columns
+    existing = existing_columns()
+    missing = [column for column in COLUMNS if column.name not in existing]
+    if missing:
+        with op.batch_alter_table('analytics') as batch:
+            for column in missing:
+                batch.add_column(column)
+    op.create_index('ix_analytics_metric_name_period_start_date', 'analytics',
+                    ['metric_name', 'period_start_date'], unique=False, if_not_exists=True)
+
+    op.create_table(
+        'metric_daily_totals',
+        sa.Column('metric_name', sa.String(length=50), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.Column('running_count', sa.Integer(), nullable=False),
+        sa.Column('running_value', sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('metric_name', 'day'),
+        if_not_exists=True
+    )
+    # Recompute from scratch, as 'rebuild_metric_totals' does
+    op.execute('DELETE FROM metric_daily_totals')
+    op.execute(
+        'INSERT INTO metric_daily_totals (metric_name, day, count, value, running_count, running_value) '
+        'SELECT metric_name, day, count, value, '
+        'SUM(count) OVER (PARTITION BY metric_name ORDER BY day), '
+        'SUM(value) OVER (PARTITION BY metric_name ORDER BY day) '
+        'FROM (SELECT metric_name, period_start_date AS day, COUNT(*) AS count, '
+        'COALESCE(SUM(metric_value), 0) AS value FROM analytics '
+        'WHERE metric_name IS NOT NULL AND period_start_date IS NOT NULL '
+        'GROUP BY metric_name, period_start_date) AS daily'
+    )
+
+
+def downgrade():
+    op.drop_table('metric_daily_totals', if_exists=True)
+    op.drop_index('ix_analytics_metric_name_period_start_date', table_name='analytics', if_exists=True)
+    existing = existing_columns()
+    with op.batch_alter_table('analytics') as batch:
+        for column in reversed(COLUMNS):
+            if column.name in existing:
+                batch.drop_column(column.name)
@@ -0,0 +1,39 @@
+"""add the status_counts table behind the status facets and fill it
+
+Revision ID: e2a8c6f4b1d3
+Revises: d7f3b1a9c2e4
+Create Date: 2026-10-17 22:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8c6f4b1d3'
+down_revision = 'd7f3b1a9c2e4'
+branch_labels = None
+depends_on = None
+
+# Tables whose rows are counted per status, see crm_backend.facets.FACET_MODELS
+COUNTED_TABLES = ['sales_leads', 'support_tickets']
+
+
+def upgrade():
+    op.create_table(
+        'status_counts',
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('entity', 'status'),
+        if_not_exists=True
+    )
+    # Recount from scratch: the table may already exist from 'create_db' with partial counts
+    op.execute('DELETE FROM status_counts')
+    for table in COUNTED_TABLES:
+        op.execute(f"INSERT INTO status_counts (entity, status, count) SELECT '{table}', status, COUNT(*) "
+                   f"FROM {table} WHERE status IS NOT NULL GROUP BY status")
+
+
+def downgrade():
+    op.drop_table('status_counts', if_exists=True)
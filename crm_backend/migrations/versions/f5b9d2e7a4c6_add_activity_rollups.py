@@ -0,0 +1,51 @@
+"""add the activity_rollups table behind the activity time series and fill it
+
+Revision ID: f5b9d2e7a4c6
+Revises: e2a8c6f4b1d3
+Create Date: 2026-10-17 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b9d2e7a4c6'
+down_revision = 'e2a8c6f4b1d3'
+branch_labels = None
+depends_on = None
+
+# Tables whose creations are counted per day, see crm_backend.rollups.ROLLUP_MODELS
+COUNTED_TABLES = ['sales_leads', 'interactions', 'support_tickets']
+
+
+def upgrade():
+    op.create_table(
+        'activity_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_activity_rollups_entity_customer_id_day', 'activity_rollups',
+                    ['entity', 'customer_id', 'day'], unique=False, if_not_exists=True)
+
+    # Recompute from scratch, as 'compact_activity_rollups --rebuild' does
+    op.execute('DELETE FROM activity_rollups')
+    for table in COUNTED_TABLES:
+        # One row per customer and day, and one per day for the totals over all customers
+        op.execute(f"INSERT INTO activity_rollups (entity, customer_id, day, count) "
+                   f"SELECT '{table}', customer_id, DATE(created_at), COUNT(*) FROM {table} "
+                   f"WHERE created_at IS NOT NULL GROUP BY customer_id, DATE(created_at)")
+        op.execute(f"INSERT INTO activity_rollups (entity, customer_id, day, count) "
+                   f"SELECT '{table}', NULL, DATE(created_at), COUNT(*) FROM {table} "
+                   f"WHERE created_at IS NOT NULL GROUP BY DATE(created_at)")
+
+
+def downgrade():
+    op.drop_index('ix_activity_rollups_entity_customer_id_day', table_name='activity_rollups', if_exists=True)
+    op.drop_table('activity_rollups', if_exists=True)
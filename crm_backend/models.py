@@ -6,7 +6,10 @@ class Customer(db.Model):
     """Model representing a customer in the database."""
 
     __tablename__ = 'customers'
-    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+    __table_args__ = (
+        db.Index('ix_customers_created_at_id', 'created_at', 'id'),  # Cursor pagination
+        {'extend_existing': True}  # Allow redefining the table
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
@@ -17,10 +20,14 @@ class Customer(db.Model):
     address = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Automatically set the creation date
 
-    # Relationships
-    sales_leads = db.relationship('SalesLead', backref='customer', lazy=True, cascade="all, delete-orphan")
-    interactions = db.relationship('Interaction', backref='customer', lazy=True, cascade="all, delete-orphan")
-    support_tickets = db.relationship('SupportTicket', backref='customer', lazy=True, cascade="all, delete-orphan")
+    # Relationships; the database deletes the children through ON DELETE CASCADE
+    # instead of the session loading and deleting them one by one
+    sales_leads = db.relationship('SalesLead', backref='customer', lazy=True, cascade="all, delete-orphan",
+                                  passive_deletes=True)
+    interactions = db.relationship('Interaction', backref='customer', lazy=True, cascade="all, delete-orphan",
+                                   passive_deletes=True)
+    support_tickets = db.relationship('SupportTicket', backref='customer', lazy=True, cascade="all, delete-orphan",
+                                      passive_deletes=True)
 
     def __repr__(self):
         """Return a string representation of the customer."""
@@ -69,10 +76,15 @@ class SalesLead(db.Model):
     """Model representing a sales lead in the database."""
 
     __tablename__ = 'sales_leads'
-    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+    __table_args__ = (
+        db.Index('ix_sales_leads_customer_id_created_at', 'customer_id', 'created_at'),
+        db.Index('ix_sales_leads_status_created_at', 'status', 'created_at'),
+        db.Index('ix_sales_leads_created_at_id', 'created_at', 'id'),  # Cursor pagination
+        {'extend_existing': True}  # Allow redefining the table
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Automatically set the creation date
 
@@ -85,10 +97,14 @@ class Interaction(db.Model):
     """Model representing an interaction in the database."""
 
     __tablename__ = 'interactions'
-    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+    __table_args__ = (
+        db.Index('ix_interactions_customer_id_created_at', 'customer_id', 'created_at'),
+        db.Index('ix_interactions_created_at_id', 'created_at', 'id'),  # Cursor pagination
+        {'extend_existing': True}  # Allow redefining the table
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'), nullable=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Automatically set the creation date
 
@@ -101,10 +117,15 @@ class SupportTicket(db.Model):
     """Model representing a support ticket in the database."""
 
     __tablename__ = 'support_tickets'
-    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+    __table_args__ = (
+        db.Index('ix_support_tickets_customer_id_created_at', 'customer_id', 'created_at'),
+        db.Index('ix_support_tickets_status_created_at', 'status', 'created_at'),
+        db.Index('ix_support_tickets_created_at_id', 'created_at', 'id'),  # Cursor pagination
+        {'extend_existing': True}  # Allow redefining the table
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'), nullable=False)
     description = db.Column(db.Text)
     status = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Automatically set the creation date
@@ -118,12 +139,109 @@ class Analytics(db.Model):
     """Model representing analytics data in the database."""
 
     __tablename__ = 'analytics'
-    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+    __table_args__ = (
+        db.Index('ix_analytics_metric_name_period_start_date', 'metric_name', 'period_start_date'),
+        {'extend_existing': True}  # Allow redefining the table
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(db.Text)
+    metric_name = db.Column(db.String(50))
+    metric_value = db.Column(db.Numeric(10, 2))
+    period_start_date = db.Column(db.Date)
+    period_end_date = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Automatically set the creation date
 
     def __repr__(self):
         """Return a string representation of the analytics data."""
         return f"<Analytics ID: {self.id}>"
+
+
+class MetricDailyTotal(db.Model):
+    """Model holding the analytics entries of a metric per day and their running totals up to that day."""
+
+    __tablename__ = 'metric_daily_totals'
+    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+
+    metric_name = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # The period start date of the entries
+    count = db.Column(db.Integer, nullable=False, default=0)
+    value = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    running_count = db.Column(db.Integer, nullable=False, default=0)  # Sum of 'count' up to and including 'day'
+    running_value = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        """Return a string representation of the daily total."""
+        return f"<MetricDailyTotal {self.metric_name} {self.day}: {self.count}>"
+
+
+class Change(db.Model):
+    """Model recording that a row was created, updated or deleted, numbered in write order."""
+
+    __tablename__ = 'changes'
+    __table_args__ = (
+        db.Index('ix_changes_entity_entity_id_seq', 'entity', 'entity_id', 'seq'),  # Compaction
+        {'sqlite_autoincrement': True,  # Never reuse the sequence numbers of compacted changes
+         'extend_existing': True}  # Allow redefining the table
+    )
+
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # Table name, e.g. 'support_tickets'
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # 'create', 'update' or 'delete'
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        """Return a string representation of the change."""
+        return f"<Change {self.seq}: {self.action} {self.entity} {self.entity_id}>"
+
+
+class ChangeLogState(db.Model):
+    """Model holding the sequence number up to which the change log was compacted away."""
+
+    __tablename__ = 'change_log_state'
+    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+
+    id = db.Column(db.Integer, primary_key=True)
+    horizon = db.Column(db.Integer, nullable=False, default=0)
+    compacted_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        """Return a string representation of the change log state."""
+        return f"<ChangeLogState horizon: {self.horizon}>"
+
+
+class StatusCount(db.Model):
+    """Model holding the running number of rows per status for an entity."""
+
+    __tablename__ = 'status_counts'
+    __table_args__ = {'extend_existing': True}  # Allow redefining the table
+
+    entity = db.Column(db.String(50), primary_key=True)  # Table name, e.g. 'support_tickets'
+    status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """Return a string representation of the status count."""
+        return f"<StatusCount {self.entity}.{self.status}: {self.count}>"
+
+
+class ActivityRollup(db.Model):
+    """Model holding the number of rows created per day for an entity, as additive deltas."""
+
+    __tablename__ = 'activity_rollups'
+    __table_args__ = (
+        db.Index('ix_activity_rollups_entity_customer_id_day', 'entity', 'customer_id', 'day'),
+        {'extend_existing': True}  # Allow redefining the table
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(50), nullable=False)  # Table name, e.g. 'support_tickets'
+    # NULL for the totals over all customers
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'))
+    day = db.Column(db.Date, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        """Return a string representation of the rollup row."""
+        return f"<ActivityRollup {self.entity} {self.customer_id} {self.day}: {self.count}>"
@@ -0,0 +1,149 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, or_, asc, desc
+
+MAX_PER_PAGE = 100
+SORT_KEYS = ('created_at', '-created_at')
+
+
+def encode_token(values):
+    """Encode a list of JSON-serializable values into an opaque URL-safe token."""
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """
+    Decode a token produced by ``encode_token``.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def encode_cursor(created_at, id, sort):
+    """
+    Encode the position of a row into an opaque cursor string.
+
+    Args:
+        created_at (datetime): The creation timestamp of the last row on the page, or None.
+        id (int): The primary key of the last row on the page.
+        sort (str): The sort key the cursor was produced for.
+
+    Returns:
+        str: A URL-safe cursor token.
+    """
+    return encode_token([created_at.isoformat() if created_at is not None else None, id, sort])
+
+
+def decode_cursor(cursor, sort):
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor (str): The cursor token supplied by the client.
+        sort (str): The sort key of the current request.
+
+    Returns:
+        tuple: The ``(created_at, id)`` seek position; ``created_at`` is None for rows without one.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort order.
+    """
+    try:
+        created_at, id, cursor_sort = decode_token(cursor)
+        created_at = datetime.fromisoformat(created_at) if created_at is not None else None
+        id = int(id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+    if cursor_sort != sort:
+        raise ValueError('Cursor does not match the requested sort order')
+
+    return created_at, id
+
+
+def is_cursor_request():
+    """Return True if the current request opted into cursor pagination."""
+    return 'after' in request.args or 'sort' in request.args
+
+
+def paginate(query, model, page, per_page):
+    """
+    Paginate a query using either page/offset or keyset (cursor) pagination.
+
+    Offset pagination is the default and keeps the original response fields
+    (``total``, ``pages``, ``current_page``). Cursor pagination is enabled by the
+    ``after`` or ``sort`` query parameters and seeks on ``(created_at, id)``, so the
+    cost of a page does not grow with its depth. The ``COUNT(*)`` is only run in
+    cursor mode when ``with_total=true`` is passed. Rows without a ``created_at``
+    come after all other rows, in ID order, whichever the direction.
+
+    Args:
+        query (Query): The filtered query to paginate.
+        model (db.Model): The model being queried; must have ``created_at`` and ``id``.
+        page (int): The page number for offset pagination.
+        per_page (int): The number of results per page.
+
+    Returns:
+        tuple: The list of rows for the page and a dict of pagination fields.
+
+    Raises:
+        ValueError: If the sort key or cursor is invalid.
+    """
+    if not is_cursor_request():
+        result = query.paginate(page=page, per_page=per_page, error_out=False)
+        return result.items, {
+            'total': result.total,
+            'pages': result.pages,
+            'current_page': result.page
+        }
+
+    sort = request.args.get('sort', 'created_at')
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Invalid sort key, expected one of: {', '.join(SORT_KEYS)}")
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    descending = sort.startswith('-')
+    meta = {}
+
+    if request.args.get('with_total', 'false').lower() == 'true':
+        meta['total'] = query.order_by(None).count()
+
+    after = request.args.get('after')
+    created_at, id = decode_cursor(after, sort) if after else (None, None)
+    order = desc if descending else asc
+
+    # Dated and undated rows are read by separate queries instead of one ordered by
+    # NULLS FIRST/LAST: SQLite and PostgreSQL place NULLs at opposite ends of an index,
+    # and an explicit placement or an OR-ed 'IS NULL' would keep one of them from
+    # serving the page with a single range scan of the (created_at, id) index
+    rows = []
+    if created_at is not None or not after:
+        dated = query.filter(model.created_at.isnot(None))
+        if after and descending:
+            dated = dated.filter(and_(model.created_at <= created_at,
+                                      or_(model.created_at < created_at, model.id < id)))
+        elif after:
+            dated = dated.filter(and_(model.created_at >= created_at,
+                                      or_(model.created_at > created_at, model.id > id)))
+        rows = dated.order_by(order(model.created_at), order(model.id)).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        undated = query.filter(model.created_at.is_(None))
+        if after and created_at is None:
+            undated = undated.filter(model.id < id if descending else model.id > id)
+        rows += undated.order_by(order(model.id)).limit(per_page + 1 - len(rows)).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    meta['has_more'] = has_more
+    meta['next_cursor'] = encode_cursor(rows[-1].created_at, rows[-1].id, sort) if has_more else None
+    return rows, meta
@@ -0,0 +1,197 @@
+import logging
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import delete, func, select
+from crm_backend.db import db
+from crm_backend.models import Customer, SalesLead, Interaction, SupportTicket
+from crm_backend.cache import invalidate
+from crm_backend.facets import FACET_MODELS, adjust_status_count
+from crm_backend.search import SEARCH_MODELS, reindex_documents, unindex_customer_documents
+from crm_backend.rollups import forget_activity
+from crm_backend.changes import record_change, record_changes_from
+from crm_backend.suggest import unindex_customer
+from crm_backend.status_stream import notify_status_change
+
+logger = logging.getLogger('crm_backend.purge')
+
+# The history of a customer, keyed by table name
+HISTORY_MODELS = {
+    'sales_leads': SalesLead,
+    'interactions': Interaction,
+    'support_tickets': SupportTicket
+}
+
+# Finished purges kept for progress requests
+MAX_FINISHED_PURGES = 100
+
+
+def forget_status_counts(entity, *conditions):
+    """Subtract the rows matching ``conditions`` from the status counts in the current transaction."""
+    if entity not in FACET_MODELS:
+        return
+    model = HISTORY_MODELS[entity]
+    rows = db.session.execute(
+        select(model.status, func.count()).where(*conditions).group_by(model.status)
+    ).all()
+    for status, count in rows:
+        adjust_status_count(entity, status, -count)
+
+
+def delete_customer_rows(customer):
+    """
+    Delete a customer and its history in the current transaction.
+
+    The sales leads, interactions and tickets are removed by the database through
+    ON DELETE CASCADE rather than loaded into the session, so the cost is a few
+    set-based statements whatever the size of the history. Their status counts,
+    activity totals and full-text index entries are removed, and their deletes
+    added to the change log, in the same transaction.
+
+    Args:
+        customer (Customer): The customer to delete.
+    """
+    for entity, model in HISTORY_MODELS.items():
+        forget_status_counts(entity, model.customer_id == customer.id)
+        forget_activity(entity, model.customer_id == customer.id, per_customer=False)
+        record_changes_from(entity, 'delete', select(model.id).where(model.customer_id == customer.id))
+    unindex_customer_documents(customer.id)
+    record_change('customers', 'delete', customer.id)
+    db.session.delete(customer)
+
+
+class CustomerPurge:
+    """The progress of an asynchronous customer purge."""
+
+    def __init__(self, customer_id, totals):
+        self.id = uuid.uuid4().hex
+        self.customer_id = customer_id
+        self.totals = totals
+        self.deleted = Counter()
+        self.status = 'running'
+        self.error = None
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+
+    def to_dict(self):
+        total = sum(self.totals.values())
+        done = sum(self.deleted.values())
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'status': self.status,
+            'deleted': {entity: self.deleted[entity] for entity in HISTORY_MODELS},
+            'totals': self.totals,
+            'progress': round(min(done / total, 1.0), 4) if total else 1.0,
+            'error': self.error,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+
+class CustomerPurger:
+    """
+    Deletes the history of large customers in bounded chunks on background threads.
+
+    Each chunk is one set-based DELETE of at most ``chunk_size`` rows committed
+    with its status count and search index changes, so other requests are never
+    blocked for longer than one chunk. The customer row itself is deleted last.
+    Progress is kept in memory, so it can only be read from the process that
+    started the purge.
+    """
+
+    def __init__(self, app, chunk_size=1000):
+        self.app = app
+        self.chunk_size = chunk_size
+        self.purges = {}
+        self.lock = threading.Lock()
+
+    def start(self, customer_id):
+        """
+        Start purging a customer unless a purge of it is already running.
+
+        Returns:
+            CustomerPurge: The new or running purge.
+        """
+        totals = {
+            entity: db.session.scalar(select(func.count()).select_from(model).where(model.customer_id == customer_id))
+            for entity, model in HISTORY_MODELS.items()
+        }
+        with self.lock:
+            for purge in self.purges.values():
+                if purge.customer_id == customer_id and purge.status == 'running':
+                    return purge
+            self.prune()
+            purge = CustomerPurge(customer_id, totals)
+            self.purges[purge.id] = purge
+
+        threading.Thread(target=self.run, args=(purge,), name=f'customer-purge-{customer_id}', daemon=True).start()
+        return purge
+
+    def get(self, purge_id):
+        """Return the purge with ``purge_id``, or None."""
+        return self.purges.get(purge_id)
+
+    def prune(self):
+        """Forget the oldest finished purges beyond ``MAX_FINISHED_PURGES``; the lock must be held."""
+        finished = sorted((purge for purge in self.purges.values() if purge.status != 'running'),
+                          key=lambda purge: purge.finished_at)
+        for purge in finished[:max(0, len(finished) - MAX_FINISHED_PURGES)]:
+            del self.purges[purge.id]
+
+    def run(self, purge):
+        with self.app.app_context():
+            try:
+                for entity, model in HISTORY_MODELS.items():
+                    while self.delete_chunk(purge, entity, model):
+                        pass
+
+                customer = db.session.get(Customer, purge.customer_id)
+                if customer is not None:
+                    # Rows added while the purge ran are removed by the cascade
+                    delete_customer_rows(customer)
+                    db.session.commit()
+                invalidate('customers', *HISTORY_MODELS)
+                unindex_customer(purge.customer_id)
+                notify_status_change('support_tickets')
+                purge.status = 'completed'
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('Purge of customer %s failed', purge.customer_id)
+                purge.status = 'failed'
+                purge.error = str(e)
+            finally:
+                db.session.remove()
+                purge.finished_at = datetime.utcnow()
+
+    def delete_chunk(self, purge, entity, model):
+        """Delete the next chunk of a customer's rows of one entity; return False when none are left."""
+        ids = db.session.scalars(
+            select(model.id).where(model.customer_id == purge.customer_id).order_by(model.id).limit(self.chunk_size)
+        ).all()
+        if not ids:
+            return False
+
+        forget_status_counts(entity, model.id.in_(ids))
+        forget_activity(entity, model.id.in_(ids), per_customer=False)
+        record_changes_from(entity, 'delete', select(model.id).where(model.id.in_(ids)))
+        result = db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+        if entity in SEARCH_MODELS:
+            reindex_documents(entity, ids)
+        db.session.commit()
+
+        purge.deleted[entity] += result.rowcount
+        invalidate(entity)
+        notify_status_change(entity)
+        return True
+
+
+def init_purge(app):
+    """
+    Create the purger of asynchronous customer deletes.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.extensions['customer_purger'] = CustomerPurger(app, app.config['CUSTOMER_PURGE_CHUNK_SIZE'])
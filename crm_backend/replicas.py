@@ -0,0 +1,170 @@
+import random
+import sqlite3
+import threading
+import time
+import sqlalchemy as sa
+from flask import current_app, g, request, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+
+# Methods whose successful responses start a worker's read-your-writes window
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Prune expired read-your-writes entries once this many workers are tracked
+MAX_TRACKED_WRITERS = 10000
+
+
+class ReplicaRouter:
+    """
+    Chooses the replica for read requests and tracks each worker's last write.
+
+    Worker write times are kept in process memory, so the read-your-writes window
+    holds for requests served by the process that handled the write.
+    """
+
+    def __init__(self, bind_keys, sticky_seconds):
+        self.bind_keys = bind_keys
+        self.sticky_seconds = sticky_seconds
+        self.last_writes = {}
+        self.lock = threading.Lock()
+
+    def choose(self):
+        """Return the bind key of a replica to read from."""
+        return random.choice(self.bind_keys)
+
+    def record_write(self, identity):
+        """Start the read-your-writes window of ``identity``."""
+        now = time.monotonic()
+        with self.lock:
+            self.last_writes[identity] = now
+            if len(self.last_writes) > MAX_TRACKED_WRITERS:
+                self.last_writes = {
+                    key: written for key, written in self.last_writes.items()
+                    if now - written < self.sticky_seconds
+                }
+
+    def is_sticky(self, identity):
+        """Return True if ``identity`` wrote within the last ``sticky_seconds``."""
+        written = self.last_writes.get(identity)
+        return written is not None and time.monotonic() - written < self.sticky_seconds
+
+
+def current_identity():
+    """Return the JWT identity of the current request, or None if it has not been verified."""
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of GET requests to a read replica.
+
+    Statements go to the primary when no replica is configured, outside of GET and
+    HEAD requests, during the read-your-writes window of the requesting worker, and
+    for the rest of the session once it has flushed or executed an INSERT, UPDATE or
+    DELETE, so a handler always reads its own writes.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.replica_key = None
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.reads_from_replica(clause):
+            if self.replica_key is None:
+                self.replica_key = current_app.extensions['read_replicas'].choose()
+                g.read_from_replica = True
+            return self._db.engines[self.replica_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def reads_from_replica(self, clause):
+        """Return True if ``clause`` may be run on a replica."""
+        if self._flushing or isinstance(clause, sa.UpdateBase):
+            self.wrote = True
+        if self.wrote or not has_request_context() or request.method not in ('GET', 'HEAD'):
+            return False
+        router = current_app.extensions.get('read_replicas')
+        return router is not None and not router.is_sticky(current_identity())
+
+
+def configure_replicas(app):
+    """
+    Add a ``replica_<n>`` bind for each URL in READ_REPLICA_URLS.
+
+    Must be called before ``db.init_app``, which creates the engines.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for i, url in enumerate(app.config['READ_REPLICA_URLS']):
+        binds[f'replica_{i}'] = url
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_replicas(app):
+    """
+    Route the reads of GET requests to the read replicas, if any are configured.
+
+    A successful POST, PUT, PATCH or DELETE by a worker sends that worker's reads
+    to the primary for READ_REPLICA_STICKY_SECONDS, so they see their own writes
+    despite replication lag.
+
+    Args:
+        app (Flask): The Flask application instance; ``db`` must already be initialized.
+    """
+    bind_keys = [f'replica_{i}' for i in range(len(app.config['READ_REPLICA_URLS']))]
+    if not bind_keys:
+        return
+
+    router = app.extensions['read_replicas'] = ReplicaRouter(bind_keys, app.config['READ_REPLICA_STICKY_SECONDS'])
+
+    @app.after_request
+    def record_worker_write(response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            identity = current_identity()
+            if identity is not None:
+                router.record_write(identity)
+        return response
+
+
+def sync_sqlite_replicas(engines):
+    """
+    Copy a SQLite primary database over its SQLite replicas with the online backup API.
+
+    This stands in for replication when running locally with replica files.
+
+    Args:
+        engines (dict): ``db.engines``, mapping bind keys to engines.
+
+    Returns:
+        list: The paths of the replicas that were updated.
+
+    Raises:
+        ValueError: If the primary or a replica is not a SQLite file.
+    """
+    primary = engines[None].url
+    if primary.get_backend_name() != 'sqlite' or primary.database in (None, '', ':memory:'):
+        raise ValueError('The primary database must be a SQLite file')
+
+    synced = []
+    source = sqlite3.connect(primary.database)
+    try:
+        for key, engine in engines.items():
+            if key is None or not key.startswith('replica_'):
+                continue
+            if engine.url.get_backend_name() != 'sqlite':
+                raise ValueError(f'Replica {key} is not a SQLite database')
+            engine.dispose()
+            target = sqlite3.connect(engine.url.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            synced.append(engine.url.database)
+    finally:
+        source.close()
+    return synced
@@ -0,0 +1,200 @@
+from datetime import datetime
+from flask import current_app, request, jsonify
+from crm_backend.filters import parse_date_range
+from crm_backend.snapshot import NULL_CODE, np
+
+# Upper bounds, in days, of the ticket age buckets; the last bucket is open-ended
+TICKET_AGE_BOUNDS = (1, 7, 30, 90)
+
+# Ticket statuses that no longer age
+CLOSED_TICKET_STATUSES = ('deactivated',)
+
+MAX_REPORT_LIMIT = 1000
+
+
+def created_within(table, start=None, end=None):
+    """Return the mask of the rows of a snapshot table created within ``[start, end)``."""
+    created_at = table['created_at']
+    mask = np.ones(len(table), dtype=bool)
+    if start:
+        mask &= created_at >= np.datetime64(start, 's')
+    if end:
+        mask &= created_at < np.datetime64(end, 's')
+    return mask
+
+
+def customer_lookup(snapshot, column):
+    """
+    Return an array mapping customer IDs to the value of one of their columns.
+
+    Indexing it with a customer ID column joins the customer value to every row in
+    one vectorized gather instead of a hash join.
+    """
+    customers = snapshot['customers']
+    ids = customers['id']
+    lookup = np.full(int(ids.max()) + 1 if len(ids) else 1, NULL_CODE, dtype=customers[column].dtype)
+    lookup[ids] = customers[column]
+    return lookup
+
+
+def join_customers(lookup, customer_ids):
+    """Gather the customer values of ``customer_ids``; IDs without a customer get ``NULL_CODE``."""
+    known = customer_ids < len(lookup)
+    return np.where(known, lookup[np.where(known, customer_ids, 0)], NULL_CODE)
+
+
+def company_pipeline(snapshot, start=None, end=None, limit=20):
+    """
+    Count the sales leads of each company per status.
+
+    Args:
+        snapshot (Snapshot): The snapshot to read.
+        start (datetime): Optional inclusive lower bound on the lead creation date.
+        end (datetime): Optional exclusive upper bound on the lead creation date.
+        limit (int): The number of companies to return, those with the most leads first.
+
+    Returns:
+        list: One dict per company with its number of 'leads', the counts per status and
+        the 'win_rate', the share of won leads among the won and lost ones.
+    """
+    leads = snapshot['sales_leads']
+    companies = snapshot['customers'].categories('company')
+    statuses = leads.categories('status')
+
+    company = join_customers(customer_lookup(snapshot, 'company'), leads['customer_id'])
+    status = np.asarray(leads['status'])
+    mask = created_within(leads, start, end) & (company != NULL_CODE) & (status != NULL_CODE)
+
+    # One bincount over the combined (company, status) code counts every pair at once
+    counts = np.bincount(company[mask].astype(np.int64) * len(statuses) + status[mask],
+                         minlength=len(companies) * len(statuses)).reshape(len(companies), len(statuses))
+    totals = counts.sum(axis=1)
+    won, lost = (counts[:, code] if code is not None else np.zeros(len(companies), dtype=np.int64)
+                 for code in (leads.code('status', 'won'), leads.code('status', 'lost')))
+
+    order = np.argsort(-totals, kind='stable')[:limit]
+    return [{
+        'company': companies[index],
+        'leads': int(totals[index]),
+        'statuses': {statuses[code]: int(count) for code, count in enumerate(counts[index]) if count},
+        'win_rate': round(float(won[index] / (won[index] + lost[index])), 4) if won[index] + lost[index] else None
+    } for index in order if totals[index]]
+
+
+def ticket_ageing(snapshot, now=None, bounds=TICKET_AGE_BOUNDS):
+    """
+    Count the open support tickets per status and age bucket.
+
+    Args:
+        snapshot (Snapshot): The snapshot to read.
+        now (datetime): The time ages are measured at (default is the snapshot time).
+        bounds (tuple): The upper bounds of the age buckets, in days.
+
+    Returns:
+        dict: Per status, the number of open tickets per bucket label, e.g. '1-7d',
+        their median age in days, and the number of open tickets without a creation
+        date, which have no age and are left out of the buckets.
+    """
+    tickets = snapshot['support_tickets']
+    statuses = tickets.categories('status')
+    now = np.datetime64(now or datetime.fromisoformat(snapshot.created_at), 's')
+
+    status = np.asarray(tickets['status'])
+    open_ = status != NULL_CODE
+    for closed in CLOSED_TICKET_STATUSES:
+        code = tickets.code('status', closed)
+        if code is not None:
+            open_ &= status != code
+    undated = np.bincount(status[open_ & np.isnat(tickets['created_at'])], minlength=len(statuses))
+    open_ &= ~np.isnat(tickets['created_at'])
+    age = (now - tickets['created_at'][open_]) / np.timedelta64(1, 'D')
+    status = status[open_]
+
+    labels = [f'{low}-{high}d' for low, high in zip((0,) + bounds, bounds)] + [f'{bounds[-1]}d+']
+    bucket = np.searchsorted(np.asarray(bounds, dtype=float), age, side='right')
+    counts = np.bincount(status.astype(np.int64) * len(labels) + bucket,
+                         minlength=len(statuses) * len(labels)).reshape(len(statuses), len(labels))
+
+    report = {}
+    for code in np.flatnonzero(counts.sum(axis=1) + undated):
+        report[statuses[code]] = {
+            'buckets': dict(zip(labels, counts[code].tolist())),
+            'median_age_days': round(float(np.median(age[status == code])), 1) if counts[code].any() else None,
+            'undated': int(undated[code])
+        }
+    return report
+
+
+def interaction_frequency(snapshot, start=None, end=None, limit=10):
+    """
+    Summarize how often customers are contacted.
+
+    Args:
+        snapshot (Snapshot): The snapshot to read.
+        start (datetime): Optional inclusive lower bound on the interaction date.
+        end (datetime): Optional exclusive upper bound on the interaction date.
+        limit (int): The number of most contacted customers to return.
+
+    Returns:
+        dict: The number of 'interactions' and of contacted 'customers', the mean, median
+        and 90th percentile of interactions per contacted customer, and the 'top' customers.
+    """
+    interactions = snapshot['interactions']
+    customer_ids = interactions['customer_id'][created_within(interactions, start, end)]
+    per_customer = np.bincount(customer_ids) if len(customer_ids) else np.zeros(0, dtype=np.int64)
+    contacted = np.flatnonzero(per_customer)
+    counts = per_customer[contacted]
+
+    top = contacted[np.argsort(-counts, kind='stable')[:limit]]
+    companies = snapshot['customers'].categories('company')
+    company = join_customers(customer_lookup(snapshot, 'company'), top)
+
+    return {
+        'interactions': int(counts.sum()),
+        'customers': len(contacted),
+        'mean': round(float(counts.mean()), 2) if len(counts) else None,
+        'median': float(np.median(counts)) if len(counts) else None,
+        'p90': float(np.percentile(counts, 90)) if len(counts) else None,
+        'top': [{'customer_id': int(id), 'company': companies[code] if code != NULL_CODE else None,
+                 'interactions': int(per_customer[id])} for id, code in zip(top, company)]
+    }
+
+
+# Reports by name: (function, whether it takes a date range, whether it takes a limit)
+REPORTS = {
+    'company_pipeline': (company_pipeline, True, True),
+    'ticket_ageing': (ticket_ageing, False, False),
+    'interaction_frequency': (interaction_frequency, True, True)
+}
+
+
+def report_response(name):
+    """
+    Build the JSON response of a report from the current snapshot and the request arguments.
+
+    Query parameters:
+        start_date (str), end_date (str): Optional inclusive date range, for reports that take one.
+        limit (int): The number of rows of ranked reports (default is 20 or 10).
+
+    Returns:
+        Response: The 'snapshot' the report was computed from and the 'report'.
+    """
+    function, dated, limited = REPORTS[name]
+    try:
+        snapshot = current_app.extensions['snapshots'].current()
+    except (LookupError, RuntimeError) as e:
+        return jsonify({'message': str(e)}), 503
+
+    kwargs = {}
+    if dated:
+        try:
+            kwargs['start'], kwargs['end'] = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    if limited and 'limit' in request.args:
+        kwargs['limit'] = min(max(request.args.get('limit', 1, type=int), 1), MAX_REPORT_LIMIT)
+
+    return jsonify({
+        'snapshot': {'id': snapshot.id, 'created_at': snapshot.created_at},
+        'report': function(snapshot, **kwargs)
+    })
@@ -0,0 +1,239 @@
+from collections import Counter
+from datetime import timedelta
+from flask import request, jsonify
+from sqlalchemy import Date, cast, delete, func, insert, literal, null, select, tuple_
+from crm_backend.db import db
+from crm_backend.filters import parse_date_range
+from crm_backend.models import SalesLead, Interaction, SupportTicket, ActivityRollup
+
+# Entities whose creations are counted per day, keyed by table name
+ROLLUP_MODELS = {
+    'sales_leads': SalesLead,
+    'interactions': Interaction,
+    'support_tickets': SupportTicket
+}
+
+BUCKETS = ('day', 'week', 'month')
+
+ROLLUP_COLUMNS = ('entity', 'customer_id', 'day', 'count')
+
+# Customer IDs whose rollup rows are merged per transaction by ``compact_rollups``
+COMPACT_CHUNK_SIZE = 1000
+
+
+def record_activity(entity, rows, delta=1):
+    """
+    Add created or deleted rows to the daily activity rollup in the current transaction.
+
+    Each change is appended as a delta row, once for the customer and once for the
+    total over all customers, rather than updating a counter in place, so
+    concurrent writers never wait on the same row. ``compact_rollups`` merges the
+    deltas later.
+
+    Args:
+        entity (str): A key of ``ROLLUP_MODELS``.
+        rows (iterable): ``(customer_id, created_at)`` pairs of the changed rows; rows
+            without a ``created_at`` are not counted.
+        delta (int): 1 for created rows, -1 for deleted rows.
+    """
+    days = Counter()
+    for customer_id, created_at in rows:
+        if created_at is None:
+            continue
+        day = created_at.date()
+        days[customer_id, day] += delta
+        days[None, day] += delta
+
+    if days:
+        db.session.execute(insert(ActivityRollup.__table__), [
+            {'entity': entity, 'customer_id': customer_id, 'day': day, 'count': count}
+            for (customer_id, day), count in days.items()
+        ])
+
+
+def forget_activity(entity, *conditions, per_customer=True):
+    """
+    Subtract the rows matching ``conditions`` from the activity rollup in the current transaction.
+
+    Call this before the rows are deleted. The deltas are computed by the database
+    with one grouped INSERT ... SELECT, so no rows are loaded.
+
+    Args:
+        entity (str): A key of ``ROLLUP_MODELS``.
+        *conditions: WHERE conditions on the model of ``entity``.
+        per_customer (bool): Also subtract from the per-customer rows. Pass False when
+            the customer is being deleted, since its rows are removed by the cascade.
+    """
+    model = ROLLUP_MODELS[entity]
+    table = ActivityRollup.__table__
+    day = func.date(model.created_at)
+    conditions += (model.created_at.isnot(None),)
+
+    if per_customer:
+        db.session.execute(insert(table).from_select(ROLLUP_COLUMNS, (
+            select(literal(entity), model.customer_id, day, -func.count())
+            .where(*conditions).group_by(model.customer_id, day)
+        )))
+    db.session.execute(insert(table).from_select(ROLLUP_COLUMNS, (
+        select(literal(entity), null(), day, -func.count()).where(*conditions).group_by(day)
+    )))
+
+
+def rebuild_rollups():
+    """
+    Recompute the activity rollup of every entity from the source tables.
+
+    Returns:
+        dict: The number of rollup rows written per entity.
+    """
+    table = ActivityRollup.__table__
+    db.session.execute(delete(table))
+
+    counts = {}
+    for entity, model in ROLLUP_MODELS.items():
+        day = func.date(model.created_at)
+        dated = model.created_at.isnot(None)
+        written = db.session.execute(insert(table).from_select(ROLLUP_COLUMNS, (
+            select(literal(entity), model.customer_id, day, func.count()).where(dated)
+            .group_by(model.customer_id, day)
+        ))).rowcount
+        written += db.session.execute(insert(table).from_select(ROLLUP_COLUMNS, (
+            select(literal(entity), null(), day, func.count()).where(dated).group_by(day)
+        ))).rowcount
+        counts[entity] = written
+
+    db.session.commit()
+    return counts
+
+
+def compact_rollups(chunk_size=COMPACT_CHUNK_SIZE):
+    """
+    Merge the delta rows of the activity rollup into one row per entity, customer and day.
+
+    Only keys with more than one row are touched: the database sums their rows
+    into a new row with one INSERT ... SELECT and deletes the old ones, without
+    loading them. Customers are merged ``chunk_size`` at a time, each chunk in its
+    own transaction, so memory and lock time follow the number of new deltas
+    rather than the size of the table. Rows appended while it runs are left for
+    the next run. Keys whose deltas cancel out are dropped.
+
+    Args:
+        chunk_size (int): The number of customer IDs merged per transaction.
+
+    Returns:
+        tuple: The number of rows merged and the number of rows they were merged into.
+    """
+    table = ActivityRollup.__table__
+    last_id = db.session.scalar(select(func.max(table.c.id)))
+    low, high = db.session.execute(select(func.min(table.c.customer_id), func.max(table.c.customer_id))).one()
+    db.session.commit()
+    if last_id is None:
+        return 0, 0
+
+    # The totals over all customers first, then the per-customer rows by ID range
+    chunks = [(table.c.customer_id.is_(None), null(), [table.c.entity, table.c.day])]
+    if low is not None:
+        chunks += [(table.c.customer_id.between(start, start + chunk_size - 1), table.c.customer_id,
+                    [table.c.entity, table.c.customer_id, table.c.day])
+                   for start in range(low, high + 1, chunk_size)]
+
+    merged = written = 0
+    for condition, customer_id, key in chunks:
+        rows = (table.c.id <= last_id, condition)
+        duplicated = select(*key).where(*rows).group_by(*key).having(func.count() > 1)
+        written += db.session.execute(insert(table).from_select(ROLLUP_COLUMNS, (
+            select(table.c.entity, customer_id, table.c.day, func.sum(table.c.count))
+            .where(*rows).group_by(*key).having(func.count() > 1, func.sum(table.c.count) != 0)
+        ))).rowcount
+        merged += db.session.execute(
+            delete(table).where(*rows, tuple_(*key).in_(duplicated)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+    return merged, written
+
+
+def bucket_expression(bucket, dialect):
+    """
+    Return the SQL expression of the first day of the bucket holding ``ActivityRollup.day``.
+
+    Weeks start on Monday.
+    """
+    day = ActivityRollup.day
+    if bucket == 'day':
+        return day
+    if dialect == 'sqlite':
+        if bucket == 'week':
+            return func.date(day, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m-01', day)
+    return cast(func.date_trunc(bucket, day), Date)
+
+
+def timeseries(entities, bucket, customer_id=None, start=None, end=None):
+    """
+    Count the rows created per bucket for several entities in a single grouped query.
+
+    The query reads the activity rollup rather than the source tables, so its cost
+    depends on the number of days in the range, not the number of rows created.
+
+    Args:
+        entities (list): Keys of ``ROLLUP_MODELS``.
+        bucket (str): One of ``BUCKETS``.
+        customer_id (int): Optional customer to restrict the counts to.
+        start (datetime): Optional inclusive lower bound; only its date is used.
+        end (datetime): Optional exclusive upper bound; days it touches are included.
+
+    Returns:
+        dict: Maps each entity to a list of ``{'start', 'count'}`` buckets in date order;
+        buckets without activity are left out.
+    """
+    bucket_start = bucket_expression(bucket, db.session.get_bind().dialect.name).label('bucket')
+    total = func.sum(ActivityRollup.count)
+
+    stmt = select(ActivityRollup.entity, bucket_start, total.label('count')).where(ActivityRollup.entity.in_(entities))
+    if customer_id:
+        stmt = stmt.where(ActivityRollup.customer_id == customer_id)
+    else:
+        stmt = stmt.where(ActivityRollup.customer_id.is_(None))
+    if start:
+        stmt = stmt.where(ActivityRollup.day >= start.date())
+    if end:
+        stmt = stmt.where(ActivityRollup.day <= (end - timedelta(microseconds=1)).date())
+
+    stmt = stmt.group_by(ActivityRollup.entity, bucket_start).having(total != 0).order_by(ActivityRollup.entity,
+                                                                                           bucket_start)
+    series = {entity: [] for entity in entities}
+    for entity, start_day, count in db.session.execute(stmt):
+        series[entity].append({'start': str(start_day), 'count': count})
+    return series
+
+
+def timeseries_response():
+    """
+    Build the JSON response of the activity time series endpoint from the request arguments.
+
+    Query parameters:
+        entity (str): Comma-separated keys of ``ROLLUP_MODELS`` (default is all of them).
+        bucket (str): 'day' (default), 'week' or 'month'.
+        customer_id (int): Optional customer to restrict the counts to.
+        start_date (str), end_date (str): Optional inclusive date range.
+
+    Returns:
+        Response: The 'bucket' and the 'series' of each entity.
+    """
+    entities = [entity for entity in request.args.get('entity', ','.join(ROLLUP_MODELS)).split(',') if entity]
+    unknown = [entity for entity in entities if entity not in ROLLUP_MODELS]
+    if unknown or not entities:
+        return jsonify({'message': f"Invalid entity, expected any of: {', '.join(ROLLUP_MODELS)}"}), 400
+
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return jsonify({'message': f"Invalid bucket, expected one of: {', '.join(BUCKETS)}"}), 400
+
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    series = timeseries(entities, bucket, request.args.get('customer_id', type=int), start, end)
+    return jsonify({'bucket': bucket, 'series': series})
@@ -1,17 +1,19 @@
-from flask import Blueprint
+def register_blueprints(app):
+    """
+    Register the Blueprint defined in each route module with the Flask app.
 
-# Define blueprints for each route
-workers_bp = Blueprint('workers', __name__)
-customers_bp = Blueprint('customers', __name__)
-sales_leads_bp = Blueprint('sales_leads', __name__)
-interactions_bp = Blueprint('interactions', __name__)
-support_tickets_bp = Blueprint('support_tickets', __name__)
-analytics_bp = Blueprint('analytics', __name__)
+    The route modules import ``db`` from ``crm_backend.backend_app``, so they are
+    imported here rather than at module level to avoid a circular import.
+    """
+    from crm_backend.routes import workers, customers, sales_leads, interactions, support_tickets, analytics, exports, \
+        reports, changes
 
-def register_blueprints(app):
-    app.register_blueprint(workers_bp)
-    app.register_blueprint(customers_bp)
-    app.register_blueprint(sales_leads_bp)
-    app.register_blueprint(interactions_bp)
-    app.register_blueprint(support_tickets_bp)
-    app.register_blueprint(analytics_bp)
+    app.register_blueprint(workers.bp)
+    app.register_blueprint(customers.bp)
+    app.register_blueprint(sales_leads.bp)
+    app.register_blueprint(interactions.bp)
+    app.register_blueprint(support_tickets.bp)
+    app.register_blueprint(analytics.bp)
+    app.register_blueprint(exports.bp)
+    app.register_blueprint(reports.bp)
+    app.register_blueprint(changes.bp)
@@ -2,12 +2,18 @@ from flask import Blueprint, request, jsonify
 from crm_backend.backend_app import db
 from crm_backend.models import Analytics
 from flask_jwt_extended import jwt_required
-from sqlalchemy import func
+from crm_backend.cache import cached, invalidate
+from crm_backend.rollups import timeseries_response
+from crm_backend.metric_totals import adjust_entry, metric_totals_response, parse_metric_fields
+from crm_backend.serializers import SCHEMAS
+from crm_backend.changes import record_change
+from datetime import datetime
 
 bp = Blueprint('analytics', __name__, url_prefix='/analytics')
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached('analytics')
 def get_analytics():
     """
     Retrieve all analytics entries from the database.
@@ -16,10 +22,11 @@ def get_analytics():
         A JSON response containing all analytics entries in the database.
     """
     analytics = Analytics.query.all()
-    return jsonify([{'id': a.id, 'data': a.data} for a in analytics])
+    return jsonify(SCHEMAS['analytics'].dump_many(analytics))
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cached('analytics')
 def get_analytic(id):
     """
     Retrieve a specific analytics entry by its ID.
@@ -31,7 +38,7 @@ def get_analytic(id):
         A JSON response containing the details of the requested analytics entry.
     """
     analytic = Analytics.query.get_or_404(id)
-    return jsonify({'id': analytic.id, 'data': analytic.data})
+    return jsonify(SCHEMAS['analytics'].dump(analytic))
 
 @bp.route('/', methods=['POST'])
 @jwt_required()
@@ -40,15 +47,39 @@ def create_analytic():
     Create a new analytics entry.
 
     Request body:
-        data (JSON): A JSON object containing the data for the new analytics entry.
+        data (JSON): Optional free-form data for the new analytics entry.
+        metric_name (str): The name of the metric, e.g. 'revenue'.
+        metric_value (float): The value of the metric; required with 'metric_name'.
+        period_start_date (str): The first day of the period (YYYY-MM-DD, default is today).
+        period_end_date (str): Optional last day of the period (YYYY-MM-DD).
 
     Returns:
         A JSON response indicating the success of the operation and the ID of the newly created entry.
     """
-    data = request.get_json()
-    analytic = Analytics(data=data['data'])
-    db.session.add(analytic)
-    db.session.commit()
+    data = request.get_json() or {}
+    try:
+        values = parse_metric_fields(data)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if values.get('metric_name') and values.get('metric_value') is None:
+        return jsonify({'message': "'metric_value' is required with 'metric_name'"}), 400
+    if 'data' not in data and not values.get('metric_name'):
+        return jsonify({'message': "Provide 'data' or 'metric_name' and 'metric_value'"}), 400
+
+    if values.get('period_start_date') is None:
+        values['period_start_date'] = datetime.utcnow().date()
+    try:
+        analytic = Analytics(data=data.get('data'), **values)
+        db.session.add(analytic)
+        db.session.flush()
+        adjust_entry(analytic, 1)
+        record_change('analytics', 'create', analytic.id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error creating analytics entry', 'error': str(e)}), 500
+
+    invalidate('analytics')
     return jsonify({'id': analytic.id, 'message': 'Analytics entry created successfully'}), 201
 
 @bp.route('/<int:id>', methods=['PUT'])
@@ -61,15 +92,36 @@ def update_analytic(id):
         id (int): The ID of the analytics entry to update.
 
     Request body:
-        data (JSON): A JSON object containing the updated data for the analytics entry.
+        data (JSON): Optional updated data for the analytics entry.
+        metric_name (str), metric_value (float), period_start_date (str), period_end_date (str):
+            Optional updated metric columns, see ``create_analytic``.
 
     Returns:
         A JSON response indicating the success of the update operation.
     """
     analytic = Analytics.query.get_or_404(id)
-    data = request.get_json()
-    analytic.data = data.get('data', analytic.data)
-    db.session.commit()
+    data = request.get_json() or {}
+    try:
+        values = parse_metric_fields(data)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    try:
+        adjust_entry(analytic, -1)
+        analytic.data = data.get('data', analytic.data)
+        for key, value in values.items():
+            setattr(analytic, key, value)
+        if analytic.metric_name and analytic.metric_value is None:
+            db.session.rollback()
+            return jsonify({'message': "'metric_value' is required with 'metric_name'"}), 400
+        adjust_entry(analytic, 1)
+        record_change('analytics', 'update', id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating analytics entry', 'error': str(e)}), 500
+
+    invalidate('analytics')
     return jsonify({'message': 'Analytics entry updated successfully'})
 
 @bp.route('/<int:id>', methods=['DELETE'])
@@ -85,50 +137,72 @@ def delete_analytic(id):
         A JSON response indicating the success of the delete operation.
     """
     analytic = Analytics.query.get_or_404(id)
-    db.session.delete(analytic)
-    db.session.commit()
+    try:
+        adjust_entry(analytic, -1)
+        db.session.delete(analytic)
+        record_change('analytics', 'delete', id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting analytics entry', 'error': str(e)}), 500
+
+    invalidate('analytics')
     return jsonify({'message': 'Analytics entry deleted successfully'})
 
 @bp.route('/filter_aggregate', methods=['GET'])
 @jwt_required()
+@cached('analytics')
 def filter_and_aggregate_analytics():
     """
-    Filter analytics entries by a date range and aggregate the data.
+    Count and sum the analytics entries per metric over a date range.
+
+    The totals come from the per-day running totals of each metric, so they cost a
+    couple of index lookups per metric however many entries the range holds. The
+    entries themselves are only loaded when requested, one page at a time.
 
     Query parameters:
-        start_date (str): The start date for filtering analytics entries.
-        end_date (str): The end date for filtering analytics entries.
+        start_date (str): Optional first period start date to include (YYYY-MM-DD).
+        end_date (str): Optional last period start date to include (YYYY-MM-DD).
+        metric_name (str): Optional comma-separated metrics to aggregate (default is all of them).
+        include_rows (bool): Also return the matching entries (default is false).
+        page (int): The page number of the entries (default is 1).
+        per_page (int): The number of entries per page (default is 10).
 
     Returns:
-        A JSON response containing the filtered analytics data, total count of entries, and the sum of the 'value' field.
+        A JSON response containing the total count of entries and the sum of their values,
+        the totals per metric and, if requested, a page of the matching entries.
     """
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+    return metric_totals_response(SCHEMAS['analytics'])
 
-    query = Analytics.query
-    if start_date:
-        query = query.filter(Analytics.timestamp >= start_date)
-    if end_date:
-        query = query.filter(Analytics.timestamp <= end_date)
+@bp.route('/timeseries', methods=['GET'])
+@jwt_required()
+@cached('sales_leads', 'interactions', 'support_tickets')
+def activity_timeseries():
+    """
+    Count the sales leads, interactions and support tickets created per day, week or month.
 
-    analytics = query.all()
-    total_count = db.session.query(func.count(Analytics.id)).filter(Analytics.timestamp >= start_date, Analytics.timestamp <= end_date).scalar()
-    total_value = db.session.query(func.sum(func.cast(Analytics.data['value'], db.Float))).filter(Analytics.timestamp >= start_date, Analytics.timestamp <= end_date).scalar()
+    Query parameters:
+        entity (str): Comma-separated entities, e.g. 'support_tickets' (default is all three).
+        bucket (str): 'day' (default), 'week' (starting on Monday) or 'month'.
+        customer_id (int): Optional filter to count the activity of a specific customer.
+        start_date (str): Optional first date to include (YYYY-MM-DD).
+        end_date (str): Optional last date to include (YYYY-MM-DD).
 
-    return jsonify({
-        'total_count': total_count,
-        'total_value': total_value,
-        'analytics': [{'id': a.id, 'data': a.data, 'timestamp': a.timestamp} for a in analytics]
-    })
+    Returns:
+        A JSON response with the bucket size and, per entity, the start date and count
+        of every bucket with activity, served from the daily activity rollup.
+    """
+    return timeseries_response()
 
 @bp.route('/recent', methods=['GET'])
 @jwt_required()
+@cached('analytics')
 def recent_analytics():
     """
-    Retrieve the most recent analytics entries, ordered by their timestamp.
+    Retrieve the most recent analytics entries, ordered by their creation date.
 
     Returns:
         A JSON response containing the five most recent analytics entries.
     """
-    recent_entries = Analytics.query.order_by(Analytics.timestamp.desc()).limit(5).all()
-    return jsonify([{'id': a.id, 'data': a.data, 'timestamp': a.timestamp} for a in recent_entries])
+    recent_entries = Analytics.query.order_by(Analytics.created_at.desc(), Analytics.id.desc()).limit(5).all()
+    return jsonify(SCHEMAS['analytics'].dump_many(recent_entries))
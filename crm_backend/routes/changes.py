@@ -0,0 +1,27 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
+from crm_backend.changes import changes_response
+
+bp = Blueprint('changes', __name__, url_prefix='/changes')
+
+@bp.route('/', methods=['GET'])
+@jwt_required()
+def get_changes():
+    """
+    Retrieve the rows created, updated or deleted since a position in the change log.
+
+    Pages can keep their lists current by polling this endpoint and refetching only
+    the rows named in the response, instead of reloading the whole list after every
+    change. Read 'next_since' without 'since' before loading a list, then pass it back.
+
+    Query parameters:
+        since (int): The 'next_since' of the previous response.
+        entities (str): Optional comma-separated entities, e.g. 'customers,sales_leads'.
+        limit (int): The maximum number of changes to return (default is 500, at most 1000).
+
+    Returns:
+        A JSON response containing the changes in order, each with its 'seq', 'entity', 'id',
+        'action' and 'changed_at', the 'next_since' to poll with and whether there are more.
+        The status is 410 if 'since' is older than the compacted part of the log.
+    """
+    return changes_response()
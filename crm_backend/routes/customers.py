@@ -1,11 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, url_for
 from crm_backend.backend_app import db
-from crm_backend.models import Customer
+from crm_backend.models import Customer, SalesLead, Interaction, SupportTicket
+from crm_backend.pagination import paginate
+from crm_backend.filters import filter_customers
+from crm_backend.cache import cached, invalidate
+from crm_backend.importers import IMPORT_BATCH_SIZE, ImportReport, batched, detect_format, read_records
+from crm_backend.purge import delete_customer_rows
+from crm_backend.changes import record_change, record_changes_from
+from crm_backend.status_stream import notify_status_change
+from crm_backend.serializers import SCHEMAS, requested_fields, stream_list_response
+from crm_backend.suggest import (SUGGEST_LIMIT, MAX_SUGGEST_LIMIT, get_suggest_index, index_customers,
+                                 unindex_customer)
 from flask_jwt_extended import jwt_required
+from sqlalchemy import func, select, insert, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+import csv
 import re
 
 bp = Blueprint('customers', __name__, url_prefix='/customers')
 
+# Bounds for the customer overview endpoints
+OVERVIEW_LIMIT = 5
+MAX_OVERVIEW_LIMIT = 50
+MAX_OVERVIEW_IDS = 100
+
 
 def is_valid_email(email):
     """
@@ -21,8 +40,97 @@ def is_valid_email(email):
     return re.match(email_regex, email) is not None
 
 
+# Columns accepted by the bulk import, in table order
+IMPORT_FIELDS = ('first_name', 'last_name', 'email', 'phone', 'company', 'address')
+
+
+def validate_customer_row(record):
+    """
+    Validate and normalise one imported customer record.
+
+    Args:
+        record (dict): The raw record read from the import body.
+
+    Returns:
+        tuple: The cleaned row (or None) and an error message (or None).
+    """
+    row = {}
+    for field in IMPORT_FIELDS:
+        value = record.get(field)
+        if value is not None:
+            value = str(value).strip() or None
+        row[field] = value
+
+    if not row['first_name'] or not row['last_name'] or not row['email']:
+        return None, 'Missing required fields: first_name, last_name, email'
+    if not is_valid_email(row['email']):
+        return None, 'Invalid email format'
+    for field in IMPORT_FIELDS:
+        if row[field] and len(row[field]) > Customer.__table__.c[field].type.length:
+            return None, f'{field} is too long'
+    return row, None
+
+
+def upsert_customers(rows):
+    """
+    Insert or update a batch of customers keyed on their unique email.
+
+    On SQLite and PostgreSQL the batch is written with one multi-row
+    INSERT ... ON CONFLICT (email) DO UPDATE statement. Optional fields missing from
+    a row keep their stored value. Other databases fall back to an executemany
+    INSERT for new emails and an executemany UPDATE for existing ones. The
+    inserts and updates are added to the change log in the same transaction.
+
+    Args:
+        rows (list): Validated rows with unique emails.
+
+    Returns:
+        tuple: The number of inserted and updated customers.
+    """
+    emails = [row['email'] for row in rows]
+    existing = set(db.session.scalars(select(Customer.email).where(Customer.email.in_(emails))))
+    if existing:
+        record_changes_from('customers', 'update', select(Customer.id).where(Customer.email.in_(existing)))
+    table = Customer.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = dialect_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.email], set_={
+            'first_name': stmt.excluded.first_name,
+            'last_name': stmt.excluded.last_name,
+            'phone': func.coalesce(stmt.excluded.phone, table.c.phone),
+            'company': func.coalesce(stmt.excluded.company, table.c.company),
+            'address': func.coalesce(stmt.excluded.address, table.c.address)
+        })
+        db.session.execute(stmt)
+    else:
+        new_rows = [row for row in rows if row['email'] not in existing]
+        old_rows = [dict(row, match_email=row['email']) for row in rows if row['email'] in existing]
+        if new_rows:
+            db.session.execute(insert(table), new_rows)
+        if old_rows:
+            db.session.execute(
+                update(table).where(table.c.email == bindparam('match_email')).values(
+                    first_name=bindparam('first_name'),
+                    last_name=bindparam('last_name'),
+                    phone=func.coalesce(bindparam('phone'), table.c.phone),
+                    company=func.coalesce(bindparam('company'), table.c.company),
+                    address=func.coalesce(bindparam('address'), table.c.address)
+                ),
+                old_rows
+            )
+
+    new_emails = [email for email in emails if email not in existing]
+    if new_emails:
+        record_changes_from('customers', 'create', select(Customer.id).where(Customer.email.in_(new_emails)))
+    return len(rows) - len(existing), len(existing)
+
+
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached('customers')
 def get_customers():
     """
     Retrieve all customers, with optional search and pagination.
@@ -31,43 +139,53 @@ def get_customers():
         search (str): Optional search term to filter customers by first name, last name, or email.
         page (int): The page number for pagination (default is 1).
         per_page (int): The number of results per page (default is 10).
+        sort (str): Enables cursor pagination ordered by 'created_at' or '-created_at'.
+        after (str): The cursor returned as 'next_cursor' by the previous page.
+        with_total (bool): Include the total count in cursor mode (default is false).
+        fields (str): Comma-separated fields to return, e.g. 'id,first_name,last_name'.
 
     Returns:
         A JSON response containing a paginated list of customers and pagination details.
     """
-    search = request.args.get('search')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+    schema = SCHEMAS['customers']
 
-    query = Customer.query
+    try:
+        fields = requested_fields('customers')
+        query = schema.query(filter_customers(Customer.query, request.args), fields)
+        customers, pagination = paginate(query, Customer, page, per_page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    if search:
-        query = query.filter(
-            (Customer.first_name.ilike(f'%{search}%')) |
-            (Customer.last_name.ilike(f'%{search}%')) |
-            (Customer.email.ilike(f'%{search}%'))
-        )
+    return stream_list_response('customers', customers, schema.dumper(fields), pagination)
 
-    customers = query.paginate(page=page, per_page=per_page, error_out=False)
 
-    return jsonify({
-        'customers': [{
-            'id': c.id,
-            'first_name': c.first_name,
-            'last_name': c.last_name,
-            'email': c.email,
-            'phone': c.phone,
-            'company': c.company,
-            'address': c.address
-        } for c in customers.items],
-        'total': customers.total,
-        'pages': customers.pages,
-        'current_page': customers.page
-    })
+@bp.route('/suggest', methods=['GET'])
+@jwt_required()
+def suggest_customers():
+    """
+    Suggest customers for a search box as the user types.
+
+    Matches are served from an in-process index of the customer names, emails and
+    companies instead of the database. Every word of the query must start a word
+    of the customer; queries with no such match fall back to substring matching.
+
+    Query parameters:
+        q (str): The text typed so far.
+        limit (int): The maximum number of suggestions (default is 10, at most 50).
+
+    Returns:
+        A JSON response containing the matching customers.
+    """
+    limit = min(max(request.args.get('limit', SUGGEST_LIMIT, type=int), 1), MAX_SUGGEST_LIMIT)
+    suggestions = get_suggest_index().search(request.args.get('q', ''), limit)
+    return jsonify({'suggestions': suggestions})
 
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cached('customers')
 def get_customer(id):
     """
     Retrieve a single customer by ID.
@@ -75,21 +193,233 @@ def get_customer(id):
     Args:
         id (int): The ID of the customer to retrieve.
 
+    Query parameters:
+        fields (str): Comma-separated fields to return.
+
     Returns:
         A JSON response containing the details of the requested customer.
     """
-    customer = Customer.query.get_or_404(id)
+    schema = SCHEMAS['customers']
+    try:
+        fields = requested_fields('customers')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    customer = schema.query(Customer.query, fields).get_or_404(id)
+    return jsonify(schema.dump(customer, fields))
+
+
+def load_recent_children(model, customer_ids, limit):
+    """
+    Load the most recent child rows of several customers in a single query.
+
+    A ROW_NUMBER() window partitioned by customer keeps at most ``limit`` rows per
+    customer, and a COUNT() window over the same partition gives each customer's
+    total, so the cost is one query per child table however many customers are asked for.
+
+    Args:
+        model (db.Model): The child model (SalesLead, Interaction or SupportTicket).
+        customer_ids (list): The IDs of the customers to load children for.
+        limit (int): The maximum number of rows to return per customer.
+
+    Returns:
+        dict: Maps each customer ID to a tuple of (recent rows, total row count).
+    """
+    ranked = select(
+        model,
+        func.row_number().over(
+            partition_by=model.customer_id,
+            order_by=(model.created_at.desc(), model.id.desc())
+        ).label('row_number'),
+        func.count().over(partition_by=model.customer_id).label('total')
+    ).where(model.customer_id.in_(customer_ids)).subquery()
+
+    child = aliased(model, ranked)
+    rows = db.session.execute(
+        select(child, ranked.c.total)
+        .where(ranked.c.row_number <= limit)
+        .order_by(ranked.c.customer_id, ranked.c.row_number)
+    ).all()
+
+    children = {}
+    for row, total in rows:
+        items, _ = children.get(row.customer_id, ([], total))
+        items.append(row)
+        children[row.customer_id] = (items, total)
+    return children
+
+
+def build_overviews(customer_ids, limit):
+    """
+    Build the overview of several customers in a fixed number of queries.
+
+    Args:
+        customer_ids (list): The IDs of the customers to include.
+        limit (int): The maximum number of recent child rows per collection.
+
+    Returns:
+        dict: Maps each found customer ID to its overview dictionary.
+    """
+    customers = Customer.query.filter(Customer.id.in_(customer_ids)).all()
+    if not customers:
+        return {}
+
+    found_ids = [c.id for c in customers]
+    sales_leads = load_recent_children(SalesLead, found_ids, limit)
+    interactions = load_recent_children(Interaction, found_ids, limit)
+    support_tickets = load_recent_children(SupportTicket, found_ids, limit)
+
+    dump_customer = SCHEMAS['customers'].dumper()
+    # The recent children leave out the customer_id of their parent
+    dump_lead = SCHEMAS['sales_leads'].dumper(('id', 'status', 'created_at'))
+    dump_interaction = SCHEMAS['interactions'].dumper(('id', 'notes', 'created_at'))
+    dump_ticket = SCHEMAS['support_tickets'].dumper(('id', 'description', 'status', 'created_at'))
+
+    overviews = {}
+    for c in customers:
+        leads, leads_total = sales_leads.get(c.id, ([], 0))
+        notes, notes_total = interactions.get(c.id, ([], 0))
+        tickets, tickets_total = support_tickets.get(c.id, ([], 0))
+        overviews[c.id] = dict(
+            dump_customer(c),
+            sales_leads={'total': leads_total, 'recent': list(map(dump_lead, leads))},
+            interactions={'total': notes_total, 'recent': list(map(dump_interaction, notes))},
+            support_tickets={'total': tickets_total, 'recent': list(map(dump_ticket, tickets))}
+        )
+    return overviews
+
+
+def get_overview_limit():
+    """Return the per-collection row limit requested via the 'limit' query parameter."""
+    limit = request.args.get('limit', OVERVIEW_LIMIT, type=int)
+    return max(1, min(limit, MAX_OVERVIEW_LIMIT))
+
+
+@bp.route('/<int:id>/overview', methods=['GET'])
+@jwt_required()
+@cached('customers', 'sales_leads', 'interactions', 'support_tickets')
+def get_customer_overview(id):
+    """
+    Retrieve a customer together with its most recent sales leads, interactions and support tickets.
+
+    Args:
+        id (int): The ID of the customer to retrieve.
+
+    Query parameters:
+        limit (int): The number of recent rows per collection (default is 5, maximum is 50).
+
+    Returns:
+        A JSON response containing the customer details and the recent slice and total of each child collection.
+    """
+    overviews = build_overviews([id], get_overview_limit())
+    if id not in overviews:
+        return jsonify({'message': 'Customer not found'}), 404
+    return jsonify(overviews[id])
+
+
+@bp.route('/overview', methods=['GET'])
+@jwt_required()
+@cached('customers', 'sales_leads', 'interactions', 'support_tickets')
+def get_customer_overviews():
+    """
+    Retrieve the overview of several customers at once.
+
+    Query parameters:
+        ids (str): A comma-separated list of customer IDs (at most 100).
+        limit (int): The number of recent rows per collection (default is 5, maximum is 50).
+
+    Returns:
+        A JSON response containing the overviews in the requested order and the IDs that were not found.
+    """
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'message': 'ids must be a comma-separated list of integers'}), 400
+
+    if not ids:
+        return jsonify({'message': 'Missing required parameter: ids'}), 400
+    if len(ids) > MAX_OVERVIEW_IDS:
+        return jsonify({'message': f'At most {MAX_OVERVIEW_IDS} ids may be requested at once'}), 400
+
+    ids = list(dict.fromkeys(ids))
+    overviews = build_overviews(ids, get_overview_limit())
+
     return jsonify({
-        'id': customer.id,
-        'first_name': customer.first_name,
-        'last_name': customer.last_name,
-        'email': customer.email,
-        'phone': customer.phone,
-        'company': customer.company,
-        'address': customer.address
+        'customers': [overviews[i] for i in ids if i in overviews],
+        'missing': [i for i in ids if i not in overviews]
     })
 
 
+@bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_customers():
+    """
+    Create or update customers in bulk from a streamed CSV or NDJSON body.
+
+    The body is read incrementally and written in batches of 500 rows, each in its
+    own transaction, so memory use does not depend on the size of the upload.
+    Rows are matched on email: existing customers are updated, others are created.
+
+    Query parameters:
+        format (str): 'csv' or 'ndjson'; defaults to the request content type.
+
+    Request body:
+        CSV with a header row, or one JSON object per line, with the fields
+        first_name, last_name, email, phone, company and address.
+
+    Returns:
+        A JSON report with the number of processed, inserted, updated and failed rows
+        and the row number and reason of each failure (the first 1000 are listed).
+    """
+    try:
+        fmt = detect_format(request.mimetype, request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    report = ImportReport()
+
+    try:
+        for batch in batched(read_records(request.stream, fmt), IMPORT_BATCH_SIZE):
+            rows = {}
+            superseded = 0
+            for row_number, record, error in batch:
+                report.processed += 1
+                if record is not None:
+                    row, error = validate_customer_row(record)
+                if error:
+                    report.add_error(row_number, error, record.get('email') if record else None)
+                    continue
+                # A later row for the same email supersedes an earlier one in the batch
+                if rows.pop(row['email'], None):
+                    superseded += 1
+                rows[row['email']] = (row_number, row)
+
+            if not rows:
+                continue
+
+            try:
+                inserted, updated = upsert_customers([row for _, row in rows.values()])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                report.failed += superseded
+                for row_number, row in rows.values():
+                    report.add_error(row_number, f'Error saving customer: {str(e)}', row['email'])
+                continue
+
+            report.inserted += inserted
+            report.updated += updated + superseded
+            invalidate('customers')
+            index_customers(db.session.execute(
+                select(Customer.id, Customer.first_name, Customer.last_name, Customer.email, Customer.company)
+                .where(Customer.email.in_(list(rows)))
+            ))
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify(dict(report.to_dict(), message=f'Could not read the import body: {str(e)}')), 400
+
+    return jsonify(report.to_dict())
+
+
 @bp.route('/', methods=['POST'])
 @jwt_required()
 def create_customer():
@@ -124,11 +454,15 @@ def create_customer():
 
     try:
         db.session.add(customer)
+        db.session.flush()
+        record_change('customers', 'create', customer.id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error creating customer', 'error': str(e)}), 500
 
+    invalidate('customers')
+    index_customers([customer])
     return jsonify({'id': customer.id, 'message': 'Customer created successfully'}), 201
 
 
@@ -158,11 +492,14 @@ def update_customer(id):
     customer.address = data.get('address', customer.address)
 
     try:
+        record_change('customers', 'update', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error updating customer', 'error': str(e)}), 500
 
+    invalidate('customers')
+    index_customers([customer])
     return jsonify({'message': 'Customer updated successfully'})
 
 
@@ -170,7 +507,12 @@ def update_customer(id):
 @jwt_required()
 def delete_customer(id):
     """
-    Delete a customer by ID.
+    Delete a customer by ID, together with its sales leads, interactions and tickets.
+
+    The history is deleted by the database through ON DELETE CASCADE in the same
+    transaction. For customers with a very large history pass 'async=true': the
+    history is then purged in bounded chunks in the background and the response
+    is 202 with the purge, whose progress is at '/customers/purges/<purge_id>'.
 
     Args:
         id (int): The ID of the customer to delete.
@@ -180,11 +522,39 @@ def delete_customer(id):
     """
     customer = Customer.query.get_or_404(id)
 
+    if request.args.get('async', 'false').lower() == 'true':
+        purge = current_app.extensions['customer_purger'].start(id)
+        response = jsonify(dict(purge.to_dict(), message='Customer purge started'))
+        response.headers['Location'] = url_for('customers.get_customer_purge', purge_id=purge.id)
+        return response, 202
+
     try:
-        db.session.delete(customer)
+        delete_customer_rows(customer)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error deleting customer', 'error': str(e)}), 500
 
+    invalidate('customers', 'sales_leads', 'interactions', 'support_tickets')
+    unindex_customer(id)
+    notify_status_change('support_tickets')
     return jsonify({'message': 'Customer deleted successfully'})
+
+
+@bp.route('/purges/<purge_id>', methods=['GET'])
+@jwt_required()
+def get_customer_purge(purge_id):
+    """
+    Get the progress of an asynchronous customer delete.
+
+    Args:
+        purge_id (str): The 'id' returned by 'DELETE /customers/<id>?async=true'.
+
+    Returns:
+        A JSON response with the 'status' ('running', 'completed' or 'failed'), the
+        rows 'deleted' so far and the 'totals' per table, and the 'progress' fraction.
+    """
+    purge = current_app.extensions['customer_purger'].get(purge_id)
+    if purge is None:
+        return jsonify({'message': 'Purge not found'}), 404
+    return jsonify(purge.to_dict())
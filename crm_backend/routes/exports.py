@@ -0,0 +1,152 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from crm_backend.backend_app import db
+from crm_backend.models import Customer, SalesLead, Interaction, SupportTicket
+from crm_backend.filters import filter_customers, filter_customer_children
+from crm_backend.serializers import dumps, format_datetime, iter_json_array
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+import csv
+import io
+
+bp = Blueprint('exports', __name__, url_prefix='/export')
+
+# Number of rows fetched from the cursor and written to the response at a time
+EXPORT_CHUNK_SIZE = 1000
+
+# Exported columns and list filters of each entity
+EXPORTS = {
+    'customers': (
+        Customer,
+        ('id', 'first_name', 'last_name', 'email', 'phone', 'company', 'address', 'created_at'),
+        filter_customers
+    ),
+    'sales_leads': (
+        SalesLead,
+        ('id', 'customer_id', 'status', 'created_at'),
+        lambda query, args: filter_customer_children(query, SalesLead, args)
+    ),
+    'interactions': (
+        Interaction,
+        ('id', 'customer_id', 'notes', 'created_at'),
+        lambda query, args: filter_customer_children(query, Interaction, args)
+    ),
+    'support_tickets': (
+        SupportTicket,
+        ('id', 'customer_id', 'description', 'status', 'created_at'),
+        lambda query, args: filter_customer_children(query, SupportTicket, args)
+    )
+}
+
+
+def format_value(value):
+    """Format a column value the way the JSON list endpoints do."""
+    if isinstance(value, datetime):
+        return format_datetime(value)
+    return value
+
+
+def generate_ndjson(rows, columns):
+    """
+    Encode rows as newline-delimited JSON, one chunk of rows at a time.
+
+    Args:
+        rows (Result): The streamed result rows.
+        columns (tuple): The column names, in result order.
+
+    Yields:
+        str: A block of up to ``EXPORT_CHUNK_SIZE`` JSON lines.
+    """
+    for partition in rows.partitions():
+        yield ''.join(
+            dumps(dict(zip(columns, map(format_value, row)))) + '\n'
+            for row in partition
+        )
+
+
+def generate_json(rows, columns):
+    """
+    Encode rows as a JSON array of objects, one chunk of rows at a time.
+
+    Args:
+        rows (Result): The streamed result rows.
+        columns (tuple): The column names, in result order.
+
+    Yields:
+        str: The opening bracket, blocks of encoded rows and the closing bracket.
+    """
+    yield from iter_json_array(rows, lambda row: dict(zip(columns, map(format_value, row))), EXPORT_CHUNK_SIZE)
+
+
+def generate_csv(rows, columns):
+    """
+    Encode rows as CSV with a header row, one chunk of rows at a time.
+
+    Args:
+        rows (Result): The streamed result rows.
+        columns (tuple): The column names, in result order.
+
+    Yields:
+        str: The header row, then blocks of up to ``EXPORT_CHUNK_SIZE`` CSV rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for partition in rows.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([format_value(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+
+
+# Encoder and mimetype of each export format
+EXPORT_FORMATS = {
+    'ndjson': (generate_ndjson, 'application/x-ndjson'),
+    'json': (generate_json, 'application/json'),
+    'csv': (generate_csv, 'text/csv')
+}
+
+
+@bp.route('/<entity>', methods=['GET'])
+@jwt_required()
+def export_entity(entity):
+    """
+    Stream every row of an entity as NDJSON, a JSON array or CSV.
+
+    Rows are read through a server-side cursor in chunks of 1000 and written to the
+    response as they arrive, so memory use stays constant however many rows match.
+
+    Args:
+        entity (str): One of 'customers', 'sales_leads', 'interactions' or 'support_tickets'.
+
+    Query parameters:
+        format (str): 'ndjson' (default), 'json' or 'csv'.
+        search (str): For customers, filters by first name, last name or email.
+        customer_id (int): For leads, interactions and tickets, filters by customer.
+        status (str): For leads and tickets, filters by status.
+
+    Returns:
+        A streamed response containing the matching rows ordered by ID.
+    """
+    if entity not in EXPORTS:
+        return jsonify({'message': f"Unknown entity, expected one of: {', '.join(EXPORTS)}"}), 404
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': f"Invalid format, expected one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    model, columns, apply_filters = EXPORTS[entity]
+    query = apply_filters(db.session.query(*(getattr(model, c) for c in columns)), request.args)
+    statement = query.order_by(model.id).statement
+
+    def generate():
+        rows = db.session.execute(statement, execution_options={'yield_per': EXPORT_CHUNK_SIZE})
+        try:
+            yield from EXPORT_FORMATS[fmt][0](rows, columns)
+        finally:
+            rows.close()
+
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt][1], headers={
+        'Content-Disposition': f'attachment; filename={entity}.{fmt}'
+    })
@@ -1,6 +1,14 @@
 from flask import Blueprint, request, jsonify
 from crm_backend.backend_app import db
 from crm_backend.models import Interaction, Customer
+from crm_backend.pagination import paginate
+from crm_backend.filters import filter_customer_children
+from crm_backend.cache import cached, invalidate
+from crm_backend.rollups import record_activity
+from crm_backend.changes import record_change
+from crm_backend.search import index_document, unindex_document, search_response
+from crm_backend.serializers import SCHEMAS, format_datetime, requested_fields, stream_list_response
+from crm_backend.group_commit import GroupCommitError, group_commit_enabled, submit_insert
 from flask_jwt_extended import jwt_required
 from datetime import datetime
 import logging
@@ -13,6 +21,7 @@ bp = Blueprint('interactions', __name__, url_prefix='/interactions')
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached('interactions')
 def get_interactions():
     """
     Retrieve all interactions, optionally filtering by customer ID, with pagination.
@@ -21,11 +30,14 @@ def get_interactions():
         customer_id (int): Optional filter to retrieve interactions for a specific customer.
         page (int): The page number for pagination (default is 1).
         per_page (int): The number of results per page (default is 10).
+        sort (str): Enables cursor pagination ordered by 'created_at' or '-created_at'.
+        after (str): The cursor returned as 'next_cursor' by the previous page.
+        with_total (bool): Include the total count in cursor mode (default is false).
+        fields (str): Comma-separated fields to return, e.g. 'id,created_at' to skip the notes.
 
     Returns:
         A JSON response containing a paginated list of interactions and pagination details.
     """
-    customer_id = request.args.get('customer_id', type=int)
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
@@ -33,28 +45,21 @@ def get_interactions():
     if per_page > 100:
         per_page = 100
 
-    query = Interaction.query
+    schema = SCHEMAS['interactions']
 
-    if customer_id:
-        query = query.filter_by(customer_id=customer_id)
-
-    interactions = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        fields = requested_fields('interactions')
+        query = schema.query(filter_customer_children(Interaction.query, Interaction, request.args), fields)
+        interactions, pagination = paginate(query, Interaction, page, per_page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    return jsonify({
-        'interactions': [{
-            'id': i.id,
-            'customer_id': i.customer_id,
-            'notes': i.notes,
-            'created_at': i.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        } for i in interactions.items],
-        'total': interactions.total,
-        'pages': interactions.pages,
-        'current_page': interactions.page
-    })
+    return stream_list_response('interactions', interactions, schema.dumper(fields), pagination)
 
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cached('interactions')
 def get_interaction(id):
     """
     Retrieve a single interaction by ID.
@@ -62,16 +67,42 @@ def get_interaction(id):
     Args:
         id (int): The ID of the interaction to retrieve.
 
+    Query parameters:
+        fields (str): Comma-separated fields to return.
+
     Returns:
         A JSON response containing the details of the requested interaction.
     """
-    interaction = Interaction.query.get_or_404(id)
-    return jsonify({
-        'id': interaction.id,
-        'customer_id': interaction.customer_id,
-        'notes': interaction.notes,
-        'created_at': interaction.created_at.strftime('%Y-%m-%d %H:%M:%S')
-    })
+    schema = SCHEMAS['interactions']
+    try:
+        fields = requested_fields('interactions')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    interaction = schema.query(Interaction.query, fields).get_or_404(id)
+    return jsonify(schema.dump(interaction, fields))
+
+
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+@cached('interactions')
+def search_interactions():
+    """
+    Search interaction notes with ranked full-text matching.
+
+    Query parameters:
+        q (str): The words to search for; the last word also matches as a prefix.
+        customer_id (int): Optional filter to search the interactions of a specific customer.
+        per_page (int): The number of results per page (default is 10).
+        after (str): The cursor returned as 'next_cursor' by the previous page.
+        fields (str): Comma-separated fields to return next to the snippet and score.
+
+    Returns:
+        A JSON response containing the best matching interactions first, each with a
+        'snippet' of its notes where the matched words are wrapped in <mark> tags,
+        and the 'has_more' and 'next_cursor' paging fields.
+    """
+    return search_response('interactions')
 
 
 @bp.route('/', methods=['POST'])
@@ -95,6 +126,18 @@ def create_interaction():
     if not customer:
         return jsonify({'message': 'Customer not found'}), 404
 
+    if group_commit_enabled():
+        try:
+            row = submit_insert('interactions', {'customer_id': data['customer_id'], 'notes': data['notes']})
+        except GroupCommitError as e:
+            logging.error(f"Error creating interaction: {str(e)}")
+            return jsonify({'message': 'Error creating interaction'}), 500
+        return jsonify({
+            'id': row['id'],
+            'created_at': format_datetime(row['created_at']),
+            'message': 'Interaction created successfully'
+        }), 201
+
     interaction = Interaction(
         customer_id=data['customer_id'],
         notes=data['notes']
@@ -103,15 +146,20 @@ def create_interaction():
 
     try:
         db.session.add(interaction)
+        db.session.flush()
+        index_document('interactions', interaction.id, interaction.notes)
+        record_activity('interactions', [(interaction.customer_id, interaction.created_at)])
+        record_change('interactions', 'create', interaction.id)
         db.session.commit()
     except Exception as e:
         logging.error(f"Error creating interaction: {str(e)}")
         db.session.rollback()
         return jsonify({'message': 'Error creating interaction'}), 500
 
+    invalidate('interactions')
     return jsonify({
         'id': interaction.id,
-        'created_at': interaction.created_at.strftime('%Y-%m-%d %H:%M:%S'),  # Include created_at
+        'created_at': format_datetime(interaction.created_at),  # Include created_at
         'message': 'Interaction created successfully'
     }), 201
 
@@ -138,12 +186,16 @@ def update_interaction(id):
         interaction.notes = data['notes']
 
     try:
+        if 'notes' in data:
+            index_document('interactions', interaction.id, interaction.notes)
+        record_change('interactions', 'update', id)
         db.session.commit()
     except Exception as e:
         logging.error(f"Error updating interaction: {str(e)}")
         db.session.rollback()
         return jsonify({'message': 'Error updating interaction'}), 500
 
+    invalidate('interactions')
     return jsonify({'message': 'Interaction updated successfully'})
 
 
@@ -163,12 +215,16 @@ def delete_interaction(id):
 
     try:
         db.session.delete(interaction)
+        unindex_document('interactions', id)
+        record_activity('interactions', [(interaction.customer_id, interaction.created_at)], -1)
+        record_change('interactions', 'delete', id)
         db.session.commit()
     except Exception as e:
         logging.error(f"Error deleting interaction: {str(e)}")
         db.session.rollback()
         return jsonify({'message': 'Error deleting interaction'}), 500
 
+    invalidate('interactions')
     return jsonify({'message': 'Interaction deleted successfully'})
 
 
@@ -0,0 +1,51 @@
+from flask import Blueprint
+from flask_jwt_extended import jwt_required
+from crm_backend.reports import report_response
+
+bp = Blueprint('reports', __name__, url_prefix='/reports')
+
+@bp.route('/company_pipeline', methods=['GET'])
+@jwt_required()
+def company_pipeline_report():
+    """
+    Count the sales leads of each company per status, from the latest snapshot.
+
+    Query parameters:
+        start_date (str): Optional first lead creation date to include (YYYY-MM-DD).
+        end_date (str): Optional last lead creation date to include (YYYY-MM-DD).
+        limit (int): The number of companies to return (default is 20).
+
+    Returns:
+        A JSON response with the snapshot used and, per company, its number of leads,
+        the counts per status and the share of won leads among the closed ones.
+    """
+    return report_response('company_pipeline')
+
+@bp.route('/ticket_ageing', methods=['GET'])
+@jwt_required()
+def ticket_ageing_report():
+    """
+    Count the open support tickets per status and age, from the latest snapshot.
+
+    Returns:
+        A JSON response with the snapshot used and, per status, the number of tickets
+        per age bucket and their median age in days at the time of the snapshot.
+    """
+    return report_response('ticket_ageing')
+
+@bp.route('/interaction_frequency', methods=['GET'])
+@jwt_required()
+def interaction_frequency_report():
+    """
+    Summarize the number of interactions per customer, from the latest snapshot.
+
+    Query parameters:
+        start_date (str): Optional first interaction date to include (YYYY-MM-DD).
+        end_date (str): Optional last interaction date to include (YYYY-MM-DD).
+        limit (int): The number of most contacted customers to return (default is 10).
+
+    Returns:
+        A JSON response with the snapshot used, the interaction and customer counts,
+        the distribution of interactions per customer and the most contacted customers.
+    """
+    return report_response('interaction_frequency')
@@ -1,6 +1,15 @@
 from flask import Blueprint, request, jsonify
 from crm_backend.backend_app import db
 from crm_backend.models import SalesLead, Customer
+from crm_backend.pagination import paginate
+from crm_backend.filters import filter_customer_children
+from crm_backend.facets import adjust_status_count, facet_response
+from crm_backend.cache import cached, invalidate
+from crm_backend.rollups import record_activity
+from crm_backend.changes import record_change
+from crm_backend.bulk import bulk_response
+from crm_backend.serializers import SCHEMAS, requested_fields, stream_list_response
+from crm_backend.group_commit import GroupCommitError, group_commit_enabled, submit_insert
 from flask_jwt_extended import jwt_required
 from datetime import datetime
 
@@ -8,50 +17,51 @@ bp = Blueprint('sales_leads', __name__, url_prefix='/sales_leads')
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached('sales_leads')
 def get_sales_leads():
     """
     Get all sales leads with optional filters (customer ID, status) and pagination.
+    Pass 'sort' and/or 'after' to page with cursors on (created_at, id) instead of offsets,
+    and 'fields', e.g. 'id,status', to return only some fields.
     """
-    customer_id = request.args.get('customer_id', type=int)
-    status = request.args.get('status')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+    schema = SCHEMAS['sales_leads']
 
-    query = SalesLead.query
-
-    if customer_id:
-        query = query.filter_by(customer_id=customer_id)
-
-    if status:
-        query = query.filter_by(status=status)
+    try:
+        fields = requested_fields('sales_leads')
+        query = schema.query(filter_customer_children(SalesLead.query, SalesLead, request.args), fields)
+        sales_leads, pagination = paginate(query, SalesLead, page, per_page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    sales_leads = query.paginate(page=page, per_page=per_page, error_out=False)
+    return stream_list_response('sales_leads', sales_leads, schema.dumper(fields), pagination)
 
-    return jsonify({
-        'sales_leads': [{
-            'id': sl.id,
-            'customer_id': sl.customer_id,
-            'status': sl.status,
-            'created_at': sl.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        } for sl in sales_leads.items],
-        'total': sales_leads.total,
-        'pages': sales_leads.pages,
-        'current_page': sales_leads.page
-    })
+@bp.route('/facets', methods=['GET'])
+@jwt_required()
+@cached('sales_leads')
+def get_sales_lead_facets():
+    """
+    Get the number of sales leads per status, optionally filtered by
+    customer ID and a 'start_date'/'end_date' creation date range.
+    """
+    return facet_response('sales_leads')
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cached('sales_leads')
 def get_sales_lead(id):
     """
-    Get a single sales lead by ID.
+    Get a single sales lead by ID, optionally only the 'fields' given.
     """
-    sales_lead = SalesLead.query.get_or_404(id)
-    return jsonify({
-        'id': sales_lead.id,
-        'customer_id': sales_lead.customer_id,
-        'status': sales_lead.status,
-        'created_at': sales_lead.created_at.strftime('%Y-%m-%d %H:%M:%S')
-    })
+    schema = SCHEMAS['sales_leads']
+    try:
+        fields = requested_fields('sales_leads')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    sales_lead = schema.query(SalesLead.query, fields).get_or_404(id)
+    return jsonify(schema.dump(sales_lead, fields))
 
 @bp.route('/', methods=['POST'])
 @jwt_required()
@@ -68,6 +78,13 @@ def create_sales_lead():
     if not customer:
         return jsonify({'message': 'Customer not found'}), 404
 
+    if group_commit_enabled():
+        try:
+            row = submit_insert('sales_leads', {'customer_id': data['customer_id'], 'status': data['status']})
+        except GroupCommitError as e:
+            return jsonify({'message': 'Error creating sales lead', 'error': str(e)}), 500
+        return jsonify({'id': row['id'], 'message': 'Sales lead created successfully'}), 201
+
     sales_lead = SalesLead(
         customer_id=data['customer_id'],
         status=data['status']
@@ -75,11 +92,16 @@ def create_sales_lead():
 
     try:
         db.session.add(sales_lead)
+        db.session.flush()
+        adjust_status_count('sales_leads', sales_lead.status, 1)
+        record_activity('sales_leads', [(sales_lead.customer_id, sales_lead.created_at)])
+        record_change('sales_leads', 'create', sales_lead.id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error creating sales lead', 'error': str(e)}), 500
 
+    invalidate('sales_leads')
     return jsonify({'id': sales_lead.id, 'message': 'Sales lead created successfully'}), 201
 
 @bp.route('/<int:id>', methods=['PUT'])
@@ -90,16 +112,22 @@ def update_sales_lead(id):
     """
     sales_lead = SalesLead.query.get_or_404(id)
     data = request.get_json()
+    old_status = sales_lead.status
 
     if 'status' in data:
         sales_lead.status = data['status']
 
     try:
+        if sales_lead.status != old_status:
+            adjust_status_count('sales_leads', old_status, -1)
+            adjust_status_count('sales_leads', sales_lead.status, 1)
+        record_change('sales_leads', 'update', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error updating sales lead', 'error': str(e)}), 500
 
+    invalidate('sales_leads')
     return jsonify({'message': 'Sales lead updated successfully'})
 
 @bp.route('/<int:id>', methods=['DELETE'])
@@ -112,13 +140,29 @@ def delete_sales_lead(id):
 
     try:
         db.session.delete(sales_lead)
+        adjust_status_count('sales_leads', sales_lead.status, -1)
+        record_activity('sales_leads', [(sales_lead.customer_id, sales_lead.created_at)], -1)
+        record_change('sales_leads', 'delete', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error deleting sales lead', 'error': str(e)}), 500
 
+    invalidate('sales_leads')
     return jsonify({'message': 'Sales lead deleted successfully'})
 
+@bp.route('/bulk', methods=['PATCH', 'DELETE'])
+@jwt_required()
+def bulk_sales_leads():
+    """
+    Update or delete many sales leads with set-based statements.
+
+    The JSON body selects the sales leads with 'ids', a list of IDs, or 'filter', an
+    object with any of 'customer_id', 'status', 'start_date' and 'end_date'. PATCH
+    also takes the new column values as 'values'.
+    """
+    return bulk_response('sales_leads', 'Sales leads')
+
 def register_routes(app):
     """
     Register the sales leads Blueprint.
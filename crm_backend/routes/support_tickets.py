@@ -1,6 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, make_response
 from crm_backend.backend_app import db
 from crm_backend.models import SupportTicket, Customer
+from crm_backend.pagination import paginate
+from crm_backend.filters import filter_customer_children
+from crm_backend.facets import adjust_status_count, facet_response, status_facets, ticket_status_summary
+from crm_backend.cache import cached, invalidate
+from crm_backend.rollups import record_activity
+from crm_backend.changes import record_change
+from crm_backend.bulk import bulk_response
+from crm_backend.search import index_document, unindex_document, search_response
+from crm_backend.serializers import SCHEMAS, requested_fields, stream_list_response
+from crm_backend.group_commit import GroupCommitError, group_commit_enabled, submit_insert
+from crm_backend.status_stream import (create_stream_token, notify_status_change, status_stream_response,
+                                       stream_jwt_required)
 from flask_jwt_extended import jwt_required
 
 
@@ -9,72 +21,109 @@ bp = Blueprint('support_tickets', __name__, url_prefix='/support_tickets')
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached('support_tickets')
 def get_support_tickets():
     """
     Retrieve a list of support tickets.
 
     Supports optional filtering by customer ID and status, along with pagination.
+    Pass 'sort' and/or 'after' to page with cursors on (created_at, id) instead of offsets,
+    and 'fields', e.g. 'id,status,created_at', to return only some fields.
     """
-    customer_id = request.args.get('customer_id', type=int)
-    status = request.args.get('status')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
+    schema = SCHEMAS['support_tickets']
 
-    query = SupportTicket.query
-
-    if customer_id:
-        query = query.filter_by(customer_id=customer_id)
-
-    if status:
-        query = query.filter_by(status=status)
-
-    support_tickets = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        fields = requested_fields('support_tickets')
+        query = schema.query(filter_customer_children(SupportTicket.query, SupportTicket, request.args), fields)
+        support_tickets, pagination = paginate(query, SupportTicket, page, per_page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    return jsonify({
-        'support_tickets': [{
-            'id': ticket.id,
-            'customer_id': ticket.customer_id,
-            'description': ticket.description,
-            'status': ticket.status,
-            'created_at': ticket.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        } for ticket in support_tickets.items],
-        'total': support_tickets.total,
-        'pages': support_tickets.pages,
-        'current_page': support_tickets.page
-    })
+    return stream_list_response('support_tickets', support_tickets, schema.dumper(fields), pagination)
 
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cached('support_tickets')
 def get_support_ticket(id):
     """
-    Retrieve a specific support ticket by its ID.
+    Retrieve a specific support ticket by its ID, optionally only the 'fields' given.
     """
-    support_ticket = SupportTicket.query.get_or_404(id)
-    return jsonify({
-        'id': support_ticket.id,
-        'customer_id': support_ticket.customer_id,
-        'description': support_ticket.description,
-        'status': support_ticket.status,
-        'created_at': support_ticket.created_at.strftime('%Y-%m-%d %H:%M:%S')
-    })
+    schema = SCHEMAS['support_tickets']
+    try:
+        fields = requested_fields('support_tickets')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    support_ticket = schema.query(SupportTicket.query, fields).get_or_404(id)
+    return jsonify(schema.dump(support_ticket, fields))
 
 
 @bp.route('/status', methods=['GET'])
 @jwt_required()
+@cached('support_tickets')
 def get_ticket_status():
     """
-    Retrieve the count of support tickets based on their status.
+    Retrieve the count of support tickets in the statuses shown on the analytics page.
+    Use '/support_tickets/facets' for the counts of every status.
+    """
+    return jsonify(ticket_status_summary(status_facets('support_tickets')))
+
+
+@bp.route('/status/stream', methods=['GET'])
+@stream_jwt_required
+def stream_ticket_status():
+    """
+    Stream the counts of '/support_tickets/status' as Server-Sent Events.
+
+    An event is sent on connect and whenever a ticket write changes the counts,
+    so dashboards no longer need to poll. The counts are computed once per change
+    and shared by every open stream. Since EventSource cannot set headers, browsers
+    pass a token from '/support_tickets/status/stream/token' as the 'jwt' query
+    parameter; it expires after a minute, so reconnect with a new one.
     """
-    active = SupportTicket.query.filter_by(status='active').count()
-    deactivated = SupportTicket.query.filter_by(status='deactivated').count()
-    in_process = SupportTicket.query.filter_by(status='in process').count()
+    return status_stream_response('support_tickets')
 
-    return jsonify({
-        'active': active,
-        'deactivated': deactivated,
-        'inProcess': in_process
-    })
+
+@bp.route('/status/stream/token', methods=['POST'])
+@jwt_required()
+def create_ticket_status_stream_token():
+    """
+    Issue a short-lived token for opening '/support_tickets/status/stream' with EventSource.
+
+    The token is only accepted by the event stream routes, so it is harmless once
+    the stream URL has been logged and the token has expired.
+    """
+    return jsonify({'token': create_stream_token(),
+                    'expires_in': current_app.config['STATUS_STREAM_TOKEN_SECONDS']})
+
+
+@bp.route('/facets', methods=['GET'])
+@jwt_required()
+@cached('support_tickets')
+def get_ticket_facets():
+    """
+    Retrieve the number of support tickets per status, optionally filtered by
+    customer ID and a 'start_date'/'end_date' creation date range.
+    """
+    return facet_response('support_tickets')
+
+
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+@cached('support_tickets')
+def search_support_tickets():
+    """
+    Search ticket descriptions with ranked full-text matching.
+
+    Takes the words to find as 'q', optional 'customer_id' and 'status' filters, and
+    pages with the 'per_page' and 'after' cursor parameters. Each ticket has a
+    'snippet' of its description with the matched words wrapped in <mark> tags;
+    'fields' selects the other fields returned.
+    """
+    return search_response('support_tickets')
 
 
 @bp.route('/', methods=['POST'])
@@ -92,6 +141,16 @@ def create_support_ticket():
     if not customer:
         return jsonify({'message': 'Customer not found'}), 404
 
+    if group_commit_enabled():
+        try:
+            row = submit_insert('support_tickets', {'customer_id': data['customer_id'],
+                                                    'description': data['description'],
+                                                    'status': data['status']})
+        except GroupCommitError as e:
+            return jsonify({'message': 'Error creating support ticket', 'error': str(e)}), 500
+        notify_status_change('support_tickets')
+        return jsonify({'id': row['id'], 'message': 'Support ticket created successfully'}), 201
+
     support_ticket = SupportTicket(
         customer_id=data['customer_id'],
         description=data['description'],
@@ -100,11 +159,18 @@ def create_support_ticket():
 
     try:
         db.session.add(support_ticket)
+        db.session.flush()
+        adjust_status_count('support_tickets', support_ticket.status, 1)
+        index_document('support_tickets', support_ticket.id, support_ticket.description)
+        record_activity('support_tickets', [(support_ticket.customer_id, support_ticket.created_at)])
+        record_change('support_tickets', 'create', support_ticket.id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error creating support ticket', 'error': str(e)}), 500
 
+    invalidate('support_tickets')
+    notify_status_change('support_tickets')
     return jsonify({'id': support_ticket.id, 'message': 'Support ticket created successfully'}), 201
 
 
@@ -116,6 +182,8 @@ def update_support_ticket(id):
     """
     support_ticket = SupportTicket.query.get_or_404(id)
     data = request.get_json()
+    old_status = support_ticket.status
+    old_description = support_ticket.description
 
     if 'description' in data:
         support_ticket.description = data['description']
@@ -123,11 +191,19 @@ def update_support_ticket(id):
         support_ticket.status = data['status']
 
     try:
+        if support_ticket.status != old_status:
+            adjust_status_count('support_tickets', old_status, -1)
+            adjust_status_count('support_tickets', support_ticket.status, 1)
+        if support_ticket.description != old_description:
+            index_document('support_tickets', support_ticket.id, support_ticket.description)
+        record_change('support_tickets', 'update', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error updating support ticket', 'error': str(e)}), 500
 
+    invalidate('support_tickets')
+    notify_status_change('support_tickets')
     return jsonify({'message': 'Support ticket updated successfully'})
 
 
@@ -141,14 +217,36 @@ def delete_support_ticket(id):
 
     try:
         db.session.delete(support_ticket)
+        adjust_status_count('support_tickets', support_ticket.status, -1)
+        unindex_document('support_tickets', id)
+        record_activity('support_tickets', [(support_ticket.customer_id, support_ticket.created_at)], -1)
+        record_change('support_tickets', 'delete', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error deleting support ticket', 'error': str(e)}), 500
 
+    invalidate('support_tickets')
+    notify_status_change('support_tickets')
     return jsonify({'message': 'Support ticket deleted successfully'})
 
 
+@bp.route('/bulk', methods=['PATCH', 'DELETE'])
+@jwt_required()
+def bulk_support_tickets():
+    """
+    Update or delete many support tickets with set-based statements.
+
+    The JSON body selects the support tickets with 'ids', a list of IDs, or 'filter', an
+    object with any of 'customer_id', 'status', 'start_date' and 'end_date'. PATCH
+    also takes the new column values as 'values'.
+    """
+    response = make_response(bulk_response('support_tickets', 'Support tickets'))
+    if response.status_code == 200:
+        notify_status_change('support_tickets')
+    return response
+
+
 def register_routes(app):
     """
     Register the support tickets Blueprint with the Flask application.
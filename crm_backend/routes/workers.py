@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from crm_backend.backend_app import db
 from crm_backend.models import Worker
+from crm_backend.pagination import paginate
+from crm_backend.cache import cached, invalidate
+from crm_backend.changes import record_change
 from flask_jwt_extended import create_access_token, jwt_required
 
 bp = Blueprint('workers', __name__, url_prefix='/workers')
@@ -26,11 +29,14 @@ def register_worker():
 
     try:
         db.session.add(worker)
+        db.session.flush()
+        record_change('workers', 'create', worker.id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error registering worker', 'error': str(e)}), 500
 
+    invalidate('workers')
     return jsonify({'message': 'Worker registered successfully'}), 201
 
 @bp.route('/login', methods=['POST'])
@@ -62,9 +68,11 @@ def logout_worker():
 
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@cached('workers')
 def get_workers():
     """
     Fetches all workers, with optional filters for 'position' and pagination.
+    Pass 'sort' and/or 'after' to page with cursors on (created_at, id) instead of offsets.
     This endpoint requires a valid JWT token.
     """
     position = request.args.get('position')
@@ -76,7 +84,10 @@ def get_workers():
     if position:
         query = query.filter_by(position=position)
 
-    workers = query.paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        workers, pagination = paginate(query, Worker, page, per_page)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
     return jsonify({
         'workers': [{
@@ -84,14 +95,13 @@ def get_workers():
             'name': w.name,
             'email': w.email,
             'position': w.position
-        } for w in workers.items],
-        'total': workers.total,
-        'pages': workers.pages,
-        'current_page': workers.page
+        } for w in workers],
+        **pagination
     })
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@cached('workers')
 def get_worker(id):
     """
     Fetches a worker by their ID.
@@ -131,11 +141,14 @@ def create_worker():
 
     try:
         db.session.add(worker)
+        db.session.flush()
+        record_change('workers', 'create', worker.id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error creating worker', 'error': str(e)}), 500
 
+    invalidate('workers')
     return jsonify({'id': worker.id, 'message': 'Worker created successfully'}), 201
 
 @bp.route('/<int:id>', methods=['PUT'])
@@ -161,11 +174,13 @@ def update_worker(id):
         return jsonify({'message': 'Worker with this email already exists'}), 409
 
     try:
+        record_change('workers', 'update', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error updating worker', 'error': str(e)}), 500
 
+    invalidate('workers')
     return jsonify({'message': 'Worker updated successfully'})
 
 @bp.route('/<int:id>', methods=['DELETE'])
@@ -179,11 +194,13 @@ def delete_worker(id):
 
     try:
         db.session.delete(worker)
+        record_change('workers', 'delete', id)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': 'Error deleting worker', 'error': str(e)}), 500
 
+    invalidate('workers')
     return jsonify({'message': 'Worker deleted successfully'})
 
 def register_routes(app):
@@ -0,0 +1,318 @@
+import html
+import re
+from decimal import Decimal, InvalidOperation
+from flask import request, jsonify
+from sqlalchemy import (DDL, Numeric, and_, bindparam, cast, column, event, func, literal, literal_column, or_,
+                        select, table, text)
+from crm_backend.db import db
+from crm_backend.filters import filter_customer_children
+from crm_backend.models import Interaction, SupportTicket
+from crm_backend.pagination import MAX_PER_PAGE, decode_token, encode_token
+from crm_backend.serializers import SCHEMAS, requested_fields
+
+# Searchable entities, keyed by table name: (model, text column name)
+SEARCH_MODELS = {
+    'interactions': (Interaction, 'notes'),
+    'support_tickets': (SupportTicket, 'description')
+}
+
+# Text search configuration used by PostgreSQL for stemming and stop words
+PG_TS_CONFIG = 'english'
+
+# Words shown around the matches in a snippet
+SNIPPET_WORDS = 16
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+# Private-use characters the database marks matches with; the snippet is HTML-escaped
+# before they are replaced by the highlight tags, so the stored text cannot inject markup
+MATCH_START = '\ue000'
+MATCH_END = '\ue001'
+
+# Decimal places scores are rounded to, so the cursor compares exactly what the database orders by
+SCORE_DIGITS = 6
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fts_table_name(entity):
+    """Return the name of the SQLite FTS5 table of an entity."""
+    return f'{entity}_fts'
+
+
+def pg_index_name(entity):
+    """Return the name of the PostgreSQL GIN index of an entity."""
+    return f'ix_{entity}_{SEARCH_MODELS[entity][1]}_fts'
+
+
+def pg_document(entity):
+    """Return the ``to_tsvector`` expression indexed for an entity on PostgreSQL."""
+    return f"to_tsvector('{PG_TS_CONFIG}', coalesce({SEARCH_MODELS[entity][1]}, ''))"
+
+
+def search_ddl(entity):
+    """
+    Return the DDL statements that create and drop the full-text index of an entity.
+
+    SQLite gets an FTS5 table whose rowid is the entity ID, maintained by the write
+    handlers. PostgreSQL gets a GIN index on the ``to_tsvector`` of the text
+    column, which the database maintains itself.
+
+    Returns:
+        dict: Maps 'create' and 'drop' to a list of ``(dialect, SQL)`` pairs.
+    """
+    fts = fts_table_name(entity)
+    return {
+        'create': [
+            ('sqlite', f'CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(body)'),
+            ('postgresql', f'CREATE INDEX IF NOT EXISTS {pg_index_name(entity)} '
+                           f'ON {entity} USING GIN ({pg_document(entity)})')
+        ],
+        'drop': [
+            ('sqlite', f'DROP TABLE IF EXISTS {fts}'),
+            ('postgresql', f'DROP INDEX IF EXISTS {pg_index_name(entity)}')
+        ]
+    }
+
+
+# Create and drop the full-text indexes together with their tables
+for _entity, (_model, _) in SEARCH_MODELS.items():
+    for _dialect, _sql in search_ddl(_entity)['create']:
+        event.listen(_model.__table__, 'after_create', DDL(_sql).execute_if(dialect=_dialect))
+    for _dialect, _sql in search_ddl(_entity)['drop']:
+        event.listen(_model.__table__, 'before_drop', DDL(_sql).execute_if(dialect=_dialect))
+
+
+def is_sqlite():
+    """Return True if the session's primary database is SQLite."""
+    return db.session.get_bind().dialect.name == 'sqlite'
+
+
+def index_document(entity, id, body):
+    """
+    Add or replace the indexed text of a row in the current transaction.
+
+    Call this from write handlers before their commit. On PostgreSQL the GIN
+    index is maintained by the database and this does nothing.
+
+    Args:
+        entity (str): A key of ``SEARCH_MODELS``.
+        id (int): The ID of the row.
+        body (str): The text to index, or None to only remove the row.
+    """
+    if not is_sqlite():
+        return
+    fts = fts_table_name(entity)
+    db.session.execute(text(f'DELETE FROM {fts} WHERE rowid = :id'), {'id': id})
+    if body:
+        db.session.execute(text(f'INSERT INTO {fts} (rowid, body) VALUES (:id, :body)'), {'id': id, 'body': body})
+
+
+def unindex_document(entity, id):
+    """Remove a deleted row from the full-text index in the current transaction."""
+    index_document(entity, id, None)
+
+
+def reindex_documents(entity, ids):
+    """
+    Copy the current text of many rows into the full-text index in the current transaction.
+
+    Rows that no longer exist or have no text are only removed from the index, so
+    this also serves bulk deletes when called after them.
+
+    Args:
+        entity (str): A key of ``SEARCH_MODELS``.
+        ids (list): The IDs of the rows.
+    """
+    if not is_sqlite() or not ids:
+        return
+    column_name = SEARCH_MODELS[entity][1]
+    fts = fts_table_name(entity)
+    ids_param = bindparam('ids', expanding=True)
+    db.session.execute(text(f'DELETE FROM {fts} WHERE rowid IN :ids').bindparams(ids_param), {'ids': ids})
+    db.session.execute(
+        text(f'INSERT INTO {fts} (rowid, body) SELECT id, {column_name} FROM {entity} '
+             f'WHERE id IN :ids AND {column_name} IS NOT NULL').bindparams(ids_param),
+        {'ids': ids}
+    )
+
+
+def unindex_customer_documents(customer_id):
+    """Remove the rows of a customer that is being deleted from every full-text index."""
+    if not is_sqlite():
+        return
+    for entity, (model, _) in SEARCH_MODELS.items():
+        db.session.execute(
+            text(f'DELETE FROM {fts_table_name(entity)} WHERE rowid IN '
+                 f'(SELECT id FROM {entity} WHERE customer_id = :customer_id)'),
+            {'customer_id': customer_id}
+        )
+
+
+def rebuild_search_index(entity):
+    """
+    Create the full-text index of an entity if needed and fill it from the table.
+
+    Returns:
+        int: The number of indexed rows.
+    """
+    model, column_name = SEARCH_MODELS[entity]
+    dialect = db.session.get_bind().dialect.name
+
+    for ddl_dialect, sql in search_ddl(entity)['create']:
+        if ddl_dialect == dialect:
+            db.session.execute(text(sql))
+
+    if dialect == 'sqlite':
+        fts = fts_table_name(entity)
+        db.session.execute(text(f'DELETE FROM {fts}'))
+        db.session.execute(text(f'INSERT INTO {fts} (rowid, body) SELECT id, {column_name} FROM {entity} '
+                                f'WHERE {column_name} IS NOT NULL'))
+        db.session.execute(text(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')"))
+    elif dialect == 'postgresql':
+        db.session.execute(text(f'REINDEX INDEX {pg_index_name(entity)}'))
+
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(model).where(getattr(model, column_name).isnot(None)))
+
+
+def parse_query(q):
+    """
+    Turn user input into the words of a full-text query.
+
+    Punctuation is dropped so the input cannot inject query syntax.
+
+    Returns:
+        list: The lowercase words; every word must match and the last one may be a prefix.
+    """
+    return WORD_RE.findall(q.lower())
+
+
+def search_statement(entity, words):
+    """
+    Build the ranked full-text search of an entity for the dialect in use.
+
+    Returns:
+        tuple: The statement selecting the ``score`` (lower is better) and ``snippet``
+        labelled columns next to the model columns, and the score expression. The
+        score is rounded to ``SCORE_DIGITS`` and the snippet marks the matches with
+        ``MATCH_START`` and ``MATCH_END``, see ``render_snippet``.
+    """
+    model, column_name = SEARCH_MODELS[entity]
+
+    if is_sqlite():
+        fts = table(fts_table_name(entity), column('rowid'), column('body'))
+        match = ' '.join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+        score = func.round(func.bm25(literal_column(fts.name)), SCORE_DIGITS)
+        snippet = func.snippet(literal_column(fts.name), 0, MATCH_START, MATCH_END, '…', SNIPPET_WORDS)
+        stmt = (
+            select(model, score.label('score'), snippet.label('snippet'))
+            .join(fts, fts.c.rowid == model.id)
+            .where(literal_column(fts.name).op('MATCH')(match))
+        )
+    else:
+        query = func.to_tsquery(PG_TS_CONFIG, ' & '.join(words[:-1] + [words[-1] + ':*']))
+        document = func.to_tsvector(PG_TS_CONFIG, func.coalesce(getattr(model, column_name), ''))
+        # ts_rank returns a float4; rounding it as numeric makes it exact through the cursor
+        score = func.round(cast(-func.ts_rank(document, query), Numeric), SCORE_DIGITS)
+        snippet = func.ts_headline(
+            PG_TS_CONFIG, getattr(model, column_name), query,
+            f'StartSel="{MATCH_START}", StopSel="{MATCH_END}", MaxWords={SNIPPET_WORDS}, MinWords=5'
+        )
+        stmt = select(model, score.label('score'), snippet.label('snippet')).where(document.op('@@')(query))
+
+    return stmt, score
+
+
+def render_snippet(snippet):
+    """HTML-escape a snippet of ``search_statement`` and wrap its matches in the highlight tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+
+def search_documents(entity, q, per_page, after=None, args=None, fields=None):
+    """
+    Run a ranked full-text search with cursor paging.
+
+    Results are ordered by relevance, then by ID. The cursor holds the score and
+    ID of the last result, so each page seeks past it instead of using an offset.
+
+    Args:
+        entity (str): A key of ``SEARCH_MODELS``.
+        q (str): The user's search text.
+        per_page (int): The number of results per page.
+        after (str): The cursor returned as 'next_cursor' by the previous page.
+        args (MultiDict): Optional 'customer_id' and 'status' filters.
+        fields (tuple): The fields of the rows to load, or None for all of them.
+
+    Returns:
+        tuple: A list of ``(row, score, snippet)``, with the snippet as escaped HTML,
+        and a dict with 'has_more' and 'next_cursor'.
+
+    Raises:
+        ValueError: If the query has no words or the cursor is invalid.
+    """
+    words = parse_query(q)
+    if not words:
+        raise ValueError('Missing search query: q')
+
+    model = SEARCH_MODELS[entity][0]
+    stmt, score = search_statement(entity, words)
+    if args is not None:
+        stmt = filter_customer_children(stmt, model, args)
+    if fields is not None:
+        stmt = SCHEMAS[entity].query(stmt, fields)
+
+    if after:
+        try:
+            last_score, last_id = decode_token(after)
+            last_score, last_id = literal(Decimal(last_score), Numeric(asdecimal=True)), int(last_id)
+        except (ValueError, TypeError, InvalidOperation):
+            raise ValueError('Invalid cursor')
+        stmt = stmt.where(or_(score > last_score, and_(score == last_score, model.id > last_id)))
+
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    rows = db.session.execute(stmt.order_by(score, model.id).limit(per_page + 1)).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return [(row, float(score), render_snippet(snippet)) for row, score, snippet in rows], {
+        'has_more': has_more,
+        'next_cursor': encode_token([str(rows[-1].score), rows[-1][0].id]) if has_more else None
+    }
+
+
+def search_response(entity):
+    """
+    Build the JSON response of a search route from the current request.
+
+    Query parameters:
+        q (str): The words to search for; the last word also matches as a prefix.
+        per_page (int): The number of results per page (default is 10, at most 100).
+        after (str): The cursor returned as 'next_cursor' by the previous page.
+        customer_id (int), status (str): Optional filters.
+        fields (str): Comma-separated fields of the rows to return.
+
+    Args:
+        entity (str): A key of ``SEARCH_MODELS``.
+
+    Returns:
+        Response: The matching rows, each with a 'snippet' of HTML-escaped text that
+        wraps the matched words in <mark> tags, and the 'has_more' and 'next_cursor'
+        paging fields.
+    """
+    try:
+        fields = requested_fields(entity)
+        rows, meta = search_documents(entity, request.args.get('q', ''),
+                                      request.args.get('per_page', 10, type=int),
+                                      request.args.get('after'), request.args, fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    dump = SCHEMAS[entity].dumper(fields)
+    return jsonify({
+        entity: [dict(dump(row), snippet=snippet, score=score) for row, score, snippet in rows],
+        **meta
+    })
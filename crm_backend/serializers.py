@@ -0,0 +1,248 @@
+import json
+from itertools import islice
+from operator import attrgetter
+from flask import current_app, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import load_only
+from crm_backend.models import Customer, SalesLead, Interaction, SupportTicket, Analytics
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is used without it
+    orjson = None
+
+# Rows encoded and written to a streamed response at a time
+STREAM_CHUNK_SIZE = 100
+
+
+def format_datetime(value):
+    """Format a timestamp as 'YYYY-MM-DD HH:MM:SS', like ``strftime('%Y-%m-%d %H:%M:%S')`` but faster."""
+    return value.isoformat(' ', 'seconds') if value is not None else None
+
+
+def format_date(value):
+    """Format a date as 'YYYY-MM-DD'."""
+    return value.isoformat() if value is not None else None
+
+
+def format_decimal(value):
+    """Format a DECIMAL column as a JSON number."""
+    return float(value) if value is not None else None
+
+
+class Schema:
+    """
+    The JSON fields of a model and how to load and dump them.
+
+    Dumpers are built once per field selection from attribute getters, so dumping
+    a row costs one dict construction. Columns the response does not need are not
+    loaded at all: ``query`` restricts the SELECT to the selected fields with
+    ``load_only``, so list pages without a large TEXT column skip reading it.
+    """
+
+    def __init__(self, model, fields, formatters=None, always=('id', 'created_at')):
+        """
+        Args:
+            model (db.Model): The model whose rows are dumped.
+            fields (tuple): The field names, in output order; all are returned by default.
+            formatters (dict): Maps field names to functions applied to their value.
+            always (tuple): Columns loaded even when not selected, e.g. for cursor pagination.
+        """
+        self.model = model
+        self.fields = tuple(fields)
+        self.formatters = formatters or {}
+        self.always = always
+        self.dumpers = {}
+
+    def parse_fields(self, value):
+        """
+        Parse a comma-separated 'fields' parameter.
+
+        Args:
+            value (str): The parameter, or None for every field.
+
+        Returns:
+            tuple: The selected field names in schema order.
+
+        Raises:
+            ValueError: If a field is unknown or none is given.
+        """
+        if value is None:
+            return self.fields
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names - set(self.fields)
+        if unknown or not names:
+            raise ValueError(f"Invalid fields: {', '.join(sorted(unknown)) or value!r}, "
+                             f"expected any of: {', '.join(self.fields)}")
+        return tuple(name for name in self.fields if name in names)
+
+    def load_options(self, fields):
+        """Return the loader options of a field selection, or an empty list when every field is selected."""
+        if set(fields) == set(self.fields):
+            return []
+        columns = dict.fromkeys(self.always + tuple(fields))
+        return [load_only(*(getattr(self.model, name) for name in columns))]
+
+    def query(self, query, fields):
+        """Restrict the columns loaded by an ORM query or select() to a field selection."""
+        options = self.load_options(fields)
+        return query.options(*options) if options else query
+
+    def dumper(self, fields=None):
+        """
+        Return a function that dumps a row to a dict of the selected fields.
+
+        Args:
+            fields (tuple): The field names, or None for every field.
+
+        Returns:
+            callable: Takes a model instance and returns a dict.
+        """
+        fields = self.fields if fields is None else tuple(fields)
+        dump = self.dumpers.get(fields)
+        if dump is None:
+            getters = [(name, attrgetter(name), self.formatters.get(name)) for name in fields]
+            plain = [(name, get) for name, get, formatter in getters if formatter is None]
+            formatted = [(name, get, formatter) for name, get, formatter in getters if formatter is not None]
+
+            def dump(row):
+                data = {name: get(row) for name, get in plain}
+                for name, get, formatter in formatted:
+                    data[name] = formatter(get(row))
+                return data
+
+            self.dumpers[fields] = dump
+        return dump
+
+    def dump(self, row, fields=None):
+        """Dump one row to a dict of the selected fields."""
+        return self.dumper(fields)(row)
+
+    def dump_many(self, rows, fields=None):
+        """Dump rows to a list of dicts of the selected fields."""
+        return list(map(self.dumper(fields), rows))
+
+
+# Output schemas, keyed by table name
+SCHEMAS = {
+    'customers': Schema(
+        Customer, ('id', 'first_name', 'last_name', 'email', 'phone', 'company', 'address')
+    ),
+    'sales_leads': Schema(
+        SalesLead, ('id', 'customer_id', 'status', 'created_at'),
+        {'created_at': format_datetime}
+    ),
+    'interactions': Schema(
+        Interaction, ('id', 'customer_id', 'notes', 'created_at'),
+        {'created_at': format_datetime}
+    ),
+    'support_tickets': Schema(
+        SupportTicket, ('id', 'customer_id', 'description', 'status', 'created_at'),
+        {'created_at': format_datetime}
+    ),
+    'analytics': Schema(
+        Analytics, ('id', 'metric_name', 'metric_value', 'period_start_date', 'period_end_date', 'data', 'created_at'),
+        {'metric_value': format_decimal, 'period_start_date': format_date, 'period_end_date': format_date,
+         'created_at': format_datetime}
+    )
+}
+
+
+def requested_fields(entity):
+    """
+    Read the 'fields' query parameter of the current request.
+
+    Args:
+        entity (str): A key of ``SCHEMAS``.
+
+    Returns:
+        tuple: The selected field names.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    return SCHEMAS[entity].parse_fields(request.args.get('fields'))
+
+
+def dumps(obj):
+    """Encode an object as compact JSON with the fastest available encoder."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
+def iter_json_array(rows, dump, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode rows as a JSON array, one chunk of rows at a time.
+
+    Only one chunk of dumped rows exists at once, so memory use does not depend on
+    the number of rows, and the first bytes can be sent before the last row is read.
+
+    Args:
+        rows (iterable): The rows to encode.
+        dump (callable): Returns the JSON value of a row.
+        chunk_size (int): The number of rows per yielded chunk.
+
+    Yields:
+        str: '[', the comma-separated encoded rows and ']'.
+    """
+    rows = iter(rows)
+    separator = '['
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield separator + ','.join(dumps(dump(row)) for row in chunk)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def stream_list_response(key, rows, dump, meta=None):
+    """
+    Stream a list response of the form ``{key: [rows...], **meta}``.
+
+    Args:
+        key (str): The name of the array, e.g. 'interactions'.
+        rows (iterable): The rows of the page.
+        dump (callable): Returns the JSON value of a row.
+        meta (dict): Fields written after the array, such as the pagination fields.
+
+    Returns:
+        Response: A streamed JSON response.
+    """
+    def generate():
+        yield '{' + dumps(key) + ':'
+        yield from iter_json_array(rows, dump)
+        for name, value in (meta or {}).items():
+            yield ',' + dumps(name) + ':' + dumps(value)
+        yield '}\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider for ``jsonify`` that does not sort keys and encodes with orjson when installed.
+
+    Values orjson does not encode the way Flask does, such as dates, are passed to
+    Flask's ``default`` so responses keep the same format. Pretty-printed output,
+    used in debug mode, falls back to the standard library.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs.get('indent') is None:
+            return orjson.dumps(obj, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME |
+                                orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS).decode()
+        return super().dumps(obj, **kwargs)
+
+
+def init_json(app):
+    """
+    Use ``FastJSONProvider`` for the JSON responses of the app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,271 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from crm_backend.db import db
+from crm_backend.models import Customer, SalesLead, Interaction, SupportTicket, Analytics
+
+try:
+    import numpy as np
+except ImportError:  # Optional; only snapshots and the reports built on them need it
+    np = None
+
+# Rows fetched from the cursor and written to the column files at a time
+SNAPSHOT_CHUNK_SIZE = 50000
+
+# Snapshotted columns of each table and their kind; free-text columns are left out
+SNAPSHOT_COLUMNS = {
+    'customers': (Customer, {'id': 'int', 'company': 'category', 'created_at': 'datetime'}),
+    'sales_leads': (SalesLead, {'id': 'int', 'customer_id': 'int', 'status': 'category', 'created_at': 'datetime'}),
+    'interactions': (Interaction, {'id': 'int', 'customer_id': 'int', 'created_at': 'datetime'}),
+    'support_tickets': (SupportTicket, {'id': 'int', 'customer_id': 'int', 'status': 'category',
+                                        'created_at': 'datetime'}),
+    'analytics': (Analytics, {'id': 'int', 'metric_name': 'category', 'metric_value': 'float',
+                              'period_start_date': 'date', 'created_at': 'datetime'})
+}
+
+# The NumPy type of each column kind; categories are stored as codes into a dictionary
+DTYPES = {
+    'int': 'int64',
+    'float': 'float64',
+    'date': 'datetime64[D]',
+    'datetime': 'datetime64[s]',
+    'category': 'int32'
+}
+
+# Stored for NULL in 'int' and 'category' columns; dates use NaT and floats NaN
+NULL_CODE = -1
+
+# The file naming the current snapshot of a snapshot directory
+CURRENT_FILE = 'CURRENT'
+
+
+def require_numpy():
+    """
+    Raises:
+        RuntimeError: If NumPy is not installed.
+    """
+    if np is None:
+        raise RuntimeError('Snapshots require NumPy, install it with: pip install numpy')
+
+
+def encode_chunk(kind, values, dictionary):
+    """
+    Convert a chunk of column values to a NumPy array of the column's type.
+
+    Args:
+        kind (str): A key of ``DTYPES``.
+        values (list): The values as returned by the database.
+        dictionary (dict): Maps the strings of a 'category' column to their codes; new strings are added.
+
+    Returns:
+        ndarray: The encoded values.
+    """
+    if kind == 'category':
+        return np.fromiter((NULL_CODE if value is None else dictionary.setdefault(value, len(dictionary))
+                            for value in values), DTYPES[kind], len(values))
+    if kind == 'int':
+        return np.fromiter((NULL_CODE if value is None else value for value in values), DTYPES[kind], len(values))
+    if kind == 'float':
+        return np.fromiter((np.nan if value is None else float(value) for value in values), DTYPES[kind], len(values))
+    return np.array(values, dtype=DTYPES[kind])
+
+
+def export_table(connection, model, columns, path, chunk_size):
+    """
+    Write the columns of a table to one ``.npy`` file per column.
+
+    The files are allocated at their final size up front and filled one chunk of
+    rows at a time, so memory use does not depend on the size of the table.
+
+    Returns:
+        dict: The manifest entry of the table: its row count and the type of each column.
+    """
+    os.makedirs(path)
+    count = connection.scalar(select(func.count()).select_from(model))
+    files = {
+        name: np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+', dtype=DTYPES[kind],
+                                        shape=(count,))
+        for name, kind in columns.items()
+    }
+    dictionaries = {name: {} for name, kind in columns.items() if kind == 'category'}
+
+    offset = 0
+    result = connection.execution_options(yield_per=chunk_size).execute(
+        select(*(getattr(model, name) for name in columns)).order_by(model.id)
+    )
+    for rows in result.partitions():
+        for index, (name, kind) in enumerate(columns.items()):
+            values = [row[index] for row in rows]
+            files[name][offset:offset + len(rows)] = encode_chunk(kind, values, dictionaries.get(name))
+        offset += len(rows)
+
+    for name, file in files.items():
+        file.flush()
+    for name, dictionary in dictionaries.items():
+        with open(os.path.join(path, f'{name}.dict.json'), 'w') as file:
+            json.dump(list(dictionary), file)
+
+    return {'rows': count, 'columns': {name: DTYPES[kind] for name, kind in columns.items()},
+            'categories': list(dictionaries)}
+
+
+def write_snapshot(directory, chunk_size=SNAPSHOT_CHUNK_SIZE, keep=2):
+    """
+    Export every table of ``SNAPSHOT_COLUMNS`` to a new snapshot and make it the current one.
+
+    All tables are read in a single transaction, so the snapshot is consistent
+    across tables. The snapshot is written to a hidden directory and renamed into
+    place before ``CURRENT`` is switched to it, so readers never see a partial
+    snapshot. Older snapshots beyond ``keep`` are removed.
+
+    Args:
+        directory (str): The snapshot directory.
+        chunk_size (int): Rows fetched and written at a time.
+        keep (int): The number of snapshots to keep, including the new one.
+
+    Returns:
+        dict: The manifest of the new snapshot.
+    """
+    require_numpy()
+    os.makedirs(directory, exist_ok=True)
+    snapshot_id = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    staging = os.path.join(directory, f'.{snapshot_id}')
+    manifest = {'id': snapshot_id, 'created_at': datetime.utcnow().isoformat(' ', 'seconds'), 'tables': {}}
+
+    try:
+        with db.engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                connection = connection.execution_options(isolation_level='REPEATABLE READ')
+            with connection.begin():
+                if connection.dialect.name == 'sqlite':
+                    # pysqlite does not start a transaction for SELECTs on its own
+                    connection.exec_driver_sql('BEGIN')
+                for table, (model, columns) in SNAPSHOT_COLUMNS.items():
+                    manifest['tables'][table] = export_table(connection, model, columns,
+                                                             os.path.join(staging, table), chunk_size)
+        with open(os.path.join(staging, 'manifest.json'), 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.rename(staging, os.path.join(directory, snapshot_id))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(directory, f'.{CURRENT_FILE}.tmp')
+    with open(pointer, 'w') as file:
+        file.write(snapshot_id)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    snapshots = sorted(name for name in os.listdir(directory) if not name.startswith('.') and name != CURRENT_FILE)
+    for name in snapshots[:max(0, len(snapshots) - keep)]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return manifest
+
+
+class SnapshotTable:
+    """The memory-mapped columns of one table of a snapshot, opened on first use."""
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.rows = manifest['rows']
+        self.dtypes = manifest['columns']
+        self.columns = {}
+        self.dictionaries = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        """
+        Return a read-only memory map of a column.
+
+        The pages are mapped from the file, so processes reading the same snapshot
+        share them through the page cache instead of each holding a copy.
+        """
+        column = self.columns.get(name)
+        if column is None:
+            if name not in self.dtypes:
+                raise KeyError(f'Unknown column: {name}')
+            column = self.columns[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return column
+
+    def categories(self, name):
+        """Return the strings of a 'category' column as an array indexed by their code."""
+        dictionary = self.dictionaries.get(name)
+        if dictionary is None:
+            with open(os.path.join(self.path, f'{name}.dict.json')) as file:
+                dictionary = self.dictionaries[name] = np.array(json.load(file), dtype=object)
+        return dictionary
+
+    def code(self, name, value):
+        """Return the code of a string in a 'category' column, or None if no row has it."""
+        matches = np.flatnonzero(self.categories(name) == value)
+        return int(matches[0]) if len(matches) else None
+
+
+class Snapshot:
+    """A snapshot opened for reading."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json')) as file:
+            self.manifest = json.load(file)
+        self.id = self.manifest['id']
+        self.created_at = self.manifest['created_at']
+        self.tables = {table: SnapshotTable(os.path.join(path, table), entry)
+                       for table, entry in self.manifest['tables'].items()}
+
+    def __getitem__(self, table):
+        return self.tables[table]
+
+
+class SnapshotReader:
+    """
+    Opens the current snapshot of a directory and reopens it when a newer one is written.
+
+    Each process keeps one ``Snapshot`` open and its columns mapped, and checks
+    ``CURRENT`` at most every ``check_interval`` seconds.
+    """
+
+    def __init__(self, directory, check_interval=5.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.snapshot = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def current(self):
+        """
+        Return the current snapshot.
+
+        Raises:
+            LookupError: If no snapshot was written yet.
+        """
+        require_numpy()
+        now = time.monotonic()
+        with self.lock:
+            if self.snapshot is None or now - self.checked_at >= self.check_interval:
+                try:
+                    with open(os.path.join(self.directory, CURRENT_FILE)) as file:
+                        snapshot_id = file.read().strip()
+                except FileNotFoundError:
+                    raise LookupError("No snapshot found, create one with the 'snapshot' command")
+                if self.snapshot is None or self.snapshot.id != snapshot_id:
+                    self.snapshot = Snapshot(os.path.join(self.directory, snapshot_id))
+                self.checked_at = now
+            return self.snapshot
+
+
+def init_snapshots(app):
+    """
+    Create the reader of the columnar snapshots used by the reports.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    if not app.config['SNAPSHOT_DIR']:
+        app.config['SNAPSHOT_DIR'] = os.path.join(app.instance_path, 'snapshots')
+    app.extensions['snapshots'] = SnapshotReader(app.config['SNAPSHOT_DIR'])
@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from functools import wraps
+from flask import current_app, request, jsonify
+from flask_jwt_extended import (create_access_token, get_jwt, get_jwt_identity, get_jwt_request_location,
+                                verify_jwt_in_request)
+from crm_backend.db import db
+from crm_backend.facets import status_facets, ticket_status_summary
+from crm_backend.serializers import dumps
+
+logger = logging.getLogger('crm_backend.status_stream')
+
+# The 'scope' claim of the short-lived tokens that only open event streams
+STREAM_TOKEN_SCOPE = 'status_stream'
+
+
+def encode_event(version, data):
+    """Encode a Server-Sent Event carrying ``data`` as JSON."""
+    return f'id: {version}\nevent: status\ndata: {dumps(data)}\n\n'
+
+
+class StatusBroadcaster:
+    """
+    Pushes the status counts of an entity to every open event stream.
+
+    A single background thread recomputes the counts when a write handler calls
+    ``notify`` and encodes them once; every subscriber then sends the same
+    encoded event, so N open dashboards cost one computation per change rather
+    than N. Notifications arriving within ``min_interval`` are coalesced. Writes
+    made by other processes are picked up by polling every ``poll_interval``
+    seconds. The thread only runs while there are subscribers.
+    """
+
+    def __init__(self, app, entity, summarize=None, poll_interval=5.0, min_interval=0.25):
+        self.app = app
+        self.entity = entity
+        self.summarize = summarize or (lambda counts: {'counts': counts})
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+        self.condition = threading.Condition()
+        self.changed = threading.Event()
+        self.subscribers = 0
+        self.thread = None
+        self.counts = None
+        self.version = 0
+        self.event = None
+
+    def notify(self):
+        """Recompute the counts soon; call this after a write to the entity was committed."""
+        if self.subscribers:
+            self.changed.set()
+
+    def subscribe(self):
+        with self.condition:
+            self.subscribers += 1
+            # Wake a thread that is still winding down after the last subscriber left
+            self.changed.set()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=f'status-stream-{self.entity}', daemon=True)
+                self.thread.start()
+
+    def unsubscribe(self):
+        with self.condition:
+            self.subscribers -= 1
+
+    def run(self):
+        with self.app.app_context():
+            while True:
+                self.changed.wait(self.poll_interval)
+                with self.condition:
+                    if not self.subscribers:
+                        self.thread = None
+                        return
+                self.changed.clear()
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception('Refreshing the %s status counts failed', self.entity)
+                finally:
+                    db.session.remove()
+                time.sleep(self.min_interval)
+
+    def refresh(self):
+        """Recompute the counts and wake the subscribers if they changed."""
+        counts = status_facets(self.entity)
+        with self.condition:
+            if counts != self.counts:
+                self.counts = counts
+                self.version += 1
+                self.event = encode_event(self.version, self.summarize(counts))
+                self.condition.notify_all()
+
+    def stream(self, last_version=None, heartbeat=15.0):
+        """
+        Yield the events of one subscriber until the client disconnects.
+
+        The current counts are sent first, unless ``last_version`` shows the client
+        already has them. A comment is sent every ``heartbeat`` seconds without a
+        change so proxies keep the connection open and disconnects are noticed.
+
+        Args:
+            last_version (int): The 'Last-Event-ID' of a reconnecting client.
+            heartbeat (float): Seconds between keep-alive comments.
+
+        Yields:
+            str: Encoded events and comments.
+        """
+        self.subscribe()
+        try:
+            yield f'retry: {int(heartbeat * 1000)}\n\n'
+            version = last_version or 0
+            while True:
+                with self.condition:
+                    changed = self.condition.wait_for(lambda: self.version and self.version != version, heartbeat)
+                    version, event = self.version, self.event
+                yield event if changed else ': keep-alive\n\n'
+        finally:
+            self.unsubscribe()
+
+
+def create_stream_token():
+    """Issue the current user a short-lived token that is only accepted by the event stream routes."""
+    return create_access_token(
+        identity=get_jwt_identity(), additional_claims={'scope': STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=current_app.config['STATUS_STREAM_TOKEN_SECONDS'])
+    )
+
+
+def stream_jwt_required(view):
+    """
+    Require a JWT for an event stream route.
+
+    EventSource cannot set headers, so the token may also be passed as the 'jwt'
+    query parameter. URLs end up in access logs, so a token passed that way must
+    be one of ``create_stream_token``: it expires quickly and cannot be used on
+    any other route.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request(locations=['headers', 'query_string'])
+        if get_jwt_request_location() == 'query_string' and get_jwt().get('scope') != STREAM_TOKEN_SCOPE:
+            return jsonify({'message': 'Pass a stream token in the query string, not an access token'}), 401
+        return view(*args, **kwargs)
+
+    wrapper.accepts_stream_tokens = True
+    return wrapper
+
+
+def verify_token_scope(jwt_header, jwt_data):
+    """Reject stream tokens on every route not decorated with ``stream_jwt_required``."""
+    if jwt_data.get('scope') != STREAM_TOKEN_SCOPE:
+        return True
+    return getattr(current_app.view_functions.get(request.endpoint), 'accepts_stream_tokens', False)
+
+
+def notify_status_change(entity):
+    """Tell the broadcaster of ``entity``, if any, that its status counts may have changed."""
+    broadcaster = current_app.extensions['status_streams'].get(entity)
+    if broadcaster is not None:
+        broadcaster.notify()
+
+
+def status_stream_response(entity):
+    """
+    Build the event stream response of an entity's status counts for the current request.
+
+    Args:
+        entity (str): A key of the 'status_streams' extension.
+
+    Returns:
+        Response: A 'text/event-stream' response that stays open.
+    """
+    broadcaster = current_app.extensions['status_streams'][entity]
+    last_version = request.headers.get('Last-Event-ID', type=int)
+    response = current_app.response_class(
+        broadcaster.stream(last_version, current_app.config['STATUS_STREAM_HEARTBEAT_SECONDS']),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the events
+    return response
+
+
+def init_status_streams(app):
+    """
+    Create the broadcasters of the live status count streams.
+
+    Also makes the JWT extension, which must already be initialized, reject stream
+    tokens outside the event stream routes.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.extensions['flask-jwt-extended'].token_verification_loader(verify_token_scope)
+    app.extensions['status_streams'] = {
+        'support_tickets': StatusBroadcaster(app, 'support_tickets', ticket_status_summary,
+                                             app.config['STATUS_STREAM_POLL_SECONDS'])
+    }
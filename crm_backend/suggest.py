@@ -0,0 +1,237 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy import select
+from crm_backend.db import db
+from crm_backend.models import Customer
+
+# Bounds for the suggestion endpoint
+SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 50
+
+# Prefix entries examined per query, so very short prefixes stay cheap
+MAX_PREFIX_SCAN = 2000
+
+# Rows loaded per round trip while building the index
+BUILD_BATCH_SIZE = 5000
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Split text into lowercase words; email addresses are split on their punctuation."""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(text):
+    """Return the set of three-character substrings of ``text``."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SuggestIndex:
+    """
+    In-process prefix and trigram index over customer names, emails and companies.
+
+    Every word of a customer is kept in a sorted list of ``(word, id)`` pairs, so
+    the customers having a word that starts with a prefix are found with a binary
+    search and a short scan. Queries that match no word prefix fall back to a
+    trigram index that finds substrings, such as the middle of an email address.
+
+    The index is loaded from the database on first use. Writes made while it is
+    loading are queued and replayed once it is loaded. Each process keeps its own
+    index, which only sees the writes handled by that process.
+    """
+
+    def __init__(self):
+        self.customers = {}  # id -> (fields dict, words tuple, search text)
+        self.words = []  # sorted (word, id) pairs
+        self.trigrams = {}  # trigram -> set of ids
+        self.lock = threading.Lock()
+        self.ready = False
+        self.pending = None
+
+    def _add(self, fields, bulk=False):
+        self._remove(fields['id'])
+        words = tuple(sorted({word for field in ('first_name', 'last_name', 'email', 'company')
+                              for word in tokenize(fields.get(field))}))
+        text = ' '.join(str(fields.get(field) or '').lower()
+                        for field in ('first_name', 'last_name', 'email', 'company'))
+        self.customers[fields['id']] = (fields, words, text)
+        for word in words:
+            # A bulk load appends and sorts the list once at the end
+            if bulk:
+                self.words.append((word, fields['id']))
+            else:
+                insort(self.words, (word, fields['id']))
+        for trigram in trigrams(text):
+            self.trigrams.setdefault(trigram, set()).add(fields['id'])
+
+    def _remove(self, customer_id):
+        entry = self.customers.pop(customer_id, None)
+        if entry is None:
+            return
+        _, words, text = entry
+        for word in words:
+            i = bisect_left(self.words, (word, customer_id))
+            if i < len(self.words) and self.words[i] == (word, customer_id):
+                del self.words[i]
+        for trigram in trigrams(text):
+            ids = self.trigrams.get(trigram)
+            if ids is not None:
+                ids.discard(customer_id)
+                if not ids:
+                    del self.trigrams[trigram]
+
+    def _apply(self, operation, value):
+        """Apply a write now, queue it while loading, or drop it if the index is not loaded yet."""
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append((operation, value))
+            elif self.ready:
+                operation(value)
+
+    def add(self, fields):
+        """Add or replace a customer, given a dict of its id, names, email and company."""
+        self._apply(self._add, fields)
+
+    def remove(self, customer_id):
+        """Remove a customer from the index."""
+        self._apply(self._remove, customer_id)
+
+    def build(self, rows):
+        """
+        Load the index from an iterable of customer field dicts, replacing its content.
+
+        Writes passed to ``add`` and ``remove`` while ``rows`` is consumed are
+        applied after it, so they are not lost or overwritten by older rows.
+        """
+        with self.lock:
+            self.pending = []
+        try:
+            customers = list(rows)
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+        with self.lock:
+            self.customers, self.words, self.trigrams = {}, [], {}
+            for fields in customers:
+                self._add(fields, bulk=True)
+            self.words.sort()
+            for operation, value in self.pending:
+                operation(value)
+            self.pending = None
+            self.ready = True
+
+    def search(self, query, limit=SUGGEST_LIMIT):
+        """
+        Return up to ``limit`` customers matching every word of ``query``.
+
+        Customers are ranked by their word matching the longest query word: an
+        equal word first, then the words starting with it in alphabetical order.
+        Substring matches come last.
+
+        Args:
+            query (str): The text typed so far.
+            limit (int): The maximum number of suggestions.
+
+        Returns:
+            list: The field dicts of the matching customers.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Scan the longest term, which has the fewest matching words
+        lead = max(terms, key=len)
+
+        with self.lock:
+            # The (word, id) pairs are sorted, so an equal word comes before longer ones
+            matches = {}
+            i = bisect_left(self.words, (lead,))
+            end = min(len(self.words), i + MAX_PREFIX_SCAN)
+            while i < end and len(matches) < limit and self.words[i][0].startswith(lead):
+                customer_id = self.words[i][1]
+                words = self.customers[customer_id][1]
+                if customer_id not in matches and all(
+                        any(word.startswith(term) for word in words) for term in terms):
+                    matches[customer_id] = None
+                i += 1
+
+            if len(matches) < limit:
+                for customer_id in self._substring_matches(' '.join(terms), limit - len(matches), matches):
+                    matches[customer_id] = None
+
+            return [self.customers[customer_id][0] for customer_id in matches]
+
+    def _substring_matches(self, needle, limit, exclude):
+        """Return up to ``limit`` ids of customers whose text contains ``needle``, using the trigrams."""
+        grams = trigrams(needle)
+        if not grams:
+            return []
+        postings = sorted((self.trigrams.get(gram, set()) for gram in grams), key=len)
+        found = []
+        for customer_id in postings[0]:
+            if customer_id in exclude or not all(customer_id in ids for ids in postings[1:]):
+                continue
+            if needle in self.customers[customer_id][2]:
+                found.append(customer_id)
+                if len(found) >= limit:
+                    break
+        return found
+
+
+def customer_fields(row):
+    """Return the indexed fields of a customer model or row."""
+    return {'id': row.id, 'first_name': row.first_name, 'last_name': row.last_name,
+            'email': row.email, 'company': row.company}
+
+
+def load_customers():
+    """Yield the indexed fields of every customer, streamed in batches."""
+    query = select(Customer.id, Customer.first_name, Customer.last_name, Customer.email, Customer.company)
+    for row in db.session.execute(query.execution_options(yield_per=BUILD_BATCH_SIZE)):
+        yield customer_fields(row)
+
+
+def init_suggest(app):
+    """
+    Create the customer suggestion index of the app.
+
+    The index is loaded from the database by the first suggestion request,
+    as the tables may not exist yet when the app is created.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    app.extensions['customer_suggest'] = SuggestIndex()
+    app.extensions['customer_suggest_lock'] = threading.Lock()
+
+
+def get_suggest_index():
+    """Return the suggestion index of the current app, loading it on first use."""
+    index = current_app.extensions['customer_suggest']
+    if not index.ready:
+        with current_app.extensions['customer_suggest_lock']:
+            if not index.ready:
+                index.build(load_customers())
+    return index
+
+
+def index_customers(customers):
+    """
+    Add or replace customers in the suggestion index.
+
+    Call this from write handlers after their commit succeeded.
+
+    Args:
+        customers (iterable): Customer models or rows with id, names, email and company.
+    """
+    index = current_app.extensions['customer_suggest']
+    for customer in customers:
+        index.add(customer_fields(customer))
+
+
+def unindex_customer(customer_id):
+    """Remove a deleted customer from the suggestion index."""
+    current_app.extensions['customer_suggest'].remove(customer_id)
@@ -1,6 +1,8 @@
 import os
+import json
 import pytest
 from flask import Flask
+from flask_jwt_extended import create_access_token
 from crm_backend.backend_app import create_app, db
 from crm_backend.models import *
 
@@ -56,6 +58,14 @@ def auth_token(client):
     return response.json['access_token']  # Return the JWT token
 
 
+@pytest.fixture
+def auth_headers(app):
+    """Authorization headers with a JWT issued directly, without going through login."""
+    with app.app_context():
+        token = create_access_token(identity='1')
+    return {"Authorization": f"Bearer {token}"}
+
+
 #def test_create_worker(client, auth_token):
    # """Test creating a new worker."""
  #   response = client.post('/workers/', json={
@@ -93,5 +103,802 @@ def test_get_workers(client, auth_token):
     assert isinstance(response.json['workers'], list)  # Ensure it's a list
 
 
+def test_get_customers_cursor_pagination(app, client, auth_headers):
+    """Test paging through customers with keyset cursors, including rows without a creation date."""
+    for n in range(5):
+        client.post('/customers/', json={
+            'first_name': f'First{n}',
+            'last_name': 'Last',
+            'email': f'customer{n}@example.com'
+        }, headers=auth_headers)
+    with app.app_context():
+        db.session.execute(db.update(Customer).where(Customer.id.in_([2, 4])).values(created_at=None))
+        db.session.commit()
+
+    for sort in ('created_at', '-created_at'):
+        seen = []
+        after = ''
+        while True:
+            response = client.get(f'/customers/?sort={sort}&per_page=2&after={after}',
+                                  headers=auth_headers)
+            assert response.status_code == 200
+            assert 'pages' not in response.json
+            seen.extend(c['id'] for c in response.json['customers'])
+            if not response.json['has_more']:
+                break
+            after = response.json['next_cursor']
+
+        assert seen == ([1, 3, 5, 2, 4] if sort == 'created_at' else [5, 3, 1, 4, 2])
+
+    response = client.get('/customers/?after=not-a-cursor', headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_get_customer_overviews(client, auth_headers):
+    """Test the batched customer overview with bounded child slices."""
+    ids = []
+    for n in range(2):
+        response = client.post('/customers/', json={
+            'first_name': f'First{n}',
+            'last_name': 'Last',
+            'email': f'overview{n}@example.com'
+        }, headers=auth_headers)
+        ids.append(response.json['id'])
+
+    for n in range(3):
+        client.post('/interactions/', json={'customer_id': ids[0], 'notes': f'Call {n}'},
+                    headers=auth_headers)
+    client.post('/support_tickets/', json={'customer_id': ids[1], 'description': 'Broken',
+                                           'status': 'active'}, headers=auth_headers)
+
+    response = client.get(f'/customers/overview?ids={ids[0]},{ids[1]},999&limit=2',
+                          headers=auth_headers)
+    assert response.status_code == 200
+    first, second = response.json['customers']
+    assert first['interactions']['total'] == 3
+    assert len(first['interactions']['recent']) == 2
+    assert second['support_tickets']['total'] == 1
+    assert second['sales_leads'] == {'total': 0, 'recent': []}
+    assert response.json['missing'] == [999]
+
+    response = client.get('/customers/999/overview', headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_suggest_customers(client, auth_headers):
+    """Test that customer suggestions follow creates, updates and deletes."""
+    for first, last, email, company in [('Ada', 'Lovelace', 'ada@example.com', 'Analytical Engines'),
+                                        ('Adam', 'Smith', 'adam@example.com', 'Wealth Ltd'),
+                                        ('Grace', 'Hopper', 'grace.hopper@navy.example.com', None)]:
+        client.post('/customers/', json={'first_name': first, 'last_name': last, 'email': email,
+                                         'company': company}, headers=auth_headers)
+
+    response = client.get('/customers/suggest?q=ada', headers=auth_headers)
+    assert response.status_code == 200
+    assert [s['first_name'] for s in response.json['suggestions']] == ['Ada', 'Adam']
+    assert [s['last_name'] for s in client.get('/customers/suggest?q=ad sm', headers=auth_headers)
+            .json['suggestions']] == ['Smith']
+    assert client.get('/customers/suggest?q=navy', headers=auth_headers).json['suggestions'][0]['id'] == 3
+    assert client.get('/customers/suggest?q=opper', headers=auth_headers).json['suggestions'][0]['id'] == 3
+
+    client.put('/customers/1', json={'first_name': 'Augusta'}, headers=auth_headers)
+    client.delete('/customers/2', headers=auth_headers)
+    assert [s['first_name'] for s in client.get('/customers/suggest?q=ada', headers=auth_headers)
+            .json['suggestions']] == ['Augusta']
+    assert client.get('/customers/suggest?q=aug', headers=auth_headers).json['suggestions'][0]['id'] == 1
+
+
+def test_search_interactions(client, auth_headers):
+    """Test ranked full-text search with snippets, cursor paging and index maintenance."""
+    response = client.post('/customers/', json={'first_name': 'Search', 'last_name': 'Customer',
+                                                'email': 'search@example.com'}, headers=auth_headers)
+    customer_id = response.json['id']
+    ids = []
+    for notes in ('Printer is jammed again', 'Asked about printer toner, printer offline',
+                  'Renewal call', 'Printing fails on the new printer'):
+        response = client.post('/interactions/', json={'customer_id': customer_id, 'notes': notes},
+                               headers=auth_headers)
+        ids.append(response.json['id'])
+
+    response = client.get('/interactions/search?q=printer&per_page=2', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['has_more'] is True
+    assert '<mark>' in response.json['interactions'][0]['snippet']
+    seen = [i['id'] for i in response.json['interactions']]
+    response = client.get(f"/interactions/search?q=printer&per_page=2&after={response.json['next_cursor']}",
+                          headers=auth_headers)
+    seen += [i['id'] for i in response.json['interactions']]
+    assert response.json['has_more'] is False
+    assert sorted(seen) == [ids[0], ids[1], ids[3]]
+
+    client.put(f'/interactions/{ids[2]}', json={'notes': 'Printer replaced'}, headers=auth_headers)
+    client.delete(f'/interactions/{ids[0]}', headers=auth_headers)
+    response = client.get('/interactions/search?q=print', headers=auth_headers)
+    assert sorted(i['id'] for i in response.json['interactions']) == [ids[1], ids[2], ids[3]]
+
+    assert client.get('/interactions/search?q=%20', headers=auth_headers).status_code == 400
+
+    client.post('/interactions/', json={'customer_id': customer_id,
+                                        'notes': '<script>alert(1)</script> cartridge'}, headers=auth_headers)
+    response = client.get('/interactions/search?q=cartridge', headers=auth_headers)
+    assert [i['snippet'] for i in response.json['interactions']] == \
+        ['&lt;script&gt;alert(1)&lt;/script&gt; <mark>cartridge</mark>']
+
+
+def test_group_commit_creates(monkeypatch, tmp_path):
+    """Test that concurrent creates are committed in batches by the group-commit writer."""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from crm_backend.config import Config
+
+    # The writer thread needs to see the same database as the requests, so not :memory:
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'group_commit.db'))
+    monkeypatch.setattr(Config, 'GROUP_COMMIT', True)
+    monkeypatch.setattr(Config, 'GROUP_COMMIT_MAX_DELAY_MS', 20)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    client = app.test_client()
+    customer_id = client.post('/customers/', json={'first_name': 'Group', 'last_name': 'Commit',
+                                                   'email': 'group@example.com'}, headers=headers).json['id']
+
+    def create(n):
+        return app.test_client().post('/sales_leads/', json={'customer_id': customer_id,
+                                                              'status': 'won' if n % 2 else 'new'},
+                                      headers=headers)
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(create, range(40)))
+
+    assert all(r.status_code == 201 for r in responses)
+    assert len({r.json['id'] for r in responses}) == 40
+    response = client.get('/sales_leads/facets', headers=headers)
+    assert response.json['counts'] == {'new': 20, 'won': 20}
+
+    response = client.post('/interactions/', json={'customer_id': customer_id, 'notes': 'Logged by telephony'},
+                           headers=headers)
+    assert response.status_code == 201
+    assert client.get('/interactions/search?q=telephony', headers=headers).json['interactions'][0]['id'] == \
+        response.json['id']
+
+    # An insert still queued when its request times out is withdrawn, one being committed is waited for
+    writer = app.extensions['group_commit']
+    release = threading.Event()
+    commit = writer.commit
+    monkeypatch.setattr(writer, 'commit', lambda batch: release.wait(5) and commit(batch))
+    app.config['GROUP_COMMIT_TIMEOUT'] = 0.2
+    with ThreadPoolExecutor(1) as pool:
+        committing = pool.submit(create, 0)
+        time.sleep(0.1)
+        assert create(1).status_code == 500
+        release.set()
+        assert committing.result().status_code == 201
+    assert client.get('/sales_leads/facets', headers=headers).json['counts'] == {'new': 21, 'won': 20}
+
+    with app.app_context():
+        db.drop_all()
+
+
+def test_delete_customer_cascades(monkeypatch, tmp_path):
+    """Test that customer deletes cascade in the database, synchronously and as a chunked purge."""
+    import time
+    from crm_backend import purge as purge_module
+    from crm_backend.config import Config
+    from crm_backend.routes import customers
+
+    notified = []
+    monkeypatch.setattr(customers, 'notify_status_change', notified.append)
+    monkeypatch.setattr(purge_module, 'notify_status_change', notified.append)
+
+    # The purge thread needs to see the same database as the requests, so not :memory:
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'purge.db'))
+    monkeypatch.setattr(Config, 'CUSTOMER_PURGE_CHUNK_SIZE', 2)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    client = app.test_client()
+    customer_ids = []
+    for n in range(2):
+        customer_id = client.post('/customers/', json={'first_name': 'Cascade', 'last_name': str(n),
+                                                       'email': f'cascade{n}@example.com'}, headers=headers).json['id']
+        customer_ids.append(customer_id)
+        for _ in range(5):
+            client.post('/sales_leads/', json={'customer_id': customer_id, 'status': 'new'}, headers=headers)
+            client.post('/support_tickets/', json={'customer_id': customer_id, 'description': 'Broken widget',
+                                                   'status': 'active'}, headers=headers)
+
+    notified.clear()
+    assert client.delete(f'/customers/{customer_ids[0]}', headers=headers).status_code == 200
+    assert notified == ['support_tickets']
+    assert client.get('/sales_leads/facets', headers=headers).json['counts'] == {'new': 5}
+    assert len(client.get('/support_tickets/search?q=widget&per_page=100',
+                          headers=headers).json['support_tickets']) == 5
+
+    notified.clear()
+    response = client.delete(f'/customers/{customer_ids[1]}?async=true', headers=headers)
+    assert response.status_code == 202
+    assert response.json['totals'] == {'sales_leads': 5, 'interactions': 0, 'support_tickets': 5}
+    for _ in range(100):
+        purge = client.get(response.headers['Location'], headers=headers).json
+        if purge['status'] != 'running':
+            break
+        time.sleep(0.05)
+    assert purge['status'] == 'completed'
+    assert purge['progress'] == 1.0
+    assert notified.count('support_tickets') == 4  # Three chunks of at most 2 tickets, then the customer
+    assert client.get(f'/customers/{customer_ids[1]}', headers=headers).status_code == 404
+    assert client.get('/sales_leads/facets', headers=headers).json['counts'] == {}
+    assert client.get('/support_tickets/search?q=widget', headers=headers).json['support_tickets'] == []
+
+    with app.app_context():
+        assert SupportTicket.query.count() == 0
+        db.drop_all()
+
+
+def test_sparse_fieldsets(app, client, auth_headers):
+    """Test that 'fields' limits both the returned fields and the loaded columns."""
+    from crm_backend.serializers import SCHEMAS
+
+    customer_id = client.post('/customers/', json={'first_name': 'Sparse', 'last_name': 'Fields',
+                                                   'email': 'sparse@example.com'}, headers=auth_headers).json['id']
+    client.post('/interactions/', json={'customer_id': customer_id, 'notes': 'A long call'}, headers=auth_headers)
+
+    response = client.get('/interactions/?fields=id,created_at', headers=auth_headers)
+    assert list(response.json['interactions'][0]) == ['id', 'created_at']
+    assert len(response.json['interactions'][0]['created_at']) == 19
+
+    response = client.get('/interactions/?sort=created_at&fields=customer_id', headers=auth_headers)
+    assert response.json['interactions'] == [{'customer_id': customer_id}]
+
+    response = client.get(f'/customers/{customer_id}?fields=email', headers=auth_headers)
+    assert response.json == {'email': 'sparse@example.com'}
+    assert client.get('/interactions/?fields=id,password', headers=auth_headers).status_code == 400
+
+    with app.app_context():
+        query = SCHEMAS['interactions'].query(Interaction.query, ('id', 'customer_id'))
+        assert 'notes' not in str(query.statement)
+
+
+def test_compressed_streamed_lists(client, auth_headers):
+    """Test negotiated compression of list pages and the streamed JSON export."""
+    import gzip
+    import zlib
+
+    customer_id = client.post('/customers/', json={'first_name': 'Gzip', 'last_name': 'Customer',
+                                                   'email': 'gzip@example.com'}, headers=auth_headers).json['id']
+    for n in range(30):
+        client.post('/interactions/', json={'customer_id': customer_id, 'notes': f'Call {n} ' + 'x' * 200},
+                    headers=auth_headers)
+
+    plain = client.get('/interactions/?per_page=30', headers=auth_headers)
+    response = client.get('/interactions/?per_page=30', headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'}))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data())) == plain.json
+
+    response = client.get('/interactions/?per_page=30',
+                          headers=dict(auth_headers, **{'Accept-Encoding': 'gzip;q=0, deflate'}))
+    assert response.headers['Content-Encoding'] == 'deflate'
+    assert json.loads(zlib.decompress(response.get_data())) == plain.json
+
+    # Below the size threshold
+    response = client.get(f'/customers/{customer_id}', headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'}))
+    assert 'Content-Encoding' not in response.headers
+
+    response = client.get('/export/interactions?format=json', headers=dict(auth_headers, **{'Accept-Encoding': 'gzip'}))
+    assert response.is_streamed
+    rows = json.loads(gzip.decompress(response.get_data()))
+    assert [row['id'] for row in rows] == [row['id'] for row in plain.json['interactions']]
+
+
+def test_ticket_status_facets(client, auth_headers):
+    """Test that status facets follow ticket creation, updates and deletion."""
+    response = client.post('/customers/', json={
+        'first_name': 'Facet',
+        'last_name': 'Customer',
+        'email': 'facets@example.com'
+    }, headers=auth_headers)
+    customer_id = response.json['id']
+
+    ticket_ids = []
+    for status in ('active', 'active', 'in process', 'escalated'):
+        response = client.post('/support_tickets/', json={
+            'customer_id': customer_id,
+            'description': 'Issue',
+            'status': status
+        }, headers=auth_headers)
+        ticket_ids.append(response.json['id'])
+
+    client.put(f'/support_tickets/{ticket_ids[0]}', json={'status': 'deactivated'},
+               headers=auth_headers)
+    client.delete(f'/support_tickets/{ticket_ids[3]}', headers=auth_headers)
+
+    response = client.get('/support_tickets/facets', headers=auth_headers)
+    assert response.json['counts'] == {'active': 1, 'deactivated': 1, 'in process': 1}
+
+    response = client.get(f'/support_tickets/facets?customer_id={customer_id}&start_date=2000-01-01',
+                          headers=auth_headers)
+    assert response.json['total'] == 3
+
+    response = client.get('/support_tickets/status', headers=auth_headers)
+    assert response.json == {'active': 1, 'deactivated': 1, 'inProcess': 1}
+
+
+def test_bulk_update_and_delete(client, auth_headers):
+    """Test bulk changes by ID list and by filter, with counters and search kept current."""
+    customer_id = client.post('/customers/', json={
+        'first_name': 'Bulk',
+        'last_name': 'Customer',
+        'email': 'bulk@example.com'
+    }, headers=auth_headers).json['id']
+
+    ticket_ids = [client.post('/support_tickets/', json={
+        'customer_id': customer_id,
+        'description': f'Printer jam {n}',
+        'status': 'active'
+    }, headers=auth_headers).json['id'] for n in range(4)]
+
+    response = client.patch('/support_tickets/bulk', json={
+        'ids': ticket_ids, 'values': {'description': 'Printer jam'}
+    }, headers=auth_headers)
+    assert response.json['updated'] == 4
+    assert client.get('/support_tickets/facets', headers=auth_headers).json['counts'] == {'active': 4}
+
+    response = client.patch('/support_tickets/bulk', json={
+        'ids': ticket_ids[:3], 'values': {'status': 'in process'}
+    }, headers=auth_headers)
+    assert response.json['updated'] == 3
+
+    response = client.patch('/support_tickets/bulk', json={
+        'filter': {'customer_id': customer_id, 'status': 'in process'},
+        'values': {'status': 'deactivated', 'description': 'Resolved'}
+    }, headers=auth_headers)
+    assert response.json['updated'] == 3
+    assert client.get('/support_tickets/status', headers=auth_headers).json == \
+        {'active': 1, 'deactivated': 3, 'inProcess': 0}
+    assert len(client.get('/support_tickets/search?q=printer', headers=auth_headers).json['support_tickets']) == 1
+
+    response = client.delete('/support_tickets/bulk', json={'filter': {'status': 'deactivated'}},
+                             headers=auth_headers)
+    assert response.json['deleted'] == 3
+    assert client.get('/support_tickets/facets', headers=auth_headers).json['counts'] == {'active': 1}
+    assert len(client.get('/support_tickets/search?q=resolved', headers=auth_headers).json['support_tickets']) == 0
+
+    assert client.delete('/sales_leads/bulk', json={'filter': {}}, headers=auth_headers).status_code == 400
+    assert client.delete('/sales_leads/bulk', json={'filter': {'start_date': 20240101}},
+                         headers=auth_headers).status_code == 400
+    assert client.patch('/sales_leads/bulk', json={'ids': [1], 'values': {'customer_id': 2}},
+                        headers=auth_headers).status_code == 400
+    assert client.patch('/sales_leads/bulk', json={'ids': [1], 'values': {'status': {'a': 1}}},
+                        headers=auth_headers).status_code == 400
+    assert client.patch('/support_tickets/bulk', json={'ids': [1], 'values': {'description': 5}},
+                        headers=auth_headers).status_code == 400
+
+
+def test_activity_timeseries(app, client, auth_headers):
+    """Test the activity rollup behind the time series through creates, deletes and compaction."""
+    from crm_backend.rollups import compact_rollups
+
+    customer_ids = [client.post('/customers/', json={
+        'first_name': 'Series',
+        'last_name': f'Customer {n}',
+        'email': f'series{n}@example.com'
+    }, headers=auth_headers).json['id'] for n in range(2)]
+
+    lead_ids = [client.post('/sales_leads/', json={
+        'customer_id': customer_id, 'status': 'new'
+    }, headers=auth_headers).json['id'] for customer_id in customer_ids + customer_ids[:1]]
+    client.post('/interactions/', json={'customer_id': customer_ids[1], 'notes': 'Call'}, headers=auth_headers)
+
+    series = client.get('/analytics/timeseries', headers=auth_headers).json['series']
+    assert [bucket['count'] for bucket in series['sales_leads']] == [3]
+    assert [bucket['count'] for bucket in series['interactions']] == [1]
+    assert series['support_tickets'] == []
+
+    client.delete(f'/sales_leads/{lead_ids[0]}', headers=auth_headers)
+    client.delete('/sales_leads/bulk', json={'ids': lead_ids[1:2]}, headers=auth_headers)
+    response = client.get(f'/analytics/timeseries?entity=sales_leads&bucket=week&customer_id={customer_ids[0]}',
+                          headers=auth_headers)
+    assert [bucket['count'] for bucket in response.json['series']['sales_leads']] == [1]
+
+    with app.app_context():
+        before, after = compact_rollups(chunk_size=1)
+        assert after < before
+        assert compact_rollups() == (0, 0)  # Merged rows are left alone
+        keys = db.session.execute(
+            db.select(ActivityRollup.entity, ActivityRollup.customer_id, ActivityRollup.day)
+        ).all()
+        assert len(keys) == len(set(keys))
+    series = client.get('/analytics/timeseries?bucket=month', headers=auth_headers).json['series']
+    assert [bucket['count'] for bucket in series['sales_leads']] == [1]
+    assert series['sales_leads'][0]['start'].endswith('-01')
+
+    assert client.get('/analytics/timeseries?bucket=hour', headers=auth_headers).status_code == 400
+    assert client.get('/analytics/timeseries?entity=customers', headers=auth_headers).status_code == 400
+
+
+def test_analytics_metric_totals(app, client, auth_headers):
+    """Test date-range metric totals served from running totals, kept current by every write."""
+    from crm_backend.metric_totals import rebuild_metric_totals
+
+    entries = [('revenue', 100.5, '2024-01-01'), ('revenue', 50, '2024-01-03'), ('revenue', 25.25, '2024-01-05'),
+               ('signups', 3, '2024-01-03')]
+    ids = [client.post('/analytics/', json={
+        'metric_name': name, 'metric_value': value, 'period_start_date': day
+    }, headers=auth_headers).json['id'] for name, value, day in entries]
+
+    response = client.get('/analytics/filter_aggregate?start_date=2024-01-02&end_date=2024-01-05',
+                          headers=auth_headers)
+    assert response.json['metrics'] == {'revenue': {'count': 2, 'value': 75.25}, 'signups': {'count': 1, 'value': 3.0}}
+    assert 'analytics' not in response.json
+
+    client.put(f'/analytics/{ids[1]}', json={'metric_value': 60, 'period_start_date': '2024-01-02'},
+               headers=auth_headers)
+    client.delete(f'/analytics/{ids[2]}', headers=auth_headers)
+    response = client.get('/analytics/filter_aggregate?metric_name=revenue&end_date=2024-01-02'
+                          '&include_rows=true&per_page=1', headers=auth_headers)
+    assert (response.json['total_count'], response.json['total_value']) == (2, 160.5)
+    assert [row['metric_value'] for row in response.json['analytics']] == [100.5]
+    assert response.json['total'] == 2
+
+    expected = client.get('/analytics/filter_aggregate', headers=auth_headers).json
+    with app.app_context():
+        rebuild_metric_totals()
+    assert client.get('/analytics/filter_aggregate', headers=auth_headers).json == expected
+    assert client.get('/analytics/recent', headers=auth_headers).json[0]['metric_name'] == 'signups'
+    assert client.post('/analytics/', json={'metric_name': 'revenue', 'metric_value': 'lots'},
+                       headers=auth_headers).status_code == 400
+
+
+def test_snapshot_reports(app, client, auth_headers, tmp_path):
+    """Test that the reports are computed from the columnar snapshot, not the live tables."""
+    from crm_backend.snapshot import SnapshotReader, write_snapshot
+
+    assert client.get('/reports/ticket_ageing', headers=auth_headers).status_code == 503
+
+    for n, company in enumerate(['Acme', 'Acme', 'Globex']):
+        customer_id = client.post('/customers/', json={
+            'first_name': 'Report', 'last_name': f'Customer {n}', 'email': f'report{n}@example.com', 'company': company
+        }, headers=auth_headers).json['id']
+        for status in ['won', 'lost', 'won'][:n + 1]:
+            client.post('/sales_leads/', json={'customer_id': customer_id, 'status': status}, headers=auth_headers)
+        client.post('/support_tickets/', json={
+            'customer_id': customer_id, 'description': 'Broken', 'status': 'deactivated' if n else 'active'
+        }, headers=auth_headers)
+
+    undated_id = client.post('/support_tickets/', json={
+        'customer_id': customer_id, 'description': 'Imported', 'status': 'in process'
+    }, headers=auth_headers).json['id']
+    app.extensions['snapshots'] = SnapshotReader(str(tmp_path))
+    with app.app_context():
+        db.session.execute(db.update(SupportTicket).where(SupportTicket.id == undated_id).values(created_at=None))
+        db.session.commit()
+        write_snapshot(str(tmp_path))
+    client.post('/sales_leads/', json={'customer_id': customer_id, 'status': 'won'}, headers=auth_headers)
+
+    report = client.get('/reports/company_pipeline', headers=auth_headers).json['report']
+    assert report == [
+        {'company': 'Acme', 'leads': 3, 'statuses': {'won': 2, 'lost': 1}, 'win_rate': 0.6667},
+        {'company': 'Globex', 'leads': 3, 'statuses': {'won': 2, 'lost': 1}, 'win_rate': 0.6667}
+    ]
+    response = client.get('/reports/ticket_ageing', headers=auth_headers)
+    assert 'NaN' not in response.get_data(as_text=True)
+    report = response.json['report']
+    assert list(report) == ['active', 'in process']
+    assert report['active']['buckets']['0-1d'] == 1 and report['active']['undated'] == 0
+    assert report['in process'] == {'buckets': {'0-1d': 0, '1-7d': 0, '7-30d': 0, '30-90d': 0, '90d+': 0},
+                                    'median_age_days': None, 'undated': 1}
+    assert client.get('/reports/interaction_frequency', headers=auth_headers).json['report']['interactions'] == 0
+
+
+def test_change_feed(app, client, auth_headers):
+    """Test that writes are logged for /changes and that compaction keeps the feed correct."""
+    from crm_backend.changes import compact_changes
+
+    since = client.get('/changes/', headers=auth_headers).json['next_since']
+    customer_id = client.post('/customers/', json={
+        'first_name': 'Change', 'last_name': 'Customer', 'email': 'change@example.com'
+    }, headers=auth_headers).json['id']
+    lead_ids = [client.post('/sales_leads/', json={'customer_id': customer_id, 'status': 'new'},
+                            headers=auth_headers).json['id'] for _ in range(2)]
+    client.put(f'/sales_leads/{lead_ids[0]}', json={'status': 'won'}, headers=auth_headers)
+    client.patch('/sales_leads/bulk', json={'ids': lead_ids, 'values': {'status': 'lost'}}, headers=auth_headers)
+
+    response = client.get(f'/changes/?since={since}&entities=sales_leads&limit=3', headers=auth_headers).json
+    assert [(c['id'], c['action']) for c in response['changes']] == \
+        [(lead_ids[0], 'create'), (lead_ids[1], 'create'), (lead_ids[0], 'update')]
+    assert response['has_more']
+    response = client.get(f"/changes/?since={response['next_since']}", headers=auth_headers).json
+    assert [(c['entity'], c['action']) for c in response['changes']] == [('sales_leads', 'update')] * 2
+
+    client.delete(f'/customers/{customer_id}', headers=auth_headers)
+    with app.app_context():
+        horizon, expired, merged = compact_changes(max_entries=3)
+    assert (expired, merged) == (6, 0)
+    assert client.get(f'/changes/?since={since}', headers=auth_headers).status_code == 410
+    changes = client.get(f'/changes/?since={horizon}', headers=auth_headers).json['changes']
+    assert {(c['entity'], c['id'], c['action']) for c in changes} == \
+        {('customers', customer_id, 'delete')} | {('sales_leads', id, 'delete') for id in lead_ids}
+
+
+def test_ticket_status_stream(app, client, auth_headers, monkeypatch):
+    """Test that /support_tickets/status/stream pushes the counts when a ticket is written."""
+    app.config['STATUS_STREAM_HEARTBEAT_SECONDS'] = 0.5
+    customer_id = client.post('/customers/', json={
+        'first_name': 'Stream', 'last_name': 'Customer', 'email': 'stream@example.com'
+    }, headers=auth_headers).json['id']
+
+    access_token = auth_headers['Authorization'].split()[1]
+    assert client.get(f'/support_tickets/status/stream?jwt={access_token}').status_code == 401
+    token = client.post('/support_tickets/status/stream/token', headers=auth_headers).json['token']
+    assert client.get('/support_tickets/status', headers={'Authorization': f'Bearer {token}'}).status_code != 200
+
+    response = client.get(f'/support_tickets/status/stream?jwt={token}', buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert 'Content-Encoding' not in response.headers
+    events = (chunk.decode() for chunk in response.response if not chunk.startswith((b'retry:', b':')))
+
+    assert json.loads(next(events).split('data: ')[1]) == {'active': 0, 'deactivated': 0, 'inProcess': 0}
+    client.post('/support_tickets/', json={'customer_id': customer_id, 'description': 'Live',
+                                           'status': 'active'}, headers=auth_headers)
+    assert json.loads(next(events).split('data: ')[1]) == {'active': 1, 'deactivated': 0, 'inProcess': 0}
+    response.close()
+
+    # Only successful bulk writes notify the streams
+    from crm_backend.routes import support_tickets
+    notified = []
+    monkeypatch.setattr(support_tickets, 'notify_status_change', notified.append)
+    client.patch('/support_tickets/bulk', json={'ids': 'all', 'values': {'status': 'active'}}, headers=auth_headers)
+    assert notified == []
+    client.patch('/support_tickets/bulk', json={'ids': [1], 'values': {'status': 'active'}}, headers=auth_headers)
+    assert notified == ['support_tickets']
+
+
+def test_import_customers(client, auth_headers):
+    """Test the streamed customer import with upserts and per-row errors."""
+    client.post('/customers/', json={
+        'first_name': 'Old',
+        'last_name': 'Name',
+        'email': 'existing@example.com',
+        'phone': '555-0100'
+    }, headers=auth_headers)
+
+    body = (
+        'first_name,last_name,email,company\n'
+        'New,Customer,new@example.com,Acme\n'
+        'Updated,Name,existing@example.com,\n'
+        'Bad,Email,not-an-email,\n'
+    )
+    response = client.post('/customers/import', data=body, content_type='text/csv',
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['inserted'] == 1
+    assert response.json['updated'] == 1
+    assert response.json['errors'] == [{'row': 3, 'email': 'not-an-email', 'error': 'Invalid email format'}]
+
+    response = client.get('/customers/?search=existing', headers=auth_headers)
+    customer = response.json['customers'][0]
+    assert customer['first_name'] == 'Updated' and customer['phone'] == '555-0100'
+
+    body = '{"first_name": "Json", "last_name": "Row", "email": "json@example.com"}\nnot json\n'
+    response = client.post('/customers/import', data=body, content_type='application/x-ndjson',
+                           headers=auth_headers)
+    assert response.json['inserted'] == 1
+    assert response.json['failed'] == 1
+
+
+def test_export_sales_leads(client, auth_headers):
+    """Test streaming a filtered export as NDJSON and CSV."""
+    response = client.post('/customers/', json={
+        'first_name': 'Export',
+        'last_name': 'Customer',
+        'email': 'export@example.com'
+    }, headers=auth_headers)
+    customer_id = response.json['id']
+    for status in ('new', 'won', 'new'):
+        client.post('/sales_leads/', json={'customer_id': customer_id, 'status': status},
+                    headers=auth_headers)
+
+    response = client.get('/export/sales_leads?status=new', headers=auth_headers)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['status'] for row in rows] == ['new', 'new']
+
+    response = client.get('/export/sales_leads?format=csv', headers=auth_headers)
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'id,customer_id,status,created_at'
+    assert len(lines) == 4
+
+    response = client.get('/export/workers', headers=auth_headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_response_cache_etags(app, client, auth_headers, tmp_path, backend):
+    """Test that cached responses revalidate with ETags and are invalidated by writes."""
+    import time
+    from werkzeug.http import http_date
+
+    app.config['RESPONSE_CACHE'] = backend
+    app.config['RESPONSE_CACHE_PATH'] = str(tmp_path / 'response_cache.db')
+
+    response = client.get('/customers/', headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get('/customers/', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+    written_after = http_date(int(time.time()))
+    client.post('/customers/', json={
+        'first_name': 'Cache',
+        'last_name': 'Buster',
+        'email': 'cache@example.com'
+    }, headers=auth_headers)
+
+    response = client.get('/customers/', headers=dict(auth_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.json['total'] == 1
+
+    # A write in the second named by If-Modified-Since is not hidden by the truncation
+    response = client.get('/customers/', headers=dict(auth_headers, **{'If-Modified-Since': written_after}))
+    assert response.status_code == 200
+    response = client.get('/customers/', headers=dict(auth_headers, **{'If-None-Match': response.headers['ETag'],
+                                                                        'If-Modified-Since': written_after}))
+    assert response.status_code == 304
+
+
+def test_sql_instrumentation(monkeypatch, tmp_path):
+    """Test the Server-Timing header and slow query log of the SQL instrumentation."""
+    from crm_backend.config import Config
+    from crm_backend.instrumentation import logger
+
+    monkeypatch.setattr(Config, 'SQL_INSTRUMENTATION', True)
+    monkeypatch.setattr(Config, 'SLOW_QUERY_MS', 0)
+    monkeypatch.setattr(Config, 'INSTRUMENTATION_LOG_FILE', str(tmp_path / 'instrumentation.log'))
+    monkeypatch.setattr(logger, 'handlers', [])
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        token = create_access_token(identity='1')
+
+    response = app.test_client().get('/sales_leads/', headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert '2 queries' in response.headers['Server-Timing']
+
+    records = [json.loads(line) for line in (tmp_path / 'instrumentation.log').read_text().splitlines()]
+    assert records and all(r['route'] == 'sales_leads.get_sales_leads' for r in records)
+
+    with app.app_context():
+        db.drop_all()
+
+
+def test_metrics_endpoint(monkeypatch):
+    """Test that request, latency and statement metrics are exposed to holders of the token."""
+    from crm_backend.config import Config
+
+    monkeypatch.setattr(Config, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', 'scrape-token')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        auth_headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    client = app.test_client()
+    client.get('/interactions/', headers=auth_headers)
+    client.get('/interactions/999', headers=auth_headers)
+
+    assert client.get('/metrics').status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert ('crm_http_requests_total{blueprint="interactions",endpoint="interactions.get_interactions",'
+            'method="GET",status="200"} 1') in body
+    assert 'status="404"} 1' in body
+    assert ('crm_http_request_duration_seconds_count{blueprint="interactions",'
+            'endpoint="interactions.get_interaction"} 1') in body
+    assert 'crm_db_statements_total{blueprint="interactions",endpoint="interactions.get_interactions"} 2' in body
+
+    with app.app_context():
+        db.drop_all()
+
+
+def test_engine_profile(monkeypatch, tmp_path):
+    """Test that the engine profile sets the pool options and SQLite PRAGMAs."""
+    from crm_backend.config import Config
+
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'profile.db'))
+    monkeypatch.setattr(Config, 'DB_ENGINE_PROFILE', 'production')
+    monkeypatch.setattr(Config, 'DB_POOL_SIZE', 3)
+
+    app = create_app()
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 3
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping'] is True
+    with app.app_context():
+        assert db.engine.pool.size() == 3
+        assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(db.text('PRAGMA busy_timeout')).scalar() == 10000
+        db.session.close()
+        db.engine.dispose()
+
+
+def test_read_replica_routing(monkeypatch, tmp_path):
+    """Test that GET requests read from the replica except during the writer's read-your-writes window."""
+    from crm_backend.config import Config
+    from crm_backend.replicas import sync_sqlite_replicas
+
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'primary.db'))
+    monkeypatch.setattr(Config, 'READ_REPLICA_URLS', ['sqlite:///' + str(tmp_path / 'replica.db')])
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        sync_sqlite_replicas(db.engines)
+        writer = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+        reader = {"Authorization": f"Bearer {create_access_token(identity='2')}"}
+
+    client = app.test_client()
+    response = client.post('/customers/', json={'first_name': 'Ada', 'last_name': 'Lovelace',
+                                                'email': 'ada@example.com'}, headers=writer)
+    assert response.status_code == 201
+
+    # The writer reads the primary, other workers read the replica that has not caught up yet
+    assert client.get('/customers/', headers=writer).json['total'] == 1
+    assert client.get('/customers/', headers=reader).json['total'] == 0
+
+    with app.app_context():
+        sync_sqlite_replicas(db.engines)
+    assert client.get('/customers/', headers=reader).json['total'] == 1
+
+    with app.app_context():
+        db.drop_all()
+        db.engines['replica_0'].dispose()
+
+
+def test_generate_data(monkeypatch, tmp_path):
+    """Test the generate_data command at a tiny volume, including the index rebuild."""
+    from sqlalchemy import text
+    from crm_backend import manage
+    from crm_backend.config import Config
+
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'generated.db'))
+    app = create_app()
+    monkeypatch.setattr(manage, 'app', app)
+    with app.app_context():
+        # Binds registered by the replica test stay in db.metadatas, so only the primary
+        db.create_all(bind_key=None)
+        indexes = {table: {index['name'] for index in db.inspect(db.engine).get_indexes(table)}
+                   for table in ('customers', 'sales_leads', 'interactions', 'support_tickets')}
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(manage.generate_data_command, ['--customers', '20', '--chunk-size', '7', '--seed', '1'])
+    assert 'Data generated successfully!' in result.output
+    printed = dict(line.split(': ') for line in result.output.splitlines()
+                   if line.split(':')[0] in indexes)
+
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+        for table, names in indexes.items():
+            assert int(printed[table]) == db.session.scalar(text(f'SELECT COUNT(*) FROM {table}'))
+            assert {index['name'] for index in inspector.get_indexes(table)} == names
+        assert printed['customers'] == '20'
+
+    result = runner.invoke(manage.generate_data_command, ['--customers', '5', '--skew', '1'])
+    assert '--skew must be greater than 1' in result.output
+    with app.app_context():
+        assert Customer.query.count() == 20
+        db.drop_all(bind_key=None)
+
+
 if __name__ == '__main__':
     pytest.main()